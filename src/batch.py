@@ -0,0 +1,218 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List
+import pandas as pd
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Meter.httpPoolClass import HttpPool
+from libs.Billing.summaryClass import BillingSummary
+from libs.Billing.compact import expand_energy
+from libs.Billing.localTime import DEFAULT_TIMEZONE
+from main import getEnergyData, combineMeterPairs, calculate, buildMeterList, writeMetrics, parseDate
+
+# Billing of several ZEV sites in one run, without the interactive menu. Every site is
+# a configuration like confData.secret, optionally with a "name" and the meter pairs to
+# combine:
+#
+#   {"name": "house1", "meters": {"flat1": "192.168.1.10"}, "ewMeter": "192.168.1.9", "combine": [["flat1", "pv"]]}
+#
+#   python src/batch.py sites/*.json --start 1.1.2025 --stop 1.1.2026 --output reports
+
+log = logging.getLogger("Batch")
+
+
+def loadSite(file_name: str):
+    """
+    Loads a site configuration.
+
+    Args:
+        file_name (str): Path of the JSON configuration.
+
+    Returns:
+        dict: Configuration with "name", "meters", "ewMeter" and "combine".
+    """
+    with open(file_name, "r") as file:
+        site = json.load(file)
+    site.setdefault("name", os.path.splitext(os.path.basename(file_name))[0])
+    site.setdefault("combine", [])
+
+    return site
+
+
+def readSite(
+    site: dict,
+    start_epoch_time: int,
+    stop_epoch_time: int,
+    executor: ThreadPoolExecutor,
+    max_connections: int = EmuMeter.MAX_CONNECTIONS,
+    meter_timeout: float = None,
+    cache_dir: str = "cache",
+    compact: bool = False,
+    ):
+    """
+    Reads the energy data of all meters of a site. The meter reads run on the shared
+    worker pool, every site has its own cache directory.
+
+    Returns:
+        pd.DataFrame: Energy data as returned by getEnergyData.
+    """
+    meter_list = buildMeterList(site, max_connections)
+    return getEnergyData(
+        start_epoch_time,
+        stop_epoch_time,
+        meter_list,
+        meter_timeout,
+        os.path.join(cache_dir, site["name"]),
+        executor,
+        compact,
+    )
+
+
+def billSite(name: str, energyDF: pd.DataFrame, userMeter_list: List[str], combine_pairs: list, output_dir: str):
+    """
+    Combines the meters, calculates the billing and writes the reports of a site. Runs in
+    a worker process.
+
+    Returns:
+        dict: Summary of the site, see BillingSummary.to_dict.
+    """
+    energyDF = combineMeterPairs(energyDF, [tuple(pair) for pair in combine_pairs])
+    energyDF = calculate(energyDF, userMeter_list)
+    summary = BillingSummary.from_frame(energyDF, userMeter_list)
+
+    siteDir = os.path.join(output_dir, name)
+    os.makedirs(siteDir, exist_ok=True)
+    expand_energy(energyDF).to_csv(os.path.join(siteDir, "output.csv"), index=False, sep=';')
+    summary.to_csv(os.path.join(siteDir, "summary.csv"))
+    with open(os.path.join(siteDir, "summary.txt"), "w") as file:
+        file.write(summary.render_text() + "\n")
+    with open(os.path.join(siteDir, "summary.json"), "w") as file:
+        json.dump(summary.to_dict(), file, indent=4)
+
+    return summary.to_dict()
+
+
+def runBatch(
+    sites: List[dict],
+    start_epoch_time: int,
+    stop_epoch_time: int,
+    output_dir: str,
+    workers: int = None,
+    readers: int = 8,
+    max_connections: int = EmuMeter.MAX_CONNECTIONS,
+    meter_timeout: float = None,
+    cache_dir: str = "cache",
+    compact: bool = False,
+    ):
+    """
+    Reads and bills several sites. The meters of all sites are read concurrently on one
+    shared pool of reader threads, besides the connection limit per meter host. As soon as
+    the data of a site is complete, it is billed in a process pool, so the billing of the
+    sites runs on all cores while other sites are still read.
+
+    Args:
+        sites (List[dict]): Site configurations as returned by loadSite.
+        start_epoch_time (int): Start time in epoch seconds.
+        stop_epoch_time (int): Stop time in epoch seconds.
+        output_dir (str): Directory of the reports, one subdirectory per site.
+        workers (int, optional): Number of billing processes. Defaults to the number of cores.
+        readers (int, optional): Number of meters read at the same time. Defaults to 8.
+        max_connections (int, optional): Concurrent requests per meter host. Defaults to 2.
+        meter_timeout (float, optional): Timeout per meter in seconds. Defaults to no timeout.
+        cache_dir (str, optional): Directory of the meter caches. Defaults to "cache".
+        compact (bool, optional): Keep the energy data in the compact representation, see
+            libs.Billing.compact. Less memory and less data sent to the billing processes.
+
+    Returns:
+        dict: Report of every site keyed by site name, with "ok" and either "summary" or "error".
+    """
+    names = [site["name"] for site in sites]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Site names have to be unique. ({', '.join(names)})")
+
+    reports = {}
+    with ThreadPoolExecutor(max_workers=readers, thread_name_prefix="meter") as meterPool, \
+            ThreadPoolExecutor(max_workers=max(1, len(sites)), thread_name_prefix="site") as sitePool, \
+            ProcessPoolExecutor(max_workers=workers) as billingPool:
+        reads = {
+            sitePool.submit(
+                readSite, site, start_epoch_time, stop_epoch_time, meterPool, max_connections, meter_timeout, cache_dir,
+                compact,
+            ): site
+            for site in sites
+        }
+
+        bills = {}
+        for future in as_completed(reads):
+            site = reads[future]
+            try:
+                energyDF = future.result()
+            except Exception as error:
+                # e.g. a meter that can't be read or a site configuration without "ewMeter",
+                # only this site fails
+                log.error(f" Site \"{site['name']}\" could not be read: {error!r}")
+                reports[site["name"]] = {"ok": False, "error": repr(error)}
+                continue
+            if energyDF.empty:
+                reports[site["name"]] = {"ok": False, "error": "No data in the period."}
+                continue
+
+            log.info(f" Site \"{site['name']}\" read, billing.")
+            bills[billingPool.submit(
+                billSite, site["name"], energyDF, list(site["meters"]), site["combine"], output_dir
+            )] = site
+
+        for future in as_completed(bills):
+            site = bills[future]
+            try:
+                reports[site["name"]] = {"ok": True, "summary": future.result()}
+            except Exception as error:
+                log.error(f" Site \"{site['name']}\" could not be billed: {error!r}")
+                reports[site["name"]] = {"ok": False, "error": repr(error)}
+
+    return {name: reports[name] for name in names}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read and bill several ZEV sites.")
+    parser.add_argument("sites", nargs="+", help="site configurations, JSON like confData.secret")
+    parser.add_argument("--start", required=True, help="start date like 1.1.2025, local midnight")
+    parser.add_argument("--stop", required=True, help="stop date like 1.1.2026, local midnight")
+    parser.add_argument("--timezone", default=DEFAULT_TIMEZONE, help="local timezone of the dates")
+    parser.add_argument("--output", default="reports", help="directory of the reports")
+    parser.add_argument("--workers", type=int, default=None, help="billing processes, defaults to the number of cores")
+    parser.add_argument("--readers", type=int, default=8, help="meters read at the same time")
+    parser.add_argument("--connections", type=int, default=EmuMeter.MAX_CONNECTIONS, help="concurrent requests per meter host")
+    parser.add_argument("--timeout", type=float, default=None, help="timeout per meter in seconds")
+    parser.add_argument("--compact", action="store_true", help="compact energy data, less memory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    startTime = parseDate(args.start, args.timezone)
+    stopTime = parseDate(args.stop, args.timezone)
+    reports = runBatch(
+        [loadSite(file_name) for file_name in args.sites],
+        startTime,
+        stopTime,
+        args.output,
+        args.workers,
+        args.readers,
+        args.connections,
+        args.timeout,
+        compact=args.compact,
+    )
+
+    HttpPool.close_all()
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, "batch.json"), "w") as file:
+        json.dump({"start": args.start, "stop": args.stop, "sites": reports}, file, indent=4)
+    writeMetrics(os.path.join(args.output, "metrics"))
+
+    for name, report in reports.items():
+        print(f" {name}: {'ok' if report['ok'] else report['error']}")
+    sys.exit(0 if all(report["ok"] for report in reports.values()) else 1)
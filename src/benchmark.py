@@ -0,0 +1,122 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from main import getEnergyData, combineMeterPairs, calculate
+
+# Benchmark of the whole pipeline against local meter emulators, no real meter is touched.
+# Every stage is run once for the time and once more with tracemalloc for the memory peak.
+#
+#   python src/benchmark.py --meters 1 10 50 --days 1 30 365 1095 --json bench.json
+
+
+def measure(stage, setup=None):
+    """run a stage once timed and once traced, returns (seconds, peak bytes, result)"""
+    if setup is not None:
+        setup()
+    begin = time.perf_counter()
+    result = stage()
+    seconds = time.perf_counter() - begin
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    stage()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak, result
+
+
+def benchmarkSite(meterCount: int, days: int, latency: float, gaps: int):
+    """benchmark all stages for one site size, returns one result per stage"""
+    endTime = int(time.time()) // EmuEmulator.LOG_INTERVAL * EmuEmulator.LOG_INTERVAL
+    entries = days * 96 + 96
+    names = ["ewMeter"] + [f"user{number:02d}" for number in range(1, meterCount + 1)]
+    # every second user is a solar plant, combined with the user before it
+    pairs = [(names[number], names[number + 1]) for number in range(1, meterCount, 2)]
+    producers = {exportMeter for _, exportMeter in pairs}
+
+    emulators = []
+    for seed, name in enumerate(names):
+        offline = [(entries * (part + 1) // (gaps + 1), 4) for part in range(gaps)]
+        emulators.append(
+            EmuEmulator(entries, seed=seed, latency=latency, gaps=offline, end_time=endTime, producer=name in producers).start()
+        )
+    meters = [EmuMeter(emulator.host, name) for emulator, name in zip(emulators, names)]
+    startTime, stopTime = endTime - days * 86400, endTime
+
+    results = []
+    def record(stage, rows, seconds, peak):
+        results.append({
+            "meters": meterCount,
+            "days": days,
+            "stage": stage,
+            "rows": rows,
+            "seconds": seconds,
+            "rowsPerSecond": rows / seconds if seconds > 0 else None,
+            "peakMB": peak / 2**20,
+        })
+        print(f" {meterCount:>4} {days:>5} {stage:<20} {rows:>10} {seconds:>9.3f} s {results[-1]['peakMB']:>9.1f} MB")
+
+    try:
+        seconds, peak, data = measure(lambda: [meter.read(startTime, stopTime) for meter in meters])
+        record("EmuMeter.read", sum(len(frame) for frame in data), seconds, peak)
+
+        def clearCache():
+            shutil.rmtree("cache", ignore_errors=True)
+        seconds, peak, energyDF = measure(lambda: getEnergyData(startTime, stopTime, meters), clearCache)
+        record("getEnergyData cold", len(energyDF) * len(names), seconds, peak)
+        seconds, peak, energyDF = measure(lambda: getEnergyData(startTime, stopTime, meters))
+        record("getEnergyData warm", len(energyDF) * len(names), seconds, peak)
+
+        seconds, peak, combined = measure(lambda: combineMeterPairs(energyDF.copy(), pairs))
+        record("combineMeters", len(combined), seconds, peak)
+
+        users = names[1:]
+        seconds, peak, _ = measure(lambda: calculate(combined.copy(), users))
+        record("calculate", len(combined), seconds, peak)
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the meter pipeline against local meter emulators.")
+    parser.add_argument("--meters", type=int, nargs="+", default=[1, 10], help="numbers of user meters")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 30, 365], help="lengths of the period in days")
+    parser.add_argument("--latency", type=float, default=0.0, help="response delay of the emulators in seconds")
+    parser.add_argument("--gaps", type=int, default=0, help="offline periods per meter")
+    parser.add_argument("--json", help="append the results to this JSON file")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    allResults = []
+    workDir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tempDir:
+        # the meter cache is written to ./cache, keep it out of the working directory
+        os.chdir(tempDir)
+        try:
+            print(f" {'meters':>4} {'days':>5} {'stage':<20} {'rows':>10} {'time':>11} {'peak':>12}")
+            for meterCount in args.meters:
+                for days in args.days:
+                    allResults += benchmarkSite(meterCount, days, args.latency, args.gaps)
+        finally:
+            os.chdir(workDir)
+
+    if args.json:
+        runs = []
+        if os.path.exists(args.json):
+            with open(args.json, "r") as file:
+                runs = json.load(file)
+        runs.append({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "results": allResults})
+        with open(args.json, "w") as file:
+            json.dump(runs, file, indent=4)
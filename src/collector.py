@@ -0,0 +1,61 @@
+import argparse
+import json
+import logging
+import os
+from libs.Meter.httpPoolClass import HttpPool
+from libs.Acquisition.collectorClass import MeterCollector
+from libs.Billing.localTime import DEFAULT_TIMEZONE
+from main import buildMeterList, writeMetrics, parseDate
+
+# Collects the meters of a ZEV into the local cache, until stopped with Ctrl+C. The
+# billing then reads the collected periods from the cache, without asking the meters.
+#
+#   python src/collector.py --config src/confData.secret --interval 300 --since 1.1.2025
+
+log = logging.getLogger("Collector")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collect the meter logs into the local cache.")
+    parser.add_argument("--config", default="src/confData.secret", help="meter configuration, like confData.secret")
+    parser.add_argument("--cache", default="cache", help="directory of the meter cache")
+    parser.add_argument("--interval", type=float, default=MeterCollector.DEFAULT_POLL_INTERVAL, help="seconds between two polls of a meter")
+    parser.add_argument("--max-backoff", type=float, default=MeterCollector.DEFAULT_MAX_BACKOFF, help="longest wait for an offline meter in seconds")
+    parser.add_argument("--since", default=None, help="start date of the history like 1.1.2025, defaults to new entries only")
+    parser.add_argument("--metrics", default=None, help="write the metrics to this file name on exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.config, "r") as file:
+        confData = json.load(file)
+    sinceTime = None
+    if args.since is not None:
+        sinceTime = parseDate(args.since, confData.get("timezone", DEFAULT_TIMEZONE))
+
+    # replayed logs are read directly, there is nothing to collect
+    meter_list = []
+    for meter in buildMeterList(confData):
+        if meter.local:
+            log.info(f" Meter \"{meter.name}\" has local data, it is not collected.")
+        else:
+            meter_list.append(meter)
+
+    collector = MeterCollector(
+        meter_list,
+        cache_dir=args.cache,
+        poll_interval=args.interval,
+        max_backoff=args.max_backoff,
+        since_epoch_time=sinceTime,
+    )
+    try:
+        collector.run()
+    except KeyboardInterrupt:
+        log.info(" Collector stopped.")
+    HttpPool.close_all()
+
+    for name, state in collector.status().items():
+        print(f" {name}: index {state['last_index']}, {state['failures']} failed polls{'' if state['error'] is None else ', ' + state['error']}")
+    if args.metrics is not None:
+        os.makedirs(os.path.dirname(args.metrics) or ".", exist_ok=True)
+        writeMetrics(args.metrics)
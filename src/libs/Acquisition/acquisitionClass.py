@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import pandas as pd
+from libs.Meter.meterClass import Meter
+from libs.Meter.httpPoolClass import HttpPool
+from libs.Metrics.metricsClass import metrics
+
+
+@dataclass
+class MeterResult:
+    """Outcome of reading one meter"""
+
+    name: str
+    data: Optional[pd.DataFrame] = None
+    error: Optional[BaseException] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class MeterReadError(Exception):
+    def __init__(self, results: Dict[str, MeterResult]):
+        """Raised if at least one meter could not be read
+
+        Args:
+            results (Dict[str, MeterResult]): results of all meters, keyed by meter name
+        """
+        self.results = results
+        self.failed = [result for result in results.values() if not result.ok]
+        super().__init__(
+            ", ".join(f"{result.name}: {result.error!r}" for result in self.failed)
+        )
+
+
+class AcquisitionEngine:
+    # every meter keeps up to its connection limit of blocks in flight on the shared block
+    # pool, more meters at the same time only wait there
+    DEFAULT_MAX_WORKERS = Meter.BLOCK_WORKERS // HttpPool.DEFAULT_MAX_CONNECTIONS
+
+    def __init__(
+        self,
+        meter_list: List[Meter],
+        read_function: Optional[Callable[[Meter, int, int], pd.DataFrame]] = None,
+        timeout: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
+        """Read several meters concurrently with asyncio. Every meter read is a task
+        with its own timeout, counted from the moment a worker starts the read. The blocking meter reads run on a bounded worker pool, at
+        most max_workers meters are read at the same time and the others wait for a free
+        worker. The blocks of all meters are read on the shared pool of Meter.block_pool,
+        the requests per host are limited by the meters.
+
+        Args:
+            meter_list (List[Meter]): meters to read
+            read_function (Callable, optional): function(meter, start, stop) returning the
+                data of one meter. Defaults to Meter.read.
+            timeout (float, optional): timeout per meter in seconds, the time waiting for a
+                free worker is not counted. Defaults to no timeout.
+            max_workers (int, optional): size of the worker pool. Defaults to
+                DEFAULT_MAX_WORKERS, the block pool filled with meters at their default
+                connection limit, or the number of meters if there are fewer.
+            executor (ThreadPoolExecutor, optional): worker pool shared with other engines, it
+                is not shut down by the engine. At most as many meters as it has workers
+                are read at the same time. Defaults to an own pool of max_workers.
+        """
+        self.meter_list = meter_list
+        self.read_function = read_function or (lambda meter, start, stop: meter.read(start, stop))
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.executor = executor
+
+        self.log = logging.getLogger("Acquisition")
+
+    async def _read_meter(self, executor: ThreadPoolExecutor, meter: Meter, start_epoch_time: int, stop_epoch_time: int):
+        loop = asyncio.get_running_loop()
+        begin = time.monotonic()
+        meter.cancel_event.clear()
+        started = loop.create_future()
+
+        def read():
+            loop.call_soon_threadsafe(started.set_result, None)
+            return self.read_function(meter, start_epoch_time, stop_epoch_time)
+
+        future = loop.run_in_executor(executor, read)
+
+        try:
+            # the timeout starts once a worker of a busy or shared pool took the read
+            await asyncio.wait([started, future], return_when=asyncio.FIRST_COMPLETED)
+            data = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            meter.cancel()
+            error = TimeoutError(f"Reading meter \"{meter.name}\" took longer than {self.timeout} s.")
+            metrics.increment("meter_read_errors", meter=meter.name, error="timeout")
+            return MeterResult(meter.name, error=error, duration=time.monotonic() - begin)
+        except asyncio.CancelledError:
+            meter.cancel()
+            raise
+        except Exception as error:
+            meter.log.error(f" Read failed: {error!r}")
+            metrics.increment("meter_read_errors", meter=meter.name, error=type(error).__name__)
+            return MeterResult(meter.name, error=error, duration=time.monotonic() - begin)
+
+        duration = time.monotonic() - begin
+        metrics.observe("meter_read_seconds", duration, meter=meter.name)
+        self.log.debug(f" Meter \"{meter.name}\" read in {duration:.2f} s.")
+        return MeterResult(meter.name, data=data, duration=duration)
+
+    async def read_async(self, start_epoch_time: int, stop_epoch_time: int):
+        """Read all meters concurrently, see __init__
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+
+        Returns:
+            Dict[str, MeterResult]: result of every meter, keyed by meter name
+        """
+        if self.executor is None:
+            workers = max(1, self.max_workers or min(len(self.meter_list), self.DEFAULT_MAX_WORKERS))
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="meter")
+        else:
+            executor = self.executor
+        try:
+            results = await asyncio.gather(*[
+                self._read_meter(executor, meter, start_epoch_time, stop_epoch_time)
+                for meter in self.meter_list
+            ])
+        finally:
+            if self.executor is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        return {result.name: result for result in results}
+
+    def run(self, start_epoch_time: int, stop_epoch_time: int):
+        """Read all meters and raise if any of them failed. On Ctrl+C all running
+        reads are canceled before KeyboardInterrupt is passed on.
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+
+        Raises:
+            MeterReadError: if at least one meter could not be read
+
+        Returns:
+            Dict[str, pd.DataFrame]: data of every meter, keyed by meter name
+        """
+        results = asyncio.run(self.read_async(start_epoch_time, stop_epoch_time))
+
+        if not all(result.ok for result in results.values()):
+            raise MeterReadError(results)
+
+        return {name: result.data for name, result in results.items()}
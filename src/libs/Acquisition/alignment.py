@@ -0,0 +1,87 @@
+import logging
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger("Acquisition")
+
+
+def align_meters(frames: Dict[str, pd.DataFrame], interval: int = 15 * 60):
+    """Place the data of all meters on one shared time grid in a single pass. The
+    grid runs from the earliest to the latest timestamp of all meters with a fixed
+    interval. Every meter is written once into a preallocated matrix, slots a meter
+    did not log stay NaN and are flagged as missing.
+
+    Args:
+        frames (Dict[str, pd.DataFrame]): data of each meter keyed by meter name, with a
+            "Timestamp" column and the value columns of the meter
+        interval (int, optional): grid interval in seconds. Defaults to 15 min.
+
+    Returns:
+        pd.DataFrame: "Timestamp" and the value columns of all meters in the order of frames.
+            attrs["gaps"] holds the missing slots of every meter keyed by meter name, as list
+            of (first, last) timestamps of each run of missing slots.
+    """
+    columns = [column for frame in frames.values() for column in frame.columns if column != "Timestamp"]
+    stamps = {
+        name: frame["Timestamp"].astype("datetime64[s]").astype("int64").to_numpy()
+        for name, frame in frames.items()
+    }
+
+    non_empty = [values for values in stamps.values() if len(values) > 0]
+    if not non_empty:
+        return pd.DataFrame(columns=["Timestamp"] + columns)
+    origin = min(values.min() for values in non_empty)
+    slots = int(np.rint((max(values.max() for values in non_empty) - origin) / interval)) + 1
+
+    matrix = np.full((len(columns), slots), np.nan)
+    missing = np.ones((len(frames), slots), dtype=bool)
+
+    row = 0
+    for number, (name, frame) in enumerate(frames.items()):
+        position = np.rint((stamps[name] - origin) / interval).astype(np.int64)
+        if len(np.unique(position)) < len(position):
+            log.warning(f" Meter \"{name}\" has several entries in one slot, the last one is used.")
+
+        for column in frame.columns:
+            if column == "Timestamp":
+                continue
+            matrix[row, position] = frame[column].to_numpy(dtype=float)
+            row += 1
+        missing[number, position] = False
+
+        gaps = int(missing[number].sum())
+        if gaps > 0:
+            log.warning(f" Meter \"{name}\" has no entry in {gaps} of {slots} slots.")
+
+    data = pd.DataFrame(matrix.T, columns=columns, copy=False)
+    data.insert(0, "Timestamp", pd.to_datetime(origin + interval * np.arange(slots), unit="s"))
+    data.attrs["gaps"] = {
+        name: _gap_runs(data["Timestamp"], missing[number]) for number, name in enumerate(frames)
+    }
+
+    return data
+
+
+def _gap_runs(timestamps: pd.Series, missing: np.ndarray):
+    """list the runs of missing slots as (first, last) timestamps"""
+    edges = np.diff(np.concatenate([[0], missing.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1) - 1
+    return [(timestamps.iloc[start], timestamps.iloc[stop]) for start, stop in zip(starts, stops)]
+
+
+def gap_mask(data: pd.DataFrame, name: str):
+    """Flag the rows of an aligned DataFrame in which a meter has no entry
+
+    Args:
+        data (pd.DataFrame): data returned by align_meters, or derived from it
+        name (str): name of the meter
+
+    Returns:
+        np.ndarray: boolean array, True where the meter has no entry
+    """
+    mask = np.zeros(len(data), dtype=bool)
+    for first, last in data.attrs["gaps"][name]:
+        mask |= ((data["Timestamp"] >= first) & (data["Timestamp"] <= last)).to_numpy()
+    return mask
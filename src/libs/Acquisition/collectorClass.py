@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Cache.meterCacheClass import MeterCache
+from libs.Metrics.metricsClass import metrics
+
+
+@dataclass
+class CollectorState:
+    """Poll schedule of one meter"""
+
+    name: str
+    next_poll: float = 0.0
+    failures: int = 0
+    last_index: Optional[int] = None
+    last_error: Optional[BaseException] = None
+
+
+class MeterCollector:
+    DEFAULT_POLL_INTERVAL = 5 * 60
+    DEFAULT_MAX_BACKOFF = 6 * 60 * 60
+
+    def __init__(
+        self,
+        meter_list: List[EmuMeter],
+        cache_dir: str = "cache",
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        since_epoch_time: Optional[int] = None,
+        max_workers: int = 8,
+    ):
+        """Tails meters into their local stores. Every poll asks a meter for its newest
+        entry and downloads only the entries after the newest cached one, so a meter
+        serves a few rows per poll. A meter that can't be reached is polled again after
+        a backoff that doubles with every failure, the other meters are not delayed.
+
+        Args:
+            meter_list (List[EmuMeter]): meters to collect, meters with local data like a
+                ReplayMeter need no collecting
+            cache_dir (str, optional): directory of the meter stores. Defaults to "cache".
+            poll_interval (float, optional): seconds between two polls of a meter. Defaults to 5 min.
+            max_backoff (float, optional): longest wait after failures in seconds. Defaults to 6 h.
+            since_epoch_time (int, optional): start of the history downloaded into an empty
+                store. Defaults to the newest entry only.
+            max_workers (int, optional): meters polled at the same time. Defaults to 8.
+
+        Raises:
+            ValueError: if a meter has local data or can't be polled for its newest entry
+        """
+        for meter in meter_list:
+            if meter.local or not hasattr(meter, "handshake"):
+                raise ValueError(f"The meter \"{meter.name}\" can't be polled, its data is read directly.")
+        self.caches = {meter.name: MeterCache(meter, cache_dir) for meter in meter_list}
+        self.states = {meter.name: CollectorState(meter.name) for meter in meter_list}
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.since_epoch_time = since_epoch_time
+        self.max_workers = max_workers
+
+        self.log = logging.getLogger("Collector")
+
+    def backoff(self, failures: int):
+        """seconds to wait after a number of failed polls in a row"""
+        return min(self.max_backoff, self.poll_interval * 2 ** max(failures - 1, 0))
+
+    def poll(self, name: str):
+        """Download the entries of a meter logged since the last poll
+
+        Args:
+            name (str): meter name
+
+        Returns:
+            int: number of new entries
+        """
+        cache = self.caches[name]
+        meter = cache.meter
+
+        # the newest entry, never an answer of an earlier poll
+        meter.handshake(max_age=0)
+        newest_index = meter.current_index
+        if cache.intervals:
+            start_index = cache.intervals[-1][1] + 1
+        elif self.since_epoch_time is not None:
+            start_index, _ = meter.calc_index(self.since_epoch_time, self.since_epoch_time)
+        else:
+            start_index = newest_index
+
+        start_index = max(start_index, meter.oldest_index)
+        if start_index > newest_index:
+            return 0
+        block_count = cache.fetch(start_index, newest_index)
+        metrics.increment("meter_blocks_read", block_count, meter=name)
+
+        return newest_index - start_index + 1
+
+    def _poll_state(self, state: CollectorState, now: float):
+        begin = time.monotonic()
+        try:
+            rows = self.poll(state.name)
+        except Exception as error:
+            state.failures += 1
+            state.last_error = error
+            state.next_poll = now + self.backoff(state.failures)
+            metrics.increment("collector_errors", meter=state.name)
+            self.log.warning(
+                f" Meter \"{state.name}\" failed {state.failures} times, next poll in {self.backoff(state.failures):.0f} s: {error!r}"
+            )
+            return
+        finally:
+            metrics.increment("collector_polls", meter=state.name)
+            metrics.observe("collector_poll_seconds", time.monotonic() - begin, meter=state.name)
+
+        if state.failures > 0:
+            self.log.info(f" Meter \"{state.name}\" is back after {state.failures} failed polls.")
+        state.failures = 0
+        state.last_error = None
+        state.last_index = self.caches[state.name].intervals[-1][1] if self.caches[state.name].intervals else None
+        state.next_poll = now + self.poll_interval
+        metrics.increment("collector_rows", rows, meter=state.name)
+        self.log.debug(f" Meter \"{state.name}\": {rows} new entries.")
+
+    def poll_due(self, executor: ThreadPoolExecutor, now: Optional[float] = None):
+        """Poll all meters whose next poll is due, concurrently
+
+        Args:
+            executor (ThreadPoolExecutor): worker pool of the polls
+            now (float, optional): monotonic time. Defaults to time.monotonic().
+
+        Returns:
+            List[str]: names of the polled meters
+        """
+        now = time.monotonic() if now is None else now
+        due = [state for state in self.states.values() if state.next_poll <= now]
+        list(executor.map(lambda state: self._poll_state(state, now), due))
+        return [state.name for state in due]
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """Poll the meters until the stop event is set
+
+        Args:
+            stop_event (threading.Event, optional): ends the collector. Defaults to running until
+                KeyboardInterrupt.
+        """
+        stop_event = stop_event or threading.Event()
+        self.log.info(f" Collecting {len(self.states)} meters every {self.poll_interval} s.")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector") as executor:
+            while not stop_event.is_set():
+                self.poll_due(executor)
+                next_poll = min(state.next_poll for state in self.states.values())
+                stop_event.wait(max(0.0, next_poll - time.monotonic()))
+        self.log.info(" Collector stopped.")
+
+    def status(self):
+        """State of every meter, e.g. for logging
+
+        Returns:
+            Dict[str, dict]: last cached index, failures in a row and last error per meter
+        """
+        return {
+            name: {
+                "last_index": state.last_index,
+                "failures": state.failures,
+                "error": None if state.last_error is None else repr(state.last_error),
+            }
+            for name, state in self.states.items()
+        }
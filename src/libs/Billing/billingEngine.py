@@ -0,0 +1,154 @@
+import numpy as np
+from typing import List
+
+
+def _ordered_sum(values: np.ndarray):
+    """sum over the last axis, strictly left to right. np.sum uses pairwise
+    summation, which rounds differently than adding the columns one by one."""
+    if values.shape[-1] == 0:
+        return np.zeros(values.shape[:-1])
+    return np.cumsum(values, axis=-1)[..., -1]
+
+
+def transfer_totals(sold_int: np.ndarray, bought_int_ratio: np.ndarray):
+    """Sum the energy users bought from each other over all intervals without
+    building the T x N x N per interval transfers. Like pandas sums, intervals
+    where a transfer is not defined (NaN) are skipped.
+
+    Args:
+        sold_int (np.ndarray): T x N energy sold internally
+        bought_int_ratio (np.ndarray): T x N energy bought internally divided by the
+            internal production of all other users
+
+    Returns:
+        np.ndarray: N x N, [i, j] is the total energy user j bought from user i
+    """
+    # infinite factors are rare, those intervals are summed one by one
+    finite = ~(np.isinf(sold_int).any(axis=1) | np.isinf(bought_int_ratio).any(axis=1))
+    with np.errstate(invalid="ignore"):
+        totals = np.nan_to_num(sold_int[finite], nan=0.0).T @ np.nan_to_num(bought_int_ratio[finite], nan=0.0)
+        if not finite.all():
+            products = sold_int[~finite][:, :, None] * bought_int_ratio[~finite][:, None, :]
+            totals += np.nansum(products, axis=0)
+    np.fill_diagonal(totals, 0)
+
+    return totals
+
+
+def calculate_billing(
+    user_import: np.ndarray,
+    user_export: np.ndarray,
+    ew_import: np.ndarray,
+    ew_export: np.ndarray,
+    pairwise: bool = True,
+):
+    """Calculate the energy distribution of all users at once on a T x N matrix
+    of T intervals and N user meters.
+
+    The calculation is derived from here:
+    https://www.bulletin.ch/de/news-detail/gerecht-abrechnen-bei-eigenverbrauch.html
+
+    Args:
+        user_import (np.ndarray): T x N imported energy per interval and user in Wh
+        user_export (np.ndarray): T x N exported energy per interval and user in Wh
+        ew_import (np.ndarray): T energy imported from the energy provider (EW) in Wh
+        ew_export (np.ndarray): T energy exported to the energy provider (EW) in Wh
+        pairwise (bool, optional): also return the energy users bought from each other
+            per interval. This needs T x N x N values. Defaults to True.
+
+    Returns:
+        dict: arrays of the billing quantities:
+            - "totalProd_Wh", "totalUse_Wh", "eigenV_Wh": T
+            - "EnSold_Wh", "EnBought_Wh", "EnSoldInt_Wh", "EnBoughtInt_Wh": T x N
+            - "EnBoughtIntFrom_Wh": T x N x N, [t, i, j] is the energy user j bought from
+              user i. Only if pairwise is set.
+            - "EnBoughtIntTotal_Wh": N x N, sum of "EnBoughtIntFrom_Wh" over all intervals
+            - "EnergyIn_Wh", "EnergyOut_Wh", "EnergyError_Wh": T
+    """
+    user_import = np.asarray(user_import, dtype=np.float64)
+    user_export = np.asarray(user_export, dtype=np.float64)
+    ew_import = np.asarray(ew_import, dtype=np.float64)
+    ew_export = np.asarray(ew_export, dtype=np.float64)
+    users = user_import.shape[1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # total production and consumption
+        total_prod = _ordered_sum(user_export)
+        total_use = _ordered_sum(user_import)
+        eigen_v = total_prod - ew_export
+
+        # energy sold and bought via EW and sold internally
+        prod_share = user_export / total_prod[:, None]
+        sold = ew_export[:, None] * prod_share
+        bought = ew_import[:, None] * (user_import / total_use[:, None])
+        sold_int = eigen_v[:, None] * prod_share
+
+        # internal production of all other users, [t, j] excludes user j itself. Every
+        # column is summed left to right like the single sums of each user, T x N only.
+        internal_fremd_produktion = np.zeros_like(sold_int)
+        for i in range(users):
+            internal_fremd_produktion[:, :i] += sold_int[:, i:i + 1]
+            internal_fremd_produktion[:, i + 1:] += sold_int[:, i:i + 1]
+
+        # energy bought internally, split up by the user it was bought from
+        bought_int = user_import - bought
+        bought_int_ratio = bought_int / internal_fremd_produktion
+        if pairwise:
+            bought_int_from = sold_int[:, :, None] * bought_int_ratio[:, None, :]
+            bought_int_from[:, np.arange(users), np.arange(users)] = 0
+
+        # meter error
+        energy_in = total_prod + ew_import
+        energy_out = total_use + ew_export
+
+    result = {
+        "totalProd_Wh": total_prod,
+        "totalUse_Wh": total_use,
+        "eigenV_Wh": eigen_v,
+        "EnSold_Wh": sold,
+        "EnBought_Wh": bought,
+        "EnSoldInt_Wh": sold_int,
+        "EnBoughtInt_Wh": bought_int,
+        "EnBoughtIntTotal_Wh": transfer_totals(sold_int, bought_int_ratio),
+        "EnergyIn_Wh": energy_in,
+        "EnergyOut_Wh": energy_out,
+        "EnergyError_Wh": energy_in - energy_out,
+    }
+    if pairwise:
+        result["EnBoughtIntFrom_Wh"] = bought_int_from
+
+    return result
+
+
+def billing_columns(result: dict, user_list: List[str]):
+    """Name the per interval arrays of calculate_billing with the column names used
+    in the billing DataFrame, in the column order of the DataFrame. The pairwise
+    columns are only included if calculate_billing returned them.
+
+    Args:
+        result (dict): result of calculate_billing
+        user_list (List[str]): names of the user meters in matrix column order
+
+    Returns:
+        dict: column name to 1D array
+    """
+    columns = {
+        "totalProd_Wh": result["totalProd_Wh"],
+        "totalUse_Wh": result["totalUse_Wh"],
+        "eigenV_Wh": result["eigenV_Wh"],
+    }
+    for i, meter in enumerate(user_list):
+        columns[f"{meter}_EnSold_Wh"] = result["EnSold_Wh"][:, i]
+        columns[f"{meter}_EnBought_Wh"] = result["EnBought_Wh"][:, i]
+        columns[f"{meter}_EnSoldInt_Wh"] = result["EnSoldInt_Wh"][:, i]
+    for j, meter in enumerate(user_list):
+        columns[f"{meter}_EnBoughtInt_Wh"] = result["EnBoughtInt_Wh"][:, j]
+        if "EnBoughtIntFrom_Wh" not in result:
+            continue
+        for i, meter2 in enumerate(user_list):
+            if not (meter == meter2):
+                columns[f"{meter2}_2_{meter}_EnBoughtInt_Wh"] = result["EnBoughtIntFrom_Wh"][:, i, j]
+    for name in ["EnergyIn_Wh", "EnergyOut_Wh", "EnergyError_Wh"]:
+        columns[name] = result[name]
+
+    return columns
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+# Compact representation of energy frames
+#
+# Meter deltas ("<meter>_Import_Wh", "<meter>_Export_Wh") are whole Wh and are kept exact
+# as nullable integers of the smallest width that holds all values of the column, missing
+# values stay <NA>. Derived billing quantities are float32. They are calculated in float64
+# and rounded once, so every value x32 of a float64 result x64 holds
+#
+#     |x32 - x64| <= FLOAT32_ERROR * |x64|,    FLOAT32_ERROR = 2**-24 (about 6e-8)
+#
+# and a total summed in float64 over the float32 values holds
+#
+#     |total32 - total64| <= FLOAT32_ERROR * sum(|x64|)
+#
+# which is about 0.6 mWh on 10 MWh for the non-negative quantities.
+#
+# The timestamps of an aligned frame lie on a regular grid. A compact frame has no
+# "Timestamp" column, attrs["timeGrid"] holds the first timestamp and the interval instead.
+
+FLOAT32_ERROR = 2.0**-24
+
+INTEGER_TYPES = ["UInt8", "Int8", "UInt16", "Int16", "UInt32", "Int32", "Int64"]
+
+
+def smallest_integer_dtype(values: np.ndarray):
+    """Smallest nullable integer dtype that holds all values
+
+    Args:
+        values (np.ndarray): whole numbers, NaN for missing values
+
+    Returns:
+        str: pandas dtype name like "UInt16"
+    """
+    finite = values[~np.isnan(values)]
+    if len(finite) == 0:
+        return INTEGER_TYPES[0]
+    low, high = finite.min(), finite.max()
+    for name in INTEGER_TYPES:
+        limits = np.iinfo(name.lower())
+        if limits.min <= low and high <= limits.max:
+            return name
+    raise OverflowError(f"Values from {low} to {high} don't fit in 64 bit.")
+
+
+def compact_wh(values: np.ndarray):
+    """whole Wh values as nullable integer array of the smallest width"""
+    values = np.asarray(values, dtype=float)
+    return pd.array(values, dtype=smallest_integer_dtype(values))
+
+
+def is_compact(energyDF: pd.DataFrame):
+    """True if the frame has an implicit time grid instead of a "Timestamp" column"""
+    return "timeGrid" in energyDF.attrs and "Timestamp" not in energyDF.columns
+
+
+def compact_energy(energyDF: pd.DataFrame, interval: int = 15 * 60):
+    """
+    Converts an energy frame on a regular time grid to the compact representation. Meter
+    deltas become the smallest nullable integers, float64 billing columns become float32
+    and the "Timestamp" column is replaced by attrs["timeGrid"].
+
+    Args:
+        energyDF (pd.DataFrame): energy data as returned by getEnergyData or calculate
+        interval (int, optional): interval of the time grid in seconds. Defaults to 15 min.
+
+    Raises:
+        ValueError: if the timestamps are not on a regular grid of the interval
+
+    Returns:
+        pd.DataFrame: compact energy data
+    """
+    if is_compact(energyDF):
+        return energyDF
+
+    columns = {}
+    for name in energyDF.columns:
+        if name == "Timestamp":
+            continue
+        values = energyDF[name]
+        if name.endswith("_Import_Wh") or name.endswith("_Export_Wh"):
+            columns[name] = compact_wh(values.to_numpy(dtype=float))
+        elif values.dtype == np.float64:
+            columns[name] = values.to_numpy(dtype=np.float32)
+        else:
+            columns[name] = values.array
+    compactDF = pd.DataFrame(columns, index=pd.RangeIndex(len(energyDF)))
+
+    attrs = dict(energyDF.attrs)
+    if "Timestamp" in energyDF.columns and len(energyDF) > 0:
+        stamps = pd.DatetimeIndex(energyDF["Timestamp"])
+        steps = np.diff(stamps.as_unit("s").asi8)
+        if not (steps == interval).all():
+            raise ValueError("The timestamps are not on a regular time grid.")
+        attrs["timeGrid"] = {"start": stamps[0], "interval": interval}
+    elif "Timestamp" in energyDF.columns:
+        attrs["timeGrid"] = {"start": None, "interval": interval}
+    compactDF.attrs = attrs
+
+    return compactDF
+
+
+def timestamps(energyDF: pd.DataFrame):
+    """
+    Timestamps of an energy frame, from the "Timestamp" column or the implicit time grid.
+
+    Args:
+        energyDF (pd.DataFrame): energy data, compact or not
+
+    Returns:
+        pd.DatetimeIndex: timestamp of every row
+    """
+    if "Timestamp" in energyDF.columns:
+        return pd.DatetimeIndex(energyDF["Timestamp"])
+    grid = energyDF.attrs["timeGrid"]
+    if len(energyDF) == 0:
+        return pd.DatetimeIndex([])
+    return pd.date_range(grid["start"], periods=len(energyDF), freq=pd.Timedelta(seconds=grid["interval"]))
+
+
+def expand_energy(energyDF: pd.DataFrame):
+    """
+    Converts a compact energy frame back to float64 columns with a "Timestamp" column,
+    e.g. for the CSV export.
+
+    Args:
+        energyDF (pd.DataFrame): compact energy data
+
+    Returns:
+        pd.DataFrame: energy data with float64 columns
+    """
+    if not is_compact(energyDF):
+        return energyDF
+
+    expanded = pd.DataFrame(
+        {name: energyDF[name].to_numpy(dtype=float) for name in energyDF.columns},
+        index=energyDF.index,
+    )
+    expanded.insert(0, "Timestamp", timestamps(energyDF))
+    expanded.attrs = {key: value for key, value in energyDF.attrs.items() if key != "timeGrid"}
+
+    return expanded
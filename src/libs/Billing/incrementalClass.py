@@ -0,0 +1,117 @@
+import json
+import os
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from libs.Billing.summaryClass import BillingSummary
+
+
+class IncrementalBilling:
+    def __init__(self, userMeter_list: List[str], combine_pairs: Optional[List[Tuple[str, str]]] = None):
+        """Running totals of a billing period that grows at its end. Every interval is
+        billed on its own, so new intervals are billed without the ones before them
+        and their totals are added to the totals so far. The last reading is kept, the
+        energy of the first new interval is its difference to it.
+
+        Args:
+            userMeter_list (List[str]): names of the user meters
+            combine_pairs (List[Tuple[str, str]], optional): (importMeter, exportMeter) pairs
+                combined before the billing
+        """
+        self.users = list(userMeter_list)
+        self.combine_pairs = [tuple(pair) for pair in combine_pairs or []]
+        self.summary: Optional[BillingSummary] = None
+        self.last_reading: Optional[pd.DataFrame] = None
+
+    @property
+    def last_time(self):
+        """timestamp of the last billed reading, None before the first update"""
+        if self.last_reading is None:
+            return None
+        return self.last_reading["Timestamp"].iloc[0]
+
+    def energy(self, readings: pd.DataFrame):
+        """
+        Energy of the intervals after the last reading. Readings up to the last reading
+        are skipped, the newest reading of all meters becomes the last reading. Newer
+        readings some meter has no value for yet are left for a later update, like the
+        data a meter has not logged yet.
+
+        Args:
+            readings (pd.DataFrame): cumulative meter readings as returned by getMeterReadings
+
+        Returns:
+            pd.DataFrame: energy data of the new intervals, like getEnergyData
+        """
+        if self.last_reading is not None:
+            readings = readings[readings["Timestamp"] > self.last_time]
+        # a reading with missing values would lose the energy up to the next one
+        complete = np.flatnonzero(readings.drop(columns="Timestamp").notna().all(axis=1).to_numpy())
+        if len(complete) == 0:
+            return readings.iloc[:0]
+        readings = readings.iloc[:complete[-1] + 1]
+        if self.last_reading is not None:
+            readings = pd.concat([self.last_reading, readings], ignore_index=True)
+
+        energyDF = readings.set_index("Timestamp").diff().reset_index()
+        if self.last_reading is not None:
+            energyDF = energyDF.iloc[1:].reset_index(drop=True)
+        self.last_reading = readings.iloc[[-1]].reset_index(drop=True)
+
+        return energyDF
+
+    def add(self, energyDF: pd.DataFrame):
+        """
+        Add the totals of billed intervals to the running totals
+
+        Args:
+            energyDF (pd.DataFrame): output of calculate for the intervals returned by energy
+
+        Returns:
+            BillingSummary: totals of the added intervals
+        """
+        summary = BillingSummary.from_frame(energyDF, self.users)
+        self.summary = summary if self.summary is None else self.summary + summary
+        return summary
+
+    def save(self, file_name: str):
+        """write the running totals and the last reading to a JSON file"""
+        os.makedirs(os.path.dirname(str(file_name)) or ".", exist_ok=True)
+        state = {
+            "users": self.users,
+            "combine_pairs": [list(pair) for pair in self.combine_pairs],
+            "summary": None if self.summary is None else self.summary.to_dict(),
+            "last_reading": None,
+        }
+        if self.last_reading is not None:
+            reading = self.last_reading.iloc[0]
+            state["last_reading"] = {
+                column: (value.isoformat() if column == "Timestamp" else (None if pd.isna(value) else float(value)))
+                for column, value in reading.items()
+            }
+        with open(file_name, "w") as file:
+            json.dump(state, file, indent=4)
+
+    @classmethod
+    def load(cls, file_name: str):
+        """
+        Read a state written by save
+
+        Args:
+            file_name (str): path of the JSON file
+
+        Returns:
+            IncrementalBilling: the running totals
+        """
+        with open(file_name, "r") as file:
+            state = json.load(file)
+        billing = cls(state["users"], state["combine_pairs"])
+        if state["summary"] is not None:
+            billing.summary = BillingSummary.from_dict(state["summary"])
+        if state["last_reading"] is not None:
+            reading = {
+                column: [pd.Timestamp(value) if column == "Timestamp" else (np.nan if value is None else value)]
+                for column, value in state["last_reading"].items()
+            }
+            billing.last_reading = pd.DataFrame(reading)
+        return billing
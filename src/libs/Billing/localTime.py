@@ -0,0 +1,60 @@
+import pandas as pd
+
+# The meters log naive UTC timestamps. Everything a user of the ZEV sees or enters, like
+# the tariff windows, holidays, price periods, days and months of the statements and the
+# dates of a billing period, is in the local time of the ZEV, confData["timezone"].
+
+DEFAULT_TIMEZONE = "Europe/Zurich"
+
+
+def local_times(times, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Local wall clock times of naive UTC timestamps
+
+    Args:
+        times: naive UTC timestamps, anything pd.DatetimeIndex accepts
+        timezone (str, optional): name of the local timezone. Defaults to "Europe/Zurich".
+
+    Returns:
+        pd.DatetimeIndex: naive local times
+    """
+    return pd.DatetimeIndex(times).tz_localize("UTC").tz_convert(timezone).tz_localize(None)
+
+
+
+def utc_times(times, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Naive UTC timestamps of local wall clock times, like the meter timestamps. A local time
+    skipped by the change to summer time is moved forward to the first valid time.
+
+    Args:
+        times: naive local times, anything pd.DatetimeIndex accepts
+        timezone (str, optional): name of the local timezone. Defaults to "Europe/Zurich".
+
+    Raises:
+        ValueError: if a local time is ambiguous, in the hour repeated by the change back
+
+    Returns:
+        pd.DatetimeIndex: naive UTC timestamps
+    """
+    local = pd.DatetimeIndex(times).tz_localize(timezone, nonexistent="shift_forward")
+    return local.tz_convert("UTC").tz_localize(None)
+
+
+def epoch_time(time, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Epoch seconds of a local time, like a date entered by a user of the ZEV
+
+    Args:
+        time: local time, anything pd.Timestamp accepts. A time with a zone is converted.
+        timezone (str, optional): name of the local timezone. Defaults to "Europe/Zurich".
+
+    Returns:
+        float: time in epoch seconds
+    """
+    time = pd.Timestamp(time)
+    if time.tzinfo is None:
+        time = utc_times([time], timezone)[0]
+    else:
+        time = time.tz_convert("UTC").tz_localize(None)
+    return time.value / 10**9
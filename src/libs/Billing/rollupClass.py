@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pandas as pd
+from libs.Billing.compact import timestamps
+from libs.Billing.localTime import DEFAULT_TIMEZONE, local_times, utc_times
+
+
+class RollupIndex:
+    def __init__(self, energyDF: pd.DataFrame, interval: int = 15 * 60, timezone: str = DEFAULT_TIMEZONE):
+        """Cumulative sums of all energy and billing columns, built once from the output
+        of calculate. The total of any period is the difference of two prefix sums.
+        Prefix sums are kept per interval, and at day and month boundaries for statements.
+        The timestamps are UTC, the days and months are the local ones of the ZEV.
+
+        A row with timestamp t holds the energy of the interval ending at t, so the
+        period [start, stop) contains the rows with start < t <= stop. Like pandas sums,
+        NaN values count as zero.
+
+        Args:
+            energyDF (pd.DataFrame): output of calculate with a "Timestamp" column, or a
+                compact frame with attrs["timeGrid"]
+            interval (int, optional): interval of the time grid in seconds. Defaults to 15 min.
+            timezone (str, optional): local timezone of the days and months. Defaults to
+                "Europe/Zurich".
+        """
+        self.columns = [column for column in energyDF.columns if column != "Timestamp"]
+        self.interval = pd.Timedelta(seconds=interval)
+        self.timezone = timezone
+        self.timestamps = timestamps(energyDF).as_unit("ns")
+
+        values = np.nan_to_num(energyDF[self.columns].to_numpy(dtype=float), nan=0.0)
+        self.prefix = np.zeros((len(values) + 1, len(self.columns)))
+        np.cumsum(values, axis=0, out=self.prefix[1:])
+
+        # on a regular grid, the position of a time is calculated instead of searched
+        steps = np.diff(self.timestamps.asi8)
+        self.regular = len(steps) == 0 or bool((steps == self.interval.value).all())
+
+        # local midnights, a day with a change of summer time has 23 or 25 hours
+        if len(self.timestamps) > 0:
+            first, last = local_times(self.timestamps[[0, -1]], timezone)
+            self.days = pd.date_range(first.normalize(), last.normalize() + pd.Timedelta(days=1), freq="D")
+            self.months = pd.date_range(first.normalize().replace(day=1), (last + pd.offsets.MonthBegin(1)).normalize(), freq="MS")
+        else:
+            self.days = self.months = pd.DatetimeIndex([])
+        self.day_prefix = self.prefix[self._positions(utc_times(self.days, timezone).as_unit("ns"))]
+        self.month_prefix = self.prefix[self._positions(utc_times(self.months, timezone).as_unit("ns"))]
+
+    def _positions(self, times: pd.DatetimeIndex):
+        """number of rows with a timestamp <= time, for many times"""
+        return self.timestamps.searchsorted(times, side="right")
+
+    def _position(self, time):
+        """number of rows with a timestamp <= time"""
+        time = pd.Timestamp(time)
+        if not self.regular or len(self.timestamps) == 0:
+            return int(self.timestamps.searchsorted(time, side="right"))
+        steps = (time - self.timestamps[0]) // self.interval + 1
+        return int(min(max(steps, 0), len(self.timestamps)))
+
+    def total(self, start, stop):
+        """Sum all columns over a period
+
+        Args:
+            start: start of the period in UTC, anything pd.Timestamp accepts
+            stop: end of the period in UTC, anything pd.Timestamp accepts
+
+        Returns:
+            pd.Series: totals of all columns
+        """
+        return pd.Series(self.prefix[self._position(stop)] - self.prefix[self._position(start)], index=self.columns)
+
+    def daily(self):
+        """Totals of every local day
+
+        Returns:
+            pd.DataFrame: one row per day, indexed by the local date
+        """
+        return pd.DataFrame(np.diff(self.day_prefix, axis=0), index=self.days[:-1].date, columns=self.columns)
+
+    def monthly(self, first_month=None, last_month=None):
+        """Totals of every local month in a range of months
+
+        Args:
+            first_month (optional): first month of the statement like "2024-01". Defaults to the first month.
+            last_month (optional): last month of the statement, included. Defaults to the last month.
+
+        Returns:
+            pd.DataFrame: one row per month, indexed by the month
+        """
+        months = pd.DataFrame(
+            np.diff(self.month_prefix, axis=0),
+            index=self.months[:-1].to_period("M"),
+            columns=self.columns,
+        )
+        if first_month is not None:
+            months = months[months.index >= pd.Period(first_month, "M")]
+        if last_month is not None:
+            months = months[months.index <= pd.Period(last_month, "M")]
+        return months
+
+    def save(self, file_name: str):
+        """write the rollups to a .npz file"""
+        os.makedirs(os.path.dirname(str(file_name)) or ".", exist_ok=True)
+        np.savez(
+            file_name,
+            columns=np.array(self.columns),
+            timestamps=self.timestamps.asi8,
+            interval=self.interval.value,
+            timezone=self.timezone,
+            prefix=self.prefix,
+        )
+
+    @classmethod
+    def load(cls, file_name: str):
+        """read rollups written by save
+
+        Args:
+            file_name (str): path of the .npz file
+
+        Returns:
+            RollupIndex: the loaded rollups
+        """
+        with np.load(file_name) as data:
+            columns = [str(column) for column in data["columns"]]
+            energyDF = pd.DataFrame(np.diff(data["prefix"], axis=0), columns=columns)
+            energyDF.insert(0, "Timestamp", pd.DatetimeIndex(data["timestamps"]))
+            interval = int(data["interval"]) // 10**9
+            timezone = str(data["timezone"])
+        return cls(energyDF, interval, timezone)
@@ -0,0 +1,191 @@
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class BillingSummary:
+    """Totals of a billing period. All values in Wh.
+
+    Attributes:
+        users (List[str]): names of the user meters
+        user_totals (pd.DataFrame): one row per user with the columns
+            "EnBought_Wh", "EnSold_Wh", "EnBoughtInt_Wh" and "EnSoldInt_Wh"
+        transfer (pd.DataFrame): energy users bought from each other, rows: seller, columns: buyer
+        energy_error (float): total meter error
+    """
+
+    users: List[str]
+    user_totals: pd.DataFrame
+    transfer: pd.DataFrame
+    energy_error: float
+
+    QUANTITIES = ["EnBought_Wh", "EnSold_Wh", "EnBoughtInt_Wh", "EnSoldInt_Wh"]
+
+    @classmethod
+    def from_frame(cls, energyDF: pd.DataFrame, userMeter_list: List[str]):
+        """Reduce the output of calculate to its totals in one pass over all columns
+
+        Args:
+            energyDF (pd.DataFrame): output of calculate
+            userMeter_list (List[str]): names of the user meters
+
+        Returns:
+            BillingSummary: totals of the period
+        """
+        users = list(userMeter_list)
+        pairwise = "transferMatrix_Wh" not in energyDF.attrs
+        columns = [f"{user}_{quantity}" for user in users for quantity in cls.QUANTITIES] + ["EnergyError_Wh"]
+        if pairwise:
+            columns += [f"{seller}_2_{buyer}_EnBoughtInt_Wh" for seller in users for buyer in users if seller != buyer]
+
+        # all columns are summed at once, compact float32 columns are summed in float64
+        sums = energyDF[columns].sum().astype(np.float64)
+        for column in columns:
+            if energyDF[column].dtype == np.float32:
+                sums[column] = energyDF[column].astype(np.float64).sum()
+
+        user_totals = pd.DataFrame(
+            [[sums[f"{user}_{quantity}"] for quantity in cls.QUANTITIES] for user in users],
+            index=users,
+            columns=cls.QUANTITIES,
+        )
+        transfer = pd.DataFrame(0.0, index=users, columns=users)
+        for seller in users:
+            for buyer in users:
+                if seller == buyer:
+                    continue
+                if pairwise:
+                    transfer.loc[seller, buyer] = sums[f"{seller}_2_{buyer}_EnBoughtInt_Wh"]
+                else:
+                    transfer.loc[seller, buyer] = energyDF.attrs["transferMatrix_Wh"][seller][buyer]
+
+        return cls(users, user_totals, transfer, float(sums["EnergyError_Wh"]))
+
+    def __add__(self, other: "BillingSummary"):
+        """totals of two consecutive periods"""
+        return BillingSummary(
+            self.users,
+            self.user_totals + other.user_totals,
+            self.transfer + other.transfer,
+            self.energy_error + other.energy_error,
+        )
+
+    @property
+    def ew_import(self):
+        """energy bought from the energy provider (EW) by all users"""
+        return float(self.user_totals["EnBought_Wh"].sum())
+
+    @property
+    def ew_export(self):
+        """energy sold to the energy provider (EW) by all users"""
+        return float(self.user_totals["EnSold_Wh"].sum())
+
+    def render_text(self):
+        """Render the summary as the text shown in the console
+
+        Returns:
+            str: the report
+        """
+        lines = []
+        kWh = self.user_totals / 1000
+
+        # individual user stats
+        for user in self.users:
+            lines.append(f" {user}:")
+            data = kWh.loc[user, "EnBought_Wh"]
+            if data > 0:
+                lines.append(f"       EW Bezug: {data:.3f} kWh")
+            data = kWh.loc[user, "EnSold_Wh"]
+            if data > 0:
+                lines.append(f"     EW Verkauf: {data:.3f} kWh")
+            data = kWh.loc[user, "EnBoughtInt_Wh"]
+            if data > 0:
+                lines.append(f"      ZEV Bezug: {data:.3f} kWh")
+            for user2 in self.users:
+                if not (user == user2):
+                    data = self.transfer.loc[user2, user] / 1000
+                    if data > 0:
+                        lines.append(f"         - von {user2}: {data:.3f} kWh")
+            data = kWh.loc[user, "EnSoldInt_Wh"]
+            if data > 0:
+                lines.append(f"     ZEV Einsp.: {data:.3f} kWh")
+            lines.append("")
+
+        # overall stats
+        lines.append(" Stats:")
+        data = sum(kWh.loc[user, "EnBought_Wh"] for user in self.users)
+        if data > 0:
+            lines.append(f"       EW Bezug: {data:.3f} kWh")
+        data = sum(kWh.loc[user, "EnSold_Wh"] for user in self.users)
+        if data > 0:
+            lines.append(f"      EW Einsp.: {data:.3f} kWh")
+        data = self.energy_error / 1000
+        if data > 0:
+            lines.append(f"    Meter Error: {data:.3f} kWh")
+        for user in self.users:
+            lines.append(f"          {user}:")
+            data = kWh.loc[user, "EnBought_Wh"] + kWh.loc[user, "EnBoughtInt_Wh"]
+            if data > 0:
+                lines.append(f"               used: {data:.3f} kWh")
+            data = kWh.loc[user, "EnSold_Wh"] + kWh.loc[user, "EnSoldInt_Wh"]
+            if data > 0:
+                lines.append(f"            prodced: {data:.3f} kWh")
+
+        return "\n".join(lines)
+
+    def to_dict(self):
+        """Summary as plain dict, e.g. for JSON
+
+        Returns:
+            dict: per user totals, transfer matrix, EW totals and meter error in Wh
+        """
+        return {
+            "users": {
+                user: {quantity: float(value) for quantity, value in self.user_totals.loc[user].items()}
+                for user in self.users
+            },
+            "transfer_Wh": {
+                seller: {buyer: float(self.transfer.loc[seller, buyer]) for buyer in self.users if buyer != seller}
+                for seller in self.users
+            },
+            "ewImport_Wh": self.ew_import,
+            "ewExport_Wh": self.ew_export,
+            "energyError_Wh": self.energy_error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Summary from the plain dict of to_dict
+
+        Args:
+            data (dict): summary as returned by to_dict
+
+        Returns:
+            BillingSummary: the summary
+        """
+        users = list(data["users"])
+        user_totals = pd.DataFrame(
+            [[data["users"][user][quantity] for quantity in cls.QUANTITIES] for user in users],
+            index=users,
+            columns=cls.QUANTITIES,
+            dtype=float,
+        )
+        transfer = pd.DataFrame(0.0, index=users, columns=users)
+        for seller, bought in data["transfer_Wh"].items():
+            for buyer, value in bought.items():
+                transfer.loc[seller, buyer] = value
+        return cls(users, user_totals, transfer, float(data["energyError_Wh"]))
+
+    def to_csv(self, file_name: str):
+        """Write the per user totals and the energy bought from every other user
+
+        Args:
+            file_name (str): path of the CSV file
+        """
+        table = self.user_totals.copy()
+        for seller in self.users:
+            table[f"EnBoughtIntFrom_{seller}_Wh"] = self.transfer.loc[seller]
+        table.index.name = "User"
+        table.to_csv(file_name, sep=";")
@@ -0,0 +1,185 @@
+from typing import List
+import numpy as np
+import pandas as pd
+from libs.Billing.compact import timestamps
+from libs.Billing.localTime import DEFAULT_TIMEZONE, local_times
+from libs.Billing.summaryClass import BillingSummary
+
+
+class Tariff:
+    QUANTITIES = BillingSummary.QUANTITIES
+
+    def __init__(
+        self,
+        windows: List[dict],
+        prices: List[dict],
+        default_slot: str = "NT",
+        holidays: List[str] = (),
+        interval: int = 15 * 60,
+        timezone: str = DEFAULT_TIMEZONE,
+    ):
+        """Time of use tariff with price periods. Every interval belongs to a tariff slot
+        like "HT" or "NT", looked up in a table of weekday and interval of the day, and to the
+        price period it starts in. A price is set per period, slot and billing quantity.
+
+        A row with timestamp t holds the energy of the interval ending at t, the interval
+        is priced by its start t - interval. The timestamps are UTC, the windows, holidays
+        and price periods are in local time and the interval start is looked up in local time.
+
+        Args:
+            windows (List[dict]): slot windows like {"slot": "HT", "days": [0, 1, 2, 3, 4],
+                "start": "07:00", "stop": "20:00"}, days 0 = monday. Later windows win.
+            prices (List[dict]): price periods like {"from": "2025-01-01", "EnBought":
+                {"HT": 0.32, "NT": 0.25}, "EnSold": 0.09, "EnBoughtInt": 0.22, "EnSoldInt": 0.22}
+                in CHF/kWh, a single price counts for all slots
+            default_slot (str, optional): slot outside of all windows. Defaults to "NT".
+            holidays (List[str], optional): dates like "2025-12-25" priced like a sunday
+            interval (int, optional): interval of the time grid in seconds, a day has to be a
+                whole number of intervals. Defaults to 15 min.
+            timezone (str, optional): local timezone of the windows, holidays and price
+                periods. Defaults to "Europe/Zurich".
+
+        Raises:
+            ValueError: if the interval, a window or a price period is invalid
+        """
+        if interval < 1 or 86400 % interval != 0:
+            raise ValueError(f"A day has to be a whole number of intervals. ({interval} s)")
+        self.interval = interval
+        self.timezone = timezone
+        self.slots_per_day = 86400 // interval
+        self.slots = [default_slot] + sorted({window["slot"] for window in windows} - {default_slot})
+        slot_number = {slot: number for number, slot in enumerate(self.slots)}
+
+        # slot of every interval of the week
+        self.slot_table = np.zeros((7, self.slots_per_day), dtype=np.int64)
+        for window in windows:
+            first, last = self._interval_of_day(window["start"]), self._interval_of_day(window["stop"])
+            if not first < last:
+                raise ValueError(f"The window {window} has to start before it stops.")
+            for day in window["days"]:
+                self.slot_table[day, first:last] = slot_number[window["slot"]]
+
+        self.holidays = np.array(sorted(pd.Timestamp(day).value // 86400_000_000_000 for day in holidays), dtype=np.int64)
+
+        # prices in CHF/Wh as (period, slot, quantity)
+        if not prices:
+            raise ValueError("At least one price period has to be given.")
+        prices = sorted(prices, key=lambda period: pd.Timestamp(period["from"]))
+        self.period_starts = pd.DatetimeIndex([pd.Timestamp(period["from"]) for period in prices]).as_unit("ns")
+        self.prices = np.zeros((len(prices), len(self.slots), len(self.QUANTITIES)))
+        for number, period in enumerate(prices):
+            for column, quantity in enumerate(self.QUANTITIES):
+                price = period.get(quantity.removesuffix("_Wh"), 0.0)
+                if isinstance(price, dict):
+                    for slot, value in price.items():
+                        if slot not in slot_number:
+                            raise ValueError(f"Unknown tariff slot \"{slot}\" in the price period of {period['from']}.")
+                        self.prices[number, slot_number[slot], column] = value / 1000
+                else:
+                    self.prices[number, :, column] = price / 1000
+
+    @classmethod
+    def from_config(cls, config: dict, timezone: str = DEFAULT_TIMEZONE):
+        """Tariff from a configuration like confData["tariff"], with the keys "windows",
+        "prices" and optionally "default_slot", "holidays" and "interval". The timezone is
+        the one of the ZEV, confData["timezone"].
+        """
+        return cls(
+            config.get("windows", []),
+            config["prices"],
+            config.get("default_slot", "NT"),
+            config.get("holidays", []),
+            config.get("interval", 15 * 60),
+            timezone,
+        )
+
+    def _interval_of_day(self, time: str):
+        """interval of the day a time like "07:00" falls in, "24:00" is the end of the day"""
+        hours, minutes = (int(part) for part in time.split(":"))
+        return (hours * 60 + minutes) * 60 // self.interval
+
+    def slot_index(self, times: pd.DatetimeIndex):
+        """
+        Price key of every interval: period * number of slots + slot. Only integer
+        arithmetic on the timestamps and table lookups, no per row Python.
+
+        Args:
+            times (pd.DatetimeIndex): UTC timestamps of the rows, the end of every interval
+
+        Returns:
+            np.ndarray: price key of every interval, -1 before the first price period
+        """
+        # local wall clock time of the interval start
+        start = local_times(pd.DatetimeIndex(times) - pd.Timedelta(seconds=self.interval), self.timezone)
+        start = start.as_unit("ns").asi8
+        day, time_of_day = np.divmod(start, 86400 * 10**9)
+        # 1970-01-01 was a thursday
+        weekday = (day + 3) % 7
+        if len(self.holidays) > 0:
+            weekday = np.where(np.isin(day, self.holidays), 6, weekday)
+        slot = self.slot_table[weekday, time_of_day // (self.interval * 10**9)]
+
+        period = np.searchsorted(self.period_starts.asi8, start, side="right") - 1
+
+        return np.where(period < 0, -1, period * len(self.slots) + slot)
+
+    def invoice(self, energyDF: pd.DataFrame, userMeter_list: List[str]):
+        """
+        Energy and amount of every user per price period and slot. The energy of all
+        intervals with the same price is summed first, then multiplied with the price.
+
+        Args:
+            energyDF (pd.DataFrame): output of calculate, also compact
+            userMeter_list (List[str]): names of the user meters
+
+        Raises:
+            ValueError: if there is energy in an interval before the first price period
+
+        Returns:
+            pd.DataFrame: one row per user, price period and slot, indexed by "User", "From"
+                and "Slot", with the columns "<quantity>_Wh" and "<quantity>_CHF"
+        """
+        users = list(userMeter_list)
+        keys = self.slot_index(timestamps(energyDF))
+        key_count = len(self.period_starts) * len(self.slots)
+        # e.g. the empty first row of a period starting with the first price
+        before = keys < 0
+        keys = np.where(before, 0, keys)
+
+        # (user, quantity, key) energy in one pass over every column
+        energy = np.empty((len(users), len(self.QUANTITIES), key_count))
+        for row, user in enumerate(users):
+            for column, quantity in enumerate(self.QUANTITIES):
+                values = np.nan_to_num(energyDF[f"{user}_{quantity}"].to_numpy(dtype=np.float64), nan=0.0)
+                if values[before].any():
+                    raise ValueError(f"There is no price before {self.period_starts[0]}.")
+                energy[row, column] = np.bincount(keys, weights=values, minlength=key_count)
+        amounts = energy * self.prices.reshape(key_count, len(self.QUANTITIES)).T
+
+        index = pd.MultiIndex.from_product(
+            [users, self.period_starts, self.slots], names=["User", "From", "Slot"]
+        )
+        table = pd.DataFrame(
+            np.concatenate([energy, amounts], axis=1).transpose(0, 2, 1).reshape(len(index), -1),
+            index=index,
+            columns=self.QUANTITIES + [quantity.replace("_Wh", "_CHF") for quantity in self.QUANTITIES],
+        )
+        return table
+
+    def costs(self, energyDF: pd.DataFrame, userMeter_list: List[str]):
+        """
+        Amount of every user over the whole frame. "Total_CHF" is the amount a user pays,
+        the energy bought from the EW and from other users less the energy sold.
+
+        Args:
+            energyDF (pd.DataFrame): output of calculate, also compact
+            userMeter_list (List[str]): names of the user meters
+
+        Returns:
+            pd.DataFrame: one row per user with the columns "<quantity>_CHF" and "Total_CHF"
+        """
+        amounts = self.invoice(energyDF, userMeter_list).filter(like="_CHF").groupby(level="User", sort=False).sum()
+        amounts["Total_CHF"] = (
+            amounts["EnBought_CHF"] + amounts["EnBoughtInt_CHF"] - amounts["EnSold_CHF"] - amounts["EnSoldInt_CHF"]
+        )
+        return amounts
@@ -0,0 +1,170 @@
+import numpy as np
+from libs.Meter.meterClass import Meter
+from libs.Cache.meterStoreClass import MeterStore
+from libs.Metrics.metricsClass import metrics
+
+
+class MeterCache:
+    def __init__(self, meter: Meter, cache_dir: str = "cache"):
+        """Per meter cache that remembers which index intervals it already holds.
+        Requested ranges are served from the union of these intervals and only
+        the missing index gaps are downloaded from the meter.
+
+        Args:
+            meter (Meter): meter to cache, with the bulk read of Meter.read_index_range
+            cache_dir (str, optional): directory of the meter stores. Defaults to "cache".
+        """
+        self.meter = meter
+        self.log = meter.log
+        self.store = MeterStore(meter.name, cache_dir)
+
+        # cached entries tell the meter where its indexes are in time
+        self.meter.learn_index(*self.store.index_times())
+
+    @property
+    def intervals(self):
+        """index intervals held by the cache"""
+        return self.store.intervals
+
+    def missing_ranges(self, start_index: int, stop_index: int):
+        """calculate the index ranges which are not yet in the cache
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index
+
+        Returns:
+            [[start_index, stop_index]]: missing ranges, stop index included
+        """
+        missing = []
+        position = start_index
+        for start, stop in self.intervals:
+            if stop < position:
+                continue
+            if start > stop_index:
+                break
+            if start > position:
+                missing.append([position, start - 1])
+            position = max(position, stop + 1)
+        if position <= stop_index:
+            missing.append([position, stop_index])
+        return missing
+
+    def cached_index(self, start_epoch_time: int, stop_epoch_time: int):
+        """Indexes of a time range, if the cache alone holds all entries of it. The
+        entry after the stop time has to be cached as well, otherwise the meter may
+        have newer entries before the stop time.
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+
+        Returns:
+            Tuple[int, int]: start and stop index like meter.calc_index, None if the meter
+                has to be asked
+        """
+        indexes, times = self.store.index_times()
+        if len(times) < 2 or not (np.diff(times) >= 0).all():
+            return None
+        start = int(np.searchsorted(times, start_epoch_time, side="right")) - 1
+        stop = int(np.searchsorted(times, stop_epoch_time, side="right")) - 1
+        if start < 0 or stop + 1 >= len(indexes):
+            return None
+        start_index, stop_index = int(indexes[start]), int(indexes[stop])
+        if self.missing_ranges(start_index, int(indexes[stop + 1])):
+            return None
+        return start_index, stop_index
+
+    def cached_range(self, start_epoch_time: int, stop_epoch_time: int):
+        """Indexes of the cached entries of a time range, without asking the meter. Unlike
+        cached_index the range may be incomplete, e.g. if the newest entries are not
+        collected yet.
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+
+        Returns:
+            Tuple[int, int]: start and stop index, None if the cache has no entry in the range
+        """
+        indexes, times = self.store.index_times()
+        if len(times) == 0 or not (np.diff(times) >= 0).all():
+            return None
+        # the entry before the start time is needed for the difference of the first interval
+        start = max(int(np.searchsorted(times, start_epoch_time, side="right")) - 1, 0)
+        stop = int(np.searchsorted(times, stop_epoch_time, side="right")) - 1
+        if stop < start or times[stop] < start_epoch_time:
+            return None
+        return int(indexes[start]), int(indexes[stop])
+
+    def fetch(self, start_index: int, stop_index: int):
+        """Download all missing entries between two indexes and add them to the cache.
+        Every block is stored as soon as it arrives, so after a failed or canceled
+        fetch only the blocks still missing are downloaded again.
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index
+
+        Returns:
+            int: number of blocks read from the meter
+        """
+        # the meter can't deliver entries newer than its current index, or
+        # entries already overwritten in its ring buffer
+        start_index = max(start_index, self.meter.oldest_index)
+        stop_index = min(stop_index, self.meter.current_index)
+        missing = self.missing_ranges(start_index, stop_index)
+        if not missing:
+            return 0
+
+        block_count = 0
+        for gap in missing:
+            blocks_to_read = self.meter.split_index_range(gap[0], gap[1])
+            self.log.info(f" Reading missing range {gap[0]} to {gap[1]} in {len(blocks_to_read)} blocks.")
+            for block, new_data in zip(blocks_to_read, self.meter.read_blocks(blocks_to_read)):
+                self.store.append_arrays(new_data)
+                self.store.add_interval(block[0], block[1])
+                block_count += 1
+
+        return block_count
+
+    def read(self, start_epoch_time: int, stop_epoch_time: int, offline: bool = False):
+        """Read all entries in a range of epoch time. Data already in the cache is
+        reused, only missing entries are downloaded from the meter. A range held by
+        the cache is read without any request to the meter.
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+            offline (bool, optional): Only read the entries already in the cache, never
+                ask the meter. Defaults to False.
+
+        Returns:
+            pd.DataFrame: requested data as pandas DataFrame with the following columns:
+                - "Timestamp"
+                - f"{meter.name}_Import_Wh"
+                - f"{meter.name}_Export_Wh"
+        """
+        indexes = self.cached_index(start_epoch_time, stop_epoch_time)
+        if indexes is None and offline:
+            indexes = self.cached_range(start_epoch_time, stop_epoch_time)
+            if indexes is None:
+                self.log.info(" No cached data in the range.")
+                return self.store.empty_frame().reset_index(drop=True)
+        if indexes is not None:
+            start_index, stop_index = indexes
+            block_count = 0
+        else:
+            start_index, stop_index = self.meter.calc_index(start_epoch_time, stop_epoch_time)
+            with metrics.timer("cache_fetch_seconds", meter=self.meter.name):
+                block_count = self.fetch(start_index, stop_index)
+        if block_count == 0:
+            metrics.increment("cache_hits", meter=self.meter.name)
+            self.log.info(" Data read from cache.")
+        else:
+            metrics.increment("cache_misses", meter=self.meter.name)
+            metrics.increment("meter_blocks_read", block_count, meter=self.meter.name)
+            self.log.info(f" Data cached. {block_count} blocks read from meter.")
+
+        with metrics.timer("cache_read_seconds", meter=self.meter.name):
+            return self.store.read_range(start_index, stop_index).reset_index(drop=True)
@@ -0,0 +1,215 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+class MeterStore:
+    # fixed width little endian columns, one file per column
+    COLUMNS = ["Index", "Timestamp", "Import_Wh", "Export_Wh"]
+    DTYPE = np.dtype("<i8")
+
+    def __init__(self, name: str, cache_dir: str = "cache"):
+        """Columnar on-disk store for the time series of one meter. Every column is
+        a flat file of fixed width integers which is memory mapped for reading. The
+        records are kept sorted by index: records newer than the newest one are
+        appended to the end of the files, only a gap filled later rewrites them.
+
+        Args:
+            name (str): name of the meter, used for the column names of returned data
+            cache_dir (str, optional): directory of the cache files. Defaults to "cache".
+        """
+        self.name = name
+        self.directory = os.path.join(cache_dir, f"{name}_store.secret")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._columns = None
+        self.intervals = self._load_intervals()
+
+    def _path(self, column: str):
+        return os.path.join(self.directory, f"{column}.i8")
+
+    def _load_intervals(self):
+        try:
+            with open(os.path.join(self.directory, "intervals.json"), "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return []
+
+    def _save_intervals(self):
+        with open(os.path.join(self.directory, "intervals.json"), "w") as file:
+            json.dump(self.intervals, file)
+
+    def _open(self):
+        """memory map all columns
+
+        Raises:
+            ValueError: if the records on disk are not sorted by index
+        """
+        if self._columns is not None:
+            return
+
+        # a write might have been interrupted, only rows present in all columns count
+        lengths = []
+        for column in self.COLUMNS:
+            try:
+                lengths.append(os.path.getsize(self._path(column)) // self.DTYPE.itemsize)
+            except OSError:
+                lengths.append(0)
+        rows = min(lengths)
+
+        self._columns = {}
+        for column in self.COLUMNS:
+            if rows == 0:
+                self._columns[column] = np.empty(0, dtype=self.DTYPE)
+            else:
+                self._columns[column] = np.memmap(self._path(column), dtype=self.DTYPE, mode="r", shape=(rows,))
+
+        # the lookups search the index, a read never rewrites the files
+        index = self._columns["Index"]
+        if rows > 1 and not bool(np.all(index[1:] > index[:-1])):
+            self._columns = None
+            raise ValueError(f"The store of meter \"{self.name}\" is not sorted by index. ({self.directory})")
+
+    def _write(self, values: dict):
+        """replace all column files, the files are written next to them and then renamed"""
+        self._columns = None
+        for column in self.COLUMNS:
+            with open(self._path(column) + ".tmp", "wb") as file:
+                file.write(np.ascontiguousarray(values[column], dtype=self.DTYPE).tobytes())
+        for column in self.COLUMNS:
+            os.replace(self._path(column) + ".tmp", self._path(column))
+
+    def empty_frame(self):
+        """
+        Data without records, with the columns of read_range
+
+        Returns:
+            pd.DataFrame: empty data with the columns "Timestamp", f"{name}_Import_Wh" and
+                f"{name}_Export_Wh", indexed by the meter internal index
+        """
+        return pd.DataFrame(
+            {
+                "Timestamp": pd.to_datetime(np.empty(0, dtype=self.DTYPE), unit="s"),
+                f"{self.name}_Import_Wh": np.empty(0, dtype=self.DTYPE),
+                f"{self.name}_Export_Wh": np.empty(0, dtype=self.DTYPE),
+            },
+            index=pd.Index(np.empty(0, dtype=self.DTYPE), name="Index"),
+        )
+
+    def __len__(self):
+        self._open()
+        return len(self._columns["Index"])
+
+    def append(self, data: pd.DataFrame):
+        """add records to the store. Records with an index already in the store
+        are skipped.
+
+        Args:
+            data (pd.DataFrame): data as returned by EmuMeter.read_single_block, indexed
+                by the meter internal index
+        """
+        if data.empty:
+            return
+
+        self.append_arrays({
+            "Index": data.index.to_numpy(dtype=self.DTYPE),
+            "Timestamp": data["Timestamp"].astype("datetime64[s]").astype("int64").to_numpy(),
+            "Import_Wh": data[f"{self.name}_Import_Wh"].to_numpy(),
+            "Export_Wh": data[f"{self.name}_Export_Wh"].to_numpy(),
+        })
+
+    def append_arrays(self, values: dict):
+        """add records given as arrays, like append. Records newer than the newest
+        record are appended, older ones are merged in and the columns rewritten.
+
+        Args:
+            values (dict): arrays of all COLUMNS as returned by Meter.read_index_range
+        """
+        index = np.asarray(values["Index"], dtype=self.DTYPE)
+        if len(index) == 0:
+            return
+
+        self._open()
+        stored = self._columns["Index"]
+        new = ~np.isin(index, stored)
+        if not new.any():
+            return
+        order = np.argsort(index[new], kind="stable")
+        records = {column: np.asarray(values[column], dtype=self.DTYPE)[new][order] for column in self.COLUMNS}
+
+        if len(stored) == 0 or records["Index"][0] > stored[-1]:
+            for column in self.COLUMNS:
+                with open(self._path(column), "ab") as file:
+                    file.write(np.ascontiguousarray(records[column]).tobytes())
+            # drop memory maps, they are reopened with the new length on the next read
+            self._columns = None
+        else:
+            # a gap filled later, merge the records in at their position
+            position = np.searchsorted(stored, records["Index"])
+            self._write({
+                column: np.insert(np.asarray(self._columns[column]), position, records[column])
+                for column in self.COLUMNS
+            })
+
+    @staticmethod
+    def merge_intervals(intervals: list):
+        """merge overlapping and adjacent index intervals
+
+        Args:
+            intervals ([[start_index, stop_index]]): intervals, stop index included
+
+        Returns:
+            [[start_index, stop_index]]: sorted and merged intervals
+        """
+        merged = []
+        for start, stop in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], stop)
+            else:
+                merged.append([start, stop])
+        return merged
+
+    def add_interval(self, start_index: int, stop_index: int):
+        """mark an index interval as held by the store
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index, included
+        """
+        self.intervals = self.merge_intervals(self.intervals + [[start_index, stop_index]])
+        self._save_intervals()
+
+    def index_times(self):
+        """Index and timestamp of all records, sorted by index
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: indexes and epoch times in seconds
+        """
+        self._open()
+        return np.asarray(self._columns["Index"]), np.asarray(self._columns["Timestamp"])
+
+    def read_range(self, start_index: int, stop_index: int):
+        """slice all records between two indexes without loading the rest of the store
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index, included
+
+        Returns:
+            pd.DataFrame: data with the columns "Timestamp", f"{name}_Import_Wh" and
+                f"{name}_Export_Wh", indexed by the meter internal index
+        """
+        self._open()
+        low = np.searchsorted(self._columns["Index"], start_index, side="left")
+        high = np.searchsorted(self._columns["Index"], stop_index, side="right")
+        rows = slice(low, high)
+
+        return pd.DataFrame(
+            {
+                "Timestamp": pd.to_datetime(np.asarray(self._columns["Timestamp"][rows]), unit="s"),
+                f"{self.name}_Import_Wh": np.asarray(self._columns["Import_Wh"][rows]),
+                f"{self.name}_Export_Wh": np.asarray(self._columns["Export_Wh"][rows]),
+            },
+            index=pd.Index(np.asarray(self._columns["Index"][rows]), name="Index"),
+        )
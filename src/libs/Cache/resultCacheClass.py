@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional, Tuple
+from libs.Metrics.metricsClass import metrics
+
+
+class ResultCache:
+    DEFAULT_MAX_BYTES = 64 * 2**20
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, name: str = "results"):
+        """Thread safe in memory LRU cache of computed results. Every entry is stored with
+        its size, the least recently used entries are evicted as soon as the total size
+        is above max_bytes. An entry can expire after a time to live, e.g. a result of a
+        period the meters are still logging.
+
+        Args:
+            max_bytes (int, optional): total size of all entries. Defaults to 64 MiB.
+            name (str, optional): name of the cache in the metrics. Defaults to "results".
+        """
+        self.max_bytes = max_bytes
+        self.name = name
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        # key -> (value, size, expiry in monotonic seconds or None), oldest first
+        self._entries = OrderedDict()
+        # one lock per key being computed, so a result is computed once for concurrent requests
+        self._computing = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: Hashable):
+        """
+        Cached value of a key, the entry becomes the most recently used one
+
+        Args:
+            key (Hashable): key of the entry
+
+        Returns:
+            object: the value, None if there is no valid entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] is not None and entry[2] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value, size: int, ttl: Optional[float] = None):
+        """
+        Store a value and evict the least recently used entries above max_bytes. A value
+        larger than max_bytes is not stored.
+
+        Args:
+            key (Hashable): key of the entry
+            value (object): value to store, not None
+            size (int): size of the value in bytes
+            ttl (float, optional): seconds until the entry expires. Defaults to never.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            expiry = None if ttl is None else time.monotonic() + ttl
+            self._entries[key] = (value, size, expiry)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                metrics.increment("result_cache_evictions", cache=self.name)
+
+    def _remove(self, key: Hashable):
+        """remove an entry, the lock has to be held"""
+        self.nbytes -= self._entries.pop(key)[1]
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Tuple[object, int, Optional[float]]]):
+        """
+        Cached value of a key, computed and stored if there is none. Concurrent calls
+        with the same key wait for the first one instead of computing the value again.
+
+        Args:
+            key (Hashable): key of the entry
+            compute (Callable): returns (value, size in bytes, ttl in seconds or None)
+
+        Returns:
+            object: the value
+        """
+        value = self.get(key)
+        if value is not None:
+            metrics.increment("result_cache_hits", cache=self.name)
+            return value
+
+        with self._lock:
+            key_lock = self._computing.setdefault(key, threading.Lock())
+        with key_lock:
+            try:
+                # computed while this call was waiting
+                value = self.get(key)
+                if value is not None:
+                    metrics.increment("result_cache_hits", cache=self.name)
+                    return value
+                metrics.increment("result_cache_misses", cache=self.name)
+                value, size, ttl = compute()
+                self.put(key, value, size, ttl)
+                return value
+            finally:
+                with self._lock:
+                    self._computing.pop(key, None)
+
+    def clear(self):
+        """remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def status(self):
+        """
+        Fill level of the cache
+
+        Returns:
+            dict: "entries", "bytes" and "max_bytes"
+        """
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.nbytes, "max_bytes": self.max_bytes}
@@ -1,28 +1,76 @@
 import pandas as pd
+import http.client
 import math
+import threading
+import time
+import urllib.error
+import numpy as np
 from libs.Meter.meterClass import Meter
+from libs.Meter.httpPoolClass import HttpPool
+from libs.Meter.indexMapClass import IndexMap
+from libs.Metrics.metricsClass import metrics
 
 class EmuMeter(Meter):
     LOG_INTERVAL = 15 * 60
     MAX_READBLOCK_SIZE = 3000
+    MAX_CONNECTIONS = 2
+    # the meter logs in UTC, all readers keep the timestamps as naive UTC
+    TIMESTAMP_FORMAT = "ISO8601"
+
+    # the log is a ring buffer of about 3 years, its index starts over at the capacity
+    INDEX_CAPACITY = 3 * 365 * 96
+
+    # seconds the newest entry of a host is reused before the meter is asked again
+    HANDSHAKE_TTL = 60
+
+    # a failed block is requested again after 1, 2, 4, ... seconds
+    BLOCK_RETRIES = 4
+    RETRY_DELAY = 1.0
+
+    # only these columns of the ~28 in the meter log are parsed
+    CSV_COLUMNS = {
+        "Timestamp": str,
+        "Index": "int64",
+        "Active Energy Import L123 T1 [Wh]": "int64",
+        "Active Energy Export L123 T1 [Wh]": "int64",
+    }
 
-    current_index = None
-    current_time = None
     read_block_size = None
 
+    # newest entry of every host as (monotonic time of the request, epoch time, raw index),
+    # shared by all meters of the session. The lock of a host is held during the request,
+    # so the meters of a host wait for one handshake instead of all asking.
+    _handshakes = {}
+    _handshake_locks = {}
+    _handshakes_lock = threading.Lock()
+
     def __init__(
         self,
         host: str,
         name: str,
         invert: bool = False,
         read_block_size: int = MAX_READBLOCK_SIZE,
+        max_connections: int = MAX_CONNECTIONS,
+        index_capacity: int = INDEX_CAPACITY,
+        block_retries: int = BLOCK_RETRIES,
+        retry_delay: float = RETRY_DELAY,
     ):
-        """Connect to a EMU Pro II power meter and set up all relevant Variables
+        """Set up a EMU Pro II power meter. No request is sent to the meter, the newest
+        entry is requested on first use, see handshake.
+
+        All indexes outside of the meter requests are unwrapped: they keep counting
+        where the meter index starts over at its capacity.
 
         Args:
             host (str): hostname like IP-address of power meter
             invert (bool, optional): set "True" if Import an export on this meter are reversed
             read_block_size (int, optional): Size of request blocks sent to meter. Max is 3000. Defaults to 3000.
+            max_connections (int, optional): Maximum of concurrent requests sent to the host. Defaults to 2.
+            index_capacity (int, optional): index at which the meter log starts over, None if it
+                never does. Defaults to 3 years of entries.
+            block_retries (int, optional): retries of a failed block request. Defaults to 4.
+            retry_delay (float, optional): seconds before the first retry, doubled for every
+                further retry. Defaults to 1.
 
         Raises:
             ValueError: if more than 3000 entries can be requested
@@ -40,194 +88,292 @@ class EmuMeter(Meter):
         if read_block_size != self.MAX_READBLOCK_SIZE:
             self.log.debug(f" Set read_block_size to {read_block_size}.")
         self.read_block_size = read_block_size
+        self.index_capacity = index_capacity
+        self.block_retries = block_retries
+        self.retry_delay = retry_delay
+        self.index_map = IndexMap(self.LOG_INTERVAL)
 
-        # get last log entry from meter
-        self.log.debug(" Loading newest meter datapoint and setup")
         self.host_name = host
-        url = "http://" + self.host_name + "/data/?last=1"
-        current_reading = pd.read_csv(url, delimiter=";")
-
-        # set up variables
-        current_reading["Timestamp"] = pd.to_datetime(current_reading["Timestamp"])
-        self.current_time = current_reading["Timestamp"][0].timestamp()
-        self.current_index = current_reading["Index"][0]
+        self.pool = HttpPool.for_host(self.host_name, max_connections)
+        with self._handshakes_lock:
+            self._handshake_lock = self._handshake_locks.setdefault(self.host_name, threading.Lock())
 
         self.log.debug("Meter setup complete.")
 
-    def read_single_block(self, start_index: int, stop_index: int):
-        """Just read Entries from, to a specific index. The meter it self can't
-        deliver more than 3000 entries at once and there are no negative idexes.
+    def handshake(self, max_age: float = None):
+        """Epoch time and raw index of the newest log entry. The answer of the meter is
+        shared by all meters of the host and reused for max_age seconds, so only one
+        request per host is sent within max_age, also if several meters ask at once.
 
         Args:
-            start_index (int): first meter internal index do be read
-            stop_index (int): last miter internal index to be read
-
-        Raises:
-            ValueError: if more than 3000 entries are requested
-            ValueError: if a negative index is requested
+            max_age (float, optional): maximum age of a reused answer in seconds. Defaults to HANDSHAKE_TTL.
 
         Returns:
-            pd.DataFrame: Dataframe of requested data
+            Tuple[float, int]: epoch time and raw meter index of the newest entry
         """
-        if stop_index < 0 or start_index < 0:
-            raise ValueError(
-                f"Negative Indexes are not allowed: start={start_index}, stop={stop_index}"
-            )
-        if (stop_index - start_index) > self.MAX_READBLOCK_SIZE:
-            raise ValueError(
-                f"It is impossible to read more than 3000 entrys at once. ({(stop_index - start_index)})"
-            )
-        
-        self.log.debug(f" Reading block from {start_index} to {stop_index}.")
+        max_age = self.HANDSHAKE_TTL if max_age is None else max_age
+        with self._handshake_lock:
+            with self._handshakes_lock:
+                handshake = self._handshakes.get(self.host_name)
+            if handshake is None or time.monotonic() - handshake[0] > max_age:
+                self.log.debug(" Loading newest meter datapoint.")
+                current_reading = self._read_csv("/data/?last=1")
+                handshake = (
+                    time.monotonic(),
+                    current_reading["Timestamp"][0].timestamp(),
+                    int(current_reading["Index"][0]),
+                )
+                with self._handshakes_lock:
+                    self._handshakes[self.host_name] = handshake
 
-        # get data from meter
-        url = "".join([
-            "http://",
-            self.host_name,
-            "/data/?from=",
-            str(start_index),
-            "&to=",
-            str(stop_index),
-        ])
-        raw_meter_data = pd.read_csv(url, delimiter=";")
-
-        # clean up data
-        columns_to_remove = [
-            "Index",
-            "Status",
-            "Serial",
-            "Active Energy Import L123 T2 [Wh]",
-            "Active Energy Export L123 T2 [Wh]",
-            "Reactive Energy Import L123 T1 [varh]",
-            "Reactive Energy Import L123 T2 [varh]",
-            "Reactive Energy Export L123 T1 [varh]",
-            "Reactive Energy Export L123 T2 [varh]",
-            "Active Power L123 [W]",
-            "Active Power L1 [W]",
-            "Active Power L2 [W]",
-            "Active Power L3 [W]",
-            "Current L123 [mA]",
-            "Current L1 [mA]",
-            "Current L2 [mA]",
-            "Current L3 [mA]",
-            "Current N [mA]",
-            "Voltage L1-N [1/10 V]",
-            "Voltage L2-N [1/10 V]",
-            "Voltage L3-N [1/10 V]",
-            "Powerfactor L1 [1/100]",
-            "Powerfactor L2 [1/100]",
-            "Powerfactor L3 [1/100]",
-            "Frequency [1/10 Hz]",
-        ]
-        data = raw_meter_data.drop(columns_to_remove, axis=1)
-        data["Timestamp"] = pd.to_datetime(data["Timestamp"])
-
-        if not (self.invert_energy_direction):
-            col_map = {
-                "Timestamp": "Timestamp",
-                "Active Energy Import L123 T1 [Wh]": f"{self.name}_Import_Wh",
-                "Active Energy Export L123 T1 [Wh]": f"{self.name}_Export_Wh",
-            }
-        else:
-            col_map = {
-                "Timestamp": "Timestamp",
-                "Active Energy Import L123 T1 [Wh]": f"{self.name}_Export_Wh",
-                "Active Energy Export L123 T1 [Wh]": f"{self.name}_Import_Wh",
-            }
+            _, current_time, current_raw_index = handshake
+            if self.index_capacity is not None and current_raw_index >= self.index_capacity:
+                self.log.warning(
+                    f" Index {current_raw_index} is beyond the capacity {self.index_capacity}, the index is not unwrapped."
+                )
+                self.index_capacity = None
+
+        return current_time, current_raw_index
+
+    @property
+    def max_block_size(self):
+        """entries per request"""
+        return self.read_block_size
+
+    @property
+    def max_connections(self):
+        """concurrent requests to the host"""
+        return self.pool.max_connections
+
+    @property
+    def current_time(self):
+        """epoch time of the newest entry"""
+        return self.handshake()[0]
+
+    @property
+    def current_raw_index(self):
+        """index of the newest entry as logged by the meter"""
+        return self.handshake()[1]
+
+    @property
+    def current_index(self):
+        """unwrapped index of the newest entry"""
+        current_time, current_raw_index = self.handshake()
+        return self._unwrap(current_raw_index, int(current_time))
+
+    @property
+    def oldest_index(self):
+        """unwrapped index of the oldest entry the meter can still deliver"""
+        if self.index_capacity is None:
+            return 0
+        return self.current_index - self.index_capacity + 1
+
+    def _unwrap(self, raw_index: int, epoch_time: int):
+        """unwrap a meter index logged at a time with the newest known entry before it"""
+        if self.index_capacity is None:
+            return raw_index
+        anchor = self.index_map.anchor_before(epoch_time)
+        if anchor is None:
+            return raw_index
+        # highest index possible since the anchor, missed slots only make it lower
+        highest = anchor[0] + (epoch_time - anchor[1]) // self.LOG_INTERVAL
+        return highest - ((highest - raw_index) % self.index_capacity)
+
+    def learn_index(self, indexes: np.ndarray, epoch_times: np.ndarray):
+        """add known entries, e.g. from the cache, to the timestamp to index map
+
+        Args:
+            indexes (np.ndarray): unwrapped indexes
+            epoch_times (np.ndarray): epoch times of the entries in seconds
+        """
+        self.index_map.learn(indexes, epoch_times)
 
-        data.rename(columns=col_map, inplace=True)
+    def cancel(self):
+        """Stop a running read. Pending blocks are skipped and requests in flight
+        are aborted by closing the connections to the host.
+        """
+        super().cancel()
+        self.pool.abort()
+
+    def _read_csv(self, path: str):
+        """Request a log CSV from the meter and parse it straight from the response.
+        Only the timestamp, index and T1 active energy columns are parsed.
+
+        Args:
+            path (str): request path like "/data/?last=1"
+
+        Raises:
+            http.client.IncompleteRead: if the transfer broke off
+
+        Returns:
+            pd.DataFrame: parsed columns of CSV_COLUMNS
+        """
+        with self.pool.open(path) as response:
+            # includes the transfer of the body, it is parsed while it arrives
+            with metrics.timer("csv_parse_seconds", meter=self.name):
+                try:
+                    data = pd.read_csv(
+                        response,
+                        delimiter=";",
+                        usecols=list(self.CSV_COLUMNS),
+                        dtype=self.CSV_COLUMNS,
+                    )
+                except ValueError as error:
+                    if response.length:
+                        raise http.client.IncompleteRead(b"", response.length) from error
+                    raise
+                # a transfer that broke off ends like a complete body, only the length tells
+                if response.length:
+                    raise http.client.IncompleteRead(b"", response.length)
+                data["Timestamp"] = pd.to_datetime(data["Timestamp"], format=self.TIMESTAMP_FORMAT)
+        metrics.increment("meter_rows", len(data), meter=self.name)
 
         return data
 
-    def calc_index(self, start_epoch_time: int, stop_epoch_time: int):
-        """calculate meter log index with a time range. Index overflow in the
-        meter is not yet implemented.
+    def _read_entries(self, start_index: int, stop_index: int):
+        """Read the raw log entries between two unwrapped indexes. A range across
+        the end of the ring buffer is read with two requests. The returned indexes
+        are unwrapped and all entries are added to the index map.
 
         Args:
-            start_epoch_time (int): startTime in epoch
-            stop_epoch_time (int): stopTime in epoch
+            start_index (int): first unwrapped index
+            stop_index (int): last unwrapped index
 
         Returns:
-            start_index (int): meter index of last entry before or at startTime
-            stop_index (int): meter index of last entry bevoe or at stopTime
+            pd.DataFrame: parsed columns of CSV_COLUMNS
         """
-        self.log.debug(f" Calculating index for time range {start_epoch_time} to {stop_epoch_time}.")
+        if self.index_capacity is None:
+            ranges = [(start_index, stop_index)]
+        else:
+            first, last = start_index % self.index_capacity, stop_index % self.index_capacity
+            if first <= last:
+                ranges = [(first, last)]
+            else:
+                ranges = [(first, self.index_capacity - 1), (0, last)]
 
-        time_to_start = self.current_time - start_epoch_time
-        time_to_stop = self.current_time - stop_epoch_time
+        parts = [self._read_csv(f"/data/?from={first}&to={last}") for first, last in ranges]
+        data = parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+        if self.index_capacity is not None:
+            data["Index"] = start_index + (data["Index"] - start_index) % self.index_capacity
 
-        index_to_start = int(math.ceil(time_to_start / self.LOG_INTERVAL))
-        index_to_stop = int(math.ceil(time_to_stop / self.LOG_INTERVAL))
+        self.index_map.learn(
+            data["Index"].to_numpy(), data["Timestamp"].astype("datetime64[s]").astype("int64").to_numpy()
+        )
+        return data
 
-        start_index = self.current_index - index_to_start
-        stop_index = self.current_index - index_to_stop
+    def _probe(self, index: int):
+        """read two neighbouring entries to locate a time"""
+        if index < self.oldest_index:
+            # overwritten in the ring buffer, the meter would deliver newer entries
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        metrics.increment("index_probes", meter=self.name)
+        data = self._read_entries(index, index + 1)
+        return data["Index"].to_numpy(), data["Timestamp"].astype("datetime64[s]").astype("int64").to_numpy()
 
-        if (start_index < 0) or (stop_index < 0):
-            raise NotImplementedError(
-                "An index overflow has occurred. Handling of this overflow has not been implemented yet"
+    def read_index_range(self, start_index: int, stop_index: int):
+        """Just read Entries from, to a specific index. The meter it self can't
+        deliver more than 3000 entries at once. Negative indexes are only possible
+        in a meter log that starts over at its capacity.
+
+        Args:
+            start_index (int): first unwrapped meter index do be read
+            stop_index (int): last unwrapped meter index to be read
+
+        Raises:
+            ValueError: if more than 3000 entries are requested
+            ValueError: if a negative index is requested
+            InterruptedError: if the read has been canceled
+            OSError, http.client.HTTPException: if the block could not be read after all retries
+
+        Returns:
+            Dict[str, np.ndarray]: int64 arrays "Index" (unwrapped), "Timestamp", "Import_Wh"
+                and "Export_Wh", see Meter.read_index_range
+        """
+        if self.index_capacity is None and (stop_index < 0 or start_index < 0):
+            raise ValueError(
+                f"Negative Indexes are not allowed: start={start_index}, stop={stop_index}"
             )
+        if (stop_index - start_index) > self.MAX_READBLOCK_SIZE:
+            raise ValueError(
+                f"It is impossible to read more than 3000 entrys at once. ({(stop_index - start_index)})"
+            )
+        
+        if self.cancel_event.is_set():
+            raise InterruptedError("Meter read has been canceled.")
 
-        return int(start_index), int(stop_index)
+        self.log.debug(f" Reading block from {start_index} to {stop_index}.")
 
-    def split_index_range(self, start_index: int, stop_index: int):
-        """splits a range of idexes in to specified blocks
+        # get data from meter, a broken transfer is retried with backoff
+        for attempt in range(self.block_retries + 1):
+            try:
+                raw_meter_data = self._read_entries(start_index, stop_index)
+                break
+            except urllib.error.HTTPError as error:
+                if error.code < 500 or attempt == self.block_retries:
+                    raise
+                reason = error
+            except (OSError, http.client.HTTPException) as error:
+                if attempt == self.block_retries:
+                    raise
+                reason = error
+            delay = self.retry_delay * 2**attempt
+            metrics.increment("block_retries", meter=self.name)
+            self.log.warning(f" Block {start_index} to {stop_index} failed, retry in {delay:.1f} s: {reason!r}")
+            if self.cancel_event.wait(delay):
+                raise InterruptedError("Meter read has been canceled.")
+
+        energy_import = raw_meter_data["Active Energy Import L123 T1 [Wh]"].to_numpy(dtype=np.int64)
+        energy_export = raw_meter_data["Active Energy Export L123 T1 [Wh]"].to_numpy(dtype=np.int64)
+        if self.invert_energy_direction:
+            energy_import, energy_export = energy_export, energy_import
+
+        return {
+            "Index": raw_meter_data["Index"].to_numpy(dtype=np.int64),
+            "Timestamp": raw_meter_data["Timestamp"].astype("datetime64[s]").astype("int64").to_numpy(),
+            "Import_Wh": energy_import,
+            "Export_Wh": energy_export,
+        }
+
+    def read_single_block(self, start_index: int, stop_index: int):
+        """Read one block like read_index_range, as DataFrame
 
         Args:
-            start_index (int): first index
-            stop_index (int): last index
+            start_index (int): first unwrapped meter index do be read
+            stop_index (int): last unwrapped meter index to be read
 
         Returns:
-            [[start_index, stop_index]] (int): array of start/stop arrays for each split
+            pd.DataFrame: Dataframe of requested data, indexed by the meter internal index
         """
-        len_index = stop_index - start_index
-        num_of_simple_reads = math.ceil(len_index / self.read_block_size)
-
-        self.log.debug(f" Splitting index range {start_index} to {stop_index} in {num_of_simple_reads} blocks.")
-
-        blocks_to_read = []
-        for i in range(num_of_simple_reads):
-            if not i >= (num_of_simple_reads - 1):
-                # add full block
-                blocks_to_read.append(
-                    [
-                        (i * self.read_block_size) + start_index,
-                        ((i + 1) * self.read_block_size) + start_index - 1,
-                    ]
-                )
-            else:
-                # add remaining
-                blocks_to_read.append(
-                    [(i * self.read_block_size) + start_index, stop_index]
-                )
+        arrays = self.read_index_range(start_index, stop_index)
+        data = self.to_frame(arrays)
+        data.index = pd.Index(arrays["Index"], name="Index")
 
-        return blocks_to_read
+        return data
 
-    def read(self, start_epoch_time: int, stop_epoch_time: int):
-        """Read all entries in a range of epoch time. No size limit, exept what is available on the meter.
+    def calc_index(self, start_epoch_time: int, stop_epoch_time: int):
+        """calculate meter log index with a time range. The indexes are looked up in
+        the timestamp to index map, which is learned from read and cached entries.
+        Where missed slots or clock adjustments leave the index open, single entries
+        are probed. Times before the oldest known entry give the oldest index, entries
+        learned from the cache may be older than the meter log.
 
         Args:
             start_epoch_time (int): startTime in epoch
             stop_epoch_time (int): stopTime in epoch
-            log_name (str, optional): if a name is given, the process will be logged in the console
 
         Returns:
-            pd.DataFrame: requested data as pandas DataFrame with the following columns:
-                - "Timestamp"
-                - f"{self.name}_Import_Wh"
-                - f"{self.name}_Export_Wh"
+            start_index (int): unwrapped meter index of last entry before or at startTime
+            stop_index (int): unwrapped meter index of last entry bevoe or at stopTime
         """
-        start_index, stop_index = self.calc_index(start_epoch_time, stop_epoch_time)
-        blocks_to_read = self.split_index_range(start_index, stop_index)
-        data = pd.DataFrame()
-
-        count = 0
-        for block in blocks_to_read:
-            self.log.info(f" Reading block {count} of {len(blocks_to_read)}")
+        self.log.debug(f" Calculating index for time range {start_epoch_time} to {stop_epoch_time}.")
 
-            new_data = self.read_single_block(block[0], block[1])
-            data = pd.concat([data, new_data])
-            count += 1
+        current_time, current_raw_index = self.handshake()
+        newest = (self._unwrap(current_raw_index, int(current_time)), int(current_time))
+        oldest_index = self.oldest_index
+        if self.index_map.oldest_index is not None:
+            oldest_index = min(oldest_index, self.index_map.oldest_index)
 
-        self.log.info(" Reading complete.")
+        start_index = self.index_map.locate(int(math.floor(start_epoch_time)), self._probe, newest, oldest_index)
+        stop_index = self.index_map.locate(int(math.floor(stop_epoch_time)), self._probe, newest, oldest_index)
 
-        return data
+        return int(start_index), int(stop_index)
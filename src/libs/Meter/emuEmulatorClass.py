@@ -0,0 +1,225 @@
+import datetime
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+
+class EmuEmulator:
+    LOG_INTERVAL = 15 * 60
+    MAX_READBLOCK_SIZE = 3000
+
+    # every column of the real meter log, most of them are constant here
+    CSV_HEADER = [
+        "Timestamp", "Index", "Status", "Serial",
+        "Active Energy Import L123 T1 [Wh]", "Active Energy Import L123 T2 [Wh]",
+        "Active Energy Export L123 T1 [Wh]", "Active Energy Export L123 T2 [Wh]",
+        "Reactive Energy Import L123 T1 [varh]", "Reactive Energy Import L123 T2 [varh]",
+        "Reactive Energy Export L123 T1 [varh]", "Reactive Energy Export L123 T2 [varh]",
+        "Active Power L123 [W]", "Active Power L1 [W]", "Active Power L2 [W]", "Active Power L3 [W]",
+        "Current L123 [mA]", "Current L1 [mA]", "Current L2 [mA]", "Current L3 [mA]", "Current N [mA]",
+        "Voltage L1-N [1/10 V]", "Voltage L2-N [1/10 V]", "Voltage L3-N [1/10 V]",
+        "Powerfactor L1 [1/100]", "Powerfactor L2 [1/100]", "Powerfactor L3 [1/100]",
+        "Frequency [1/10 Hz]",
+    ]
+
+    # the synthetic profile repeats every week
+    PROFILE_LENGTH = 7 * 96
+
+    def __init__(
+        self,
+        entries: int = 3 * 365 * 96,
+        seed: int = 0,
+        latency: float = 0.0,
+        gaps: Optional[List[Tuple[int, int]]] = None,
+        end_time: Optional[int] = None,
+        producer: bool = False,
+        index_capacity: Optional[int] = None,
+    ):
+        """Local stand-in for a EMU Pro II power meter. Serves the "/data/?last=" and
+        "/data/?from=&to=" CSV endpoints of the meter from synthetic data on 127.0.0.1.
+
+        The counters are calculated per index from a weekly profile, so even years of
+        data need no memory. The newest entry is at end_time, every older entry is one
+        log interval earlier, except where the meter was offline.
+
+        Args:
+            entries (int, optional): number of log entries. Defaults to 3 years.
+            seed (int, optional): seed of the synthetic profile. Defaults to 0.
+            latency (float, optional): delay of every response in seconds. Defaults to 0.
+            gaps (List[Tuple[int, int]], optional): offline periods as (index, slots), the
+                entry with this index is logged the given number of slots late. Defaults to none.
+            end_time (int, optional): epoch time of the newest entry. Defaults to the last
+                full quarter hour.
+            producer (bool, optional): export energy like a solar plant. Defaults to False.
+            index_capacity (int, optional): size of the ring buffer, the index starts over at
+                this value and only the newest entries are kept. Defaults to no ring buffer.
+        """
+        self.entries = entries
+        self.index_capacity = index_capacity
+        self.latency = latency
+        self.requests = 0
+        # block requests whose transfer breaks off like on a flaky link, as
+        # {first index of the block: number of broken transfers}
+        self.failures = {}
+        self._requests_lock = threading.Lock()
+        self.log = logging.getLogger("EMU Emulator")
+
+        # counter value at index i: full weeks plus the part of the current week
+        rng = np.random.default_rng(seed)
+        slot = np.arange(self.PROFILE_LENGTH) % 96
+        daylight = np.clip(np.sin((slot - 24) / 48 * np.pi), 0, None)
+        usage = rng.integers(0, 300, self.PROFILE_LENGTH) * (0.5 + (slot > 28) * (slot < 90))
+        production = rng.integers(0, 2000, self.PROFILE_LENGTH) * daylight
+        if not producer:
+            production = production * 0.05
+            usage = usage * 2
+        self._import_prefix = np.concatenate([[0], np.cumsum(usage.astype(np.int64))])
+        self._export_prefix = np.concatenate([[0], np.cumsum(production.astype(np.int64))])
+        self._offset = int(rng.integers(10**6, 10**7))
+
+        # late entries, as sorted indexes with the slots missing up to them
+        gaps = sorted(gaps or [])
+        self._gap_index = np.array([index for index, _ in gaps], dtype=np.int64)
+        self._gap_slots = np.concatenate([[0], np.cumsum([slots for _, slots in gaps])]).astype(np.int64)
+        total_gap = int(self._gap_slots[-1])
+
+        if end_time is None:
+            end_time = int(time.time()) // self.LOG_INTERVAL * self.LOG_INTERVAL
+        self.first_time = end_time - self.LOG_INTERVAL * (entries - 1 + total_gap)
+
+        self._server = None
+        self._thread = None
+
+    def timestamps(self, indexes: np.ndarray):
+        """epoch time of log entries"""
+        indexes = np.asarray(indexes, dtype=np.int64)
+        late = np.searchsorted(self._gap_index, indexes, side="right")
+        return self.first_time + self.LOG_INTERVAL * (indexes + self._gap_slots[late])
+
+    def counters(self, indexes: np.ndarray):
+        """import and export energy counters of log entries in Wh"""
+        indexes = np.asarray(indexes, dtype=np.int64)
+        weeks, part = np.divmod(indexes, self.PROFILE_LENGTH)
+        energy_import = self._offset + weeks * self._import_prefix[-1] + self._import_prefix[part]
+        energy_export = self._offset // 10 + weeks * self._export_prefix[-1] + self._export_prefix[part]
+        return energy_import, energy_export
+
+    def entries_in(self, start_index: int, stop_index: int):
+        """Entries a request for a range of meter indexes returns. Like the meter, no
+        more than 3000 entries are returned and indexes out of range are left out.
+
+        Args:
+            start_index (int): first meter index
+            stop_index (int): last meter index
+
+        Returns:
+            np.ndarray: sequence numbers of the entries, counted from the first entry ever logged
+        """
+        start_index = max(start_index, 0)
+        if self.index_capacity is None:
+            stop_index = min(stop_index, self.entries - 1, start_index + self.MAX_READBLOCK_SIZE)
+            return np.arange(start_index, stop_index + 1)
+
+        # in the ring buffer, an index holds the newest entry written to it
+        stop_index = min(stop_index, self.index_capacity - 1, start_index + self.MAX_READBLOCK_SIZE)
+        newest = self.entries - 1
+        sequence = newest - ((newest - np.arange(start_index, stop_index + 1)) % self.index_capacity)
+        return sequence[sequence >= 0]
+
+    def csv(self, sequence: np.ndarray):
+        """Log entries in the CSV format of the meter
+
+        Args:
+            sequence (np.ndarray): sequence numbers of the entries
+
+        Returns:
+            bytes: CSV with header
+        """
+        sequence = np.asarray(sequence, dtype=np.int64)
+        indexes = sequence if self.index_capacity is None else sequence % self.index_capacity
+        energy_import, energy_export = self.counters(sequence)
+
+        tail = ";0" * 5 + ";1" * 16
+        lines = [";".join(self.CSV_HEADER)]
+        for index, stamp, imported, exported in zip(indexes, self.timestamps(sequence), energy_import, energy_export):
+            # the meter logs in UTC, like the readers expect it
+            timestamp = datetime.datetime.fromtimestamp(int(stamp), tz=datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            lines.append(f"{timestamp};{index};0;12345678;{imported};0;{exported}{tail}")
+
+        return ("\n".join(lines) + "\n").encode()
+
+    @property
+    def host(self):
+        """host with port, as passed to EmuMeter"""
+        return f"127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        """Start serving on a free port in a background thread
+
+        Returns:
+            EmuEmulator: self
+        """
+        emulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                emulator.log.debug(format % args)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path != "/data/" or not ("last" in query or ("from" in query and "to" in query)):
+                    self.send_error(404)
+                    return
+
+                if "last" in query:
+                    count = min(int(query["last"][0]), emulator.entries, emulator.MAX_READBLOCK_SIZE + 1)
+                    body = emulator.csv(np.arange(emulator.entries - count, emulator.entries))
+                else:
+                    body = emulator.csv(emulator.entries_in(int(query["from"][0]), int(query["to"][0])))
+
+                with emulator._requests_lock:
+                    emulator.requests += 1
+                    fail = "from" in query and emulator.failures.get(int(query["from"][0]), 0) > 0
+                    if fail:
+                        emulator.failures[int(query["from"][0])] -= 1
+                if emulator.latency > 0:
+                    time.sleep(emulator.latency)
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if fail:
+                    # only half of the body arrives before the connection drops
+                    self.wfile.write(body[: len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.log.debug(f" Serving {self.entries} entries on {self.host}.")
+
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
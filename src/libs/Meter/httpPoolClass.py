@@ -0,0 +1,169 @@
+import contextlib
+import http.client
+import logging
+import socket
+import threading
+import time
+import urllib.error
+from libs.Metrics.metricsClass import metrics
+
+
+class HttpPool:
+    DEFAULT_MAX_CONNECTIONS = 2
+    DEFAULT_TIMEOUT = 30
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @classmethod
+    def for_host(cls, host: str, max_connections: int = DEFAULT_MAX_CONNECTIONS):
+        """get the shared connection pool of a host. All meters with the same host and
+        the same concurrency limit share one pool, so the limit holds for all of them.
+
+        Args:
+            host (str): hostname like IP-address, optionally with ":port"
+            max_connections (int, optional): concurrency limit of the pool. Defaults to 2.
+
+        Returns:
+            HttpPool: connection pool of the host
+        """
+        key = (host, max_connections)
+        with cls._pools_lock:
+            if key not in cls._pools:
+                cls._pools[key] = cls(host, max_connections)
+            return cls._pools[key]
+
+    @classmethod
+    def close_all(cls):
+        """close the idle connections of all shared pools and forget the pools, e.g. at
+        the end of a run. Meters still holding a pool keep using it.
+        """
+        with cls._pools_lock:
+            pools, cls._pools = list(cls._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def __init__(self, host: str, max_connections: int = DEFAULT_MAX_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT):
+        """Pool of reusable keep-alive HTTP connections to one host with a bounded
+        number of concurrent requests.
+
+        Args:
+            host (str): hostname like IP-address, optionally with ":port"
+            max_connections (int, optional): maximum number of concurrent requests. Defaults to 2.
+            timeout (float, optional): socket timeout in seconds. Defaults to 30.
+
+        Raises:
+            ValueError: if max_connections is smaller than 1
+        """
+        if max_connections < 1:
+            raise ValueError(f"At least one connection is needed. ({max_connections})")
+
+        self.host = host
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.log = logging.getLogger(f"HTTP | {host}")
+
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle = []
+        self._active = set()
+        self._idle_lock = threading.Lock()
+
+    def _acquire(self):
+        with self._idle_lock:
+            if self._idle:
+                connection = self._idle.pop()
+            else:
+                self.log.debug(" Opening new connection.")
+                connection = http.client.HTTPConnection(self.host, timeout=self.timeout)
+            self._active.add(connection)
+            return connection
+
+    def _release(self, connection: http.client.HTTPConnection, reuse: bool = True):
+        with self._idle_lock:
+            self._active.discard(connection)
+            if reuse:
+                self._idle.append(connection)
+        if not reuse:
+            connection.close()
+
+    def close(self):
+        """close all idle connections"""
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def abort(self):
+        """close all connections, requests in flight fail immediately"""
+        with self._idle_lock:
+            active = list(self._active)
+        for connection in active:
+            if connection.sock is not None:
+                try:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        self.close()
+
+    @contextlib.contextmanager
+    def open(self, path: str):
+        """send a GET request over a pooled connection and stream the response. The
+        connection goes back to the pool when the context is left.
+
+        Args:
+            path (str): request path like "/data/?last=1"
+
+        Raises:
+            urllib.error.HTTPError: if the host answers with a status other than 200
+
+        Yields:
+            http.client.HTTPResponse: file like response, body not yet read
+        """
+        with self._slots:
+            connection = self._acquire()
+            try:
+                begin = time.perf_counter()
+                try:
+                    connection.request("GET", path)
+                    response = connection.getresponse()
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    # idle keep-alive connection was closed by the host, retry once on a new one
+                    metrics.increment("http_retries", host=self.host)
+                    connection.close()
+                    connection.request("GET", path)
+                    response = connection.getresponse()
+                # time until the headers arrived, the body is streamed by the caller
+                metrics.observe("http_request_seconds", time.perf_counter() - begin, host=self.host)
+                metrics.increment("http_requests", host=self.host, status=response.status)
+                metrics.increment("http_response_bytes", int(response.getheader("Content-Length", 0)), host=self.host)
+
+                if response.status != 200:
+                    response.read()
+                    raise urllib.error.HTTPError(
+                        f"http://{self.host}{path}", response.status, response.reason, response.headers, None
+                    )
+
+                yield response
+
+                # the connection can only be reused once the body is consumed
+                response.read()
+            except BaseException:
+                self._release(connection, reuse=False)
+                raise
+
+            self._release(connection, reuse=not response.will_close)
+
+    def get(self, path: str):
+        """send a GET request over a pooled connection and read the whole response
+
+        Args:
+            path (str): request path like "/data/?last=1"
+
+        Raises:
+            urllib.error.HTTPError: if the host answers with a status other than 200
+
+        Returns:
+            bytes: response body
+        """
+        with self.open(path) as response:
+            return response.read()
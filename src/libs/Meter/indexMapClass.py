@@ -0,0 +1,138 @@
+import logging
+import threading
+from typing import Callable, Tuple
+import numpy as np
+
+
+class IndexMap:
+    def __init__(self, interval: int = 15 * 60, max_probes: int = 40):
+        """Learned mapping from time to meter log index. Every entry seen in fetched
+        data is kept as (index, time) anchor. The index of a time is bounded by the
+        anchors around it: the meter logs at most one entry per interval, so missed
+        slots only make the bounds wider. Where the bounds leave more than one
+        candidate, single entries are read from the meter until the index is known.
+
+        Args:
+            interval (int, optional): log interval of the meter in seconds. Defaults to 15 min.
+            max_probes (int, optional): maximum of probe reads per lookup. Defaults to 40.
+        """
+        self.interval = interval
+        self.max_probes = max_probes
+        self.log = logging.getLogger("IndexMap")
+
+        # indexes and times are replaced together, blocks are learned from several threads
+        self._anchors = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._anchors[0])
+
+    def learn(self, indexes: np.ndarray, times: np.ndarray):
+        """add entries as anchors, a known index is updated with the new time. The
+        lookups search the times in index order, an anchor with a time before the one
+        of a lower index is dropped, e.g. after the clock of the meter was set back.
+
+        Args:
+            indexes (np.ndarray): meter log indexes
+            times (np.ndarray): epoch times of the entries in seconds
+        """
+        indexes = np.asarray(indexes, dtype=np.int64)
+        if len(indexes) == 0:
+            return
+        with self._lock:
+            known_indexes, known_times = self._anchors
+            merged, first = np.unique(np.concatenate([indexes, known_indexes]), return_index=True)
+            merged_times = np.concatenate([np.asarray(times, dtype=np.int64), known_times])[first]
+            ordered = merged_times >= np.maximum.accumulate(merged_times)
+            self._anchors = (merged[ordered], merged_times[ordered])
+
+    @property
+    def oldest_index(self):
+        """lowest known index, None if nothing is known"""
+        indexes = self._anchors[0]
+        return int(indexes[0]) if len(indexes) > 0 else None
+
+    def anchor_before(self, epoch_time: int):
+        """newest anchor at or before a time, None if there is none"""
+        indexes, times = self._anchors
+        position = int(np.searchsorted(times, epoch_time, side="right"))
+        if position == 0:
+            return None
+        return int(indexes[position - 1]), int(times[position - 1])
+
+    def bounds(self, epoch_time: int, newest: Tuple[int, int], oldest_index: int):
+        """Range of indexes the last entry at or before a time can have
+
+        Args:
+            epoch_time (int): time to locate, earlier than the newest entry
+            newest (Tuple[int, int]): index and time of the newest entry of the meter
+            oldest_index (int): oldest index the meter can deliver
+
+        Returns:
+            Tuple[int, int, bool]: lowest and highest possible index, and if there is a
+                known entry at or before the time
+        """
+        indexes, times = self._anchors
+        position = int(np.searchsorted(times, epoch_time, side="right"))
+        after = [newest]
+        if position < len(times) and times[position] <= newest[1]:
+            after.append((int(indexes[position]), int(times[position])))
+        after_index, after_time = min(after)
+
+        # at most one entry per interval lies between the time and the next known entry
+        low = max(oldest_index, after_index + ((epoch_time - after_time) // self.interval))
+        high = after_index - 1
+        before = None
+        if position > 0:
+            before = (int(indexes[position - 1]), int(times[position - 1]))
+        if before is not None and before[0] >= oldest_index:
+            low = max(low, before[0])
+            high = min(high, before[0] + (epoch_time - before[1]) // self.interval)
+            if low > high:
+                # anchors contradict the cadence, e.g. after a clock adjustment
+                low, high = before[0], after_index - 1
+
+        return low, max(low, high), before is not None and before[0] >= oldest_index
+
+    def locate(
+        self,
+        epoch_time: int,
+        probe: Callable[[int], Tuple[np.ndarray, np.ndarray]],
+        newest: Tuple[int, int],
+        oldest_index: int,
+    ):
+        """Find the index of the last entry at or before a time. Times before the
+        oldest entry give the oldest index.
+
+        Args:
+            epoch_time (int): time to locate
+            probe (Callable[[int], Tuple[np.ndarray, np.ndarray]]): function(index) reading the
+                entries index and index + 1 from the meter, returns their indexes and times
+            newest (Tuple[int, int]): index and time of the newest entry of the meter
+            oldest_index (int): oldest index the meter can deliver
+
+        Returns:
+            int: meter log index
+        """
+        newest_index, newest_time = newest
+        if epoch_time >= newest_time:
+            return newest_index
+
+        for probe_count in range(self.max_probes):
+            low, high, known = self.bounds(epoch_time, newest, oldest_index)
+            if low == high:
+                break
+            # the first guess assumes no missed slots after the time, then bisect
+            index = low if probe_count == 0 and not known else (low + high) // 2
+            indexes, times = probe(index)
+            if len(indexes) == 0 or indexes[0] > index:
+                # entries up to this index are not in the meter log (anymore)
+                oldest_index = index + 1
+            self.learn(indexes, times)
+        else:
+            self.log.warning(f" Index of time {epoch_time} not found after {self.max_probes} probes.")
+
+        low, high, known = self.bounds(epoch_time, newest, oldest_index)
+        if not known:
+            self.log.warning(f" Time {epoch_time} is before the oldest entry of the meter log, starting at the oldest entry.")
+        return low
@@ -1,7 +1,27 @@
 import pandas as pd
+import collections
+import itertools
 import logging
+import math
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict
 
 class Meter:
+    # capabilities of the bulk read, the block reads are scheduled with them
+    max_block_size = None  # entries per read_index_range call, None if there is no limit
+    max_connections = 1  # read_index_range calls at the same time
+    local = False  # data is on a local disk, caching it brings nothing
+
+    # columns of the bulk read, all int64
+    COLUMNS = ["Index", "Timestamp", "Import_Wh", "Export_Wh"]
+
+    # one pool for the block reads of all meters, the limit per meter is max_connections
+    BLOCK_WORKERS = 32
+    _block_pool = None
+    _block_pool_lock = threading.Lock()
+
     def __init__(self, meter_type: str, name: str, invert: bool = False):
         """Connect to a power meter
 
@@ -14,9 +34,150 @@ class Meter:
         self.name = name
 
         self.log = logging.getLogger(f"{meter_type} | {name}")
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        """Ask a running read to stop. Meter implementations check the cancel_event
+        between requests and may also abort requests in flight.
+        """
+        self.log.warning(" Read canceled.")
+        self.cancel_event.set()
+
+    def learn_index(self, indexes, epoch_times):
+        """Add known entries, e.g. from the cache, to the lookup of indexes by time.
+        Meters without such a lookup ignore them.
+
+        Args:
+            indexes (np.ndarray): meter indexes
+            epoch_times (np.ndarray): epoch times of the entries in seconds
+        """
+        pass
+
+    @property
+    def current_index(self) -> int:
+        """index of the newest entry"""
+        raise NotImplementedError()
+
+    @property
+    def oldest_index(self) -> int:
+        """index of the oldest entry the meter can deliver"""
+        return 0
+
+    def calc_index(self, start_epoch_time: int, stop_epoch_time: int):
+        """Indexes of the last entries at or before two times
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+
+        Returns:
+            start_index (int): index of last entry before or at startTime
+            stop_index (int): index of last entry before or at stopTime
+        """
+        raise NotImplementedError()
+
+    def read_index_range(self, start_index: int, stop_index: int) -> Dict[str, np.ndarray]:
+        """Bulk read of a contiguous index range, at most max_block_size entries. The
+        energy directions are already swapped for an inverted meter.
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index, included
+
+        Returns:
+            Dict[str, np.ndarray]: int64 arrays of the entries in index order: "Index",
+                "Timestamp" (logged time as epoch seconds), "Import_Wh" and "Export_Wh"
+        """
+        raise NotImplementedError()
+
+    def split_index_range(self, start_index: int, stop_index: int):
+        """splits a range of idexes in to blocks of at most max_block_size entries
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index
+
+        Returns:
+            [[start_index, stop_index]] (int): array of start/stop arrays for each split
+        """
+        len_index = stop_index - start_index
+        if len_index < 0:
+            return []
+        if self.max_block_size is None:
+            return [[start_index, stop_index]]
+        # a single entry is one block as well
+        num_of_simple_reads = max(math.ceil(len_index / self.max_block_size), 1)
+
+        self.log.debug(f" Splitting index range {start_index} to {stop_index} in {num_of_simple_reads} blocks.")
+
+        blocks_to_read = []
+        for i in range(num_of_simple_reads):
+            if not i >= (num_of_simple_reads - 1):
+                # add full block
+                blocks_to_read.append(
+                    [
+                        (i * self.max_block_size) + start_index,
+                        ((i + 1) * self.max_block_size) + start_index - 1,
+                    ]
+                )
+            else:
+                # add remaining
+                blocks_to_read.append(
+                    [(i * self.max_block_size) + start_index, stop_index]
+                )
+
+        return blocks_to_read
+
+    @classmethod
+    def block_pool(cls):
+        """worker pool shared by the block reads of all meters"""
+        with Meter._block_pool_lock:
+            if Meter._block_pool is None:
+                Meter._block_pool = ThreadPoolExecutor(max_workers=cls.BLOCK_WORKERS, thread_name_prefix="block")
+            return Meter._block_pool
+
+    def read_blocks(self, blocks_to_read: list):
+        """Read several blocks concurrently on the shared block pool, at most
+        max_connections of this meter at the same time.
+
+        Args:
+            blocks_to_read ([[start_index, stop_index]]): blocks as returned by split_index_range
+
+        Yields:
+            Dict[str, np.ndarray]: arrays of each block as returned by read_index_range, in
+                the order of blocks_to_read
+        """
+        pool = self.block_pool()
+        blocks = iter(blocks_to_read)
+        pending = collections.deque(
+            pool.submit(self.read_index_range, block[0], block[1])
+            for block in itertools.islice(blocks, self.max_connections)
+        )
+        try:
+            while pending:
+                arrays = pending.popleft().result()
+                # the next block is requested before this one is handed on
+                for block in itertools.islice(blocks, 1):
+                    pending.append(pool.submit(self.read_index_range, block[0], block[1]))
+                yield arrays
+        finally:
+            for future in pending:
+                future.cancel()
+            wait(pending)
+
+    def to_frame(self, arrays: Dict[str, np.ndarray]):
+        """arrays of the bulk read as DataFrame with the columns of read"""
+        return pd.DataFrame(
+            {
+                "Timestamp": pd.to_datetime(arrays["Timestamp"], unit="s"),
+                f"{self.name}_Import_Wh": arrays["Import_Wh"],
+                f"{self.name}_Export_Wh": arrays["Export_Wh"],
+            }
+        )
 
     def read(self, start_epoch_time: int, stop_epoch_time: int) -> pd.DataFrame:
         """Read all entries in a range of epoch time. No size limit, exept what is available on the meter.
+        The range is read in blocks with read_index_range and reassembled in index order.
 
         Args:
             startEpochTime (int): startTime in epoch
@@ -28,5 +189,23 @@ class Meter:
                 - f"{self.name}_Import_Wh"
                 - f"{self.name}_Export_Wh"
         """
-        self.log.warning("This read function belongs to the base class. Please override this function in the meter specific implementation.")
-        raise NotImplementedError()
\ No newline at end of file
+        start_index, stop_index = self.calc_index(start_epoch_time, stop_epoch_time)
+        start_index = max(start_index, self.oldest_index)
+        blocks_to_read = self.split_index_range(start_index, stop_index)
+
+        # preallocate the whole range, blocks are copied in once without any concat
+        rows = max(stop_index - start_index + 1, 0)
+        columns = {name: np.empty(rows, dtype=np.int64) for name in self.COLUMNS}
+        position = 0
+        for count, new_data in enumerate(self.read_blocks(blocks_to_read), start=1):
+            self.log.info(f" Read block {count} of {len(blocks_to_read)}")
+            end = position + len(new_data["Index"])
+            for name, values in columns.items():
+                if end > len(values):
+                    values = columns[name] = np.resize(values, end)
+                values[position:end] = new_data[name]
+            position = end
+
+        self.log.info(" Reading complete.")
+
+        return self.to_frame({name: values[:position] for name, values in columns.items()})
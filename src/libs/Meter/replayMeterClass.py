@@ -0,0 +1,122 @@
+import glob
+import os
+from typing import List, Union
+import numpy as np
+import pandas as pd
+from libs.Meter.meterClass import Meter
+from libs.Meter.EmuMeterClass import EmuMeter
+
+
+class ReplayMeter(Meter):
+    local = True
+
+    def __init__(
+        self,
+        files: Union[str, List[str]],
+        name: str,
+        invert: bool = False,
+        index_capacity: int = EmuMeter.INDEX_CAPACITY,
+    ):
+        """Serves exported EMU Pro II log files from disk like a meter, e.g. to bill an
+        old period again or to try other settings without any network.
+
+        The files are CSV exports of the meter log, like the answer of "/data/", and may
+        overlap. pandas reads compressed files like ".csv.gz" as well. Indexes that start
+        over at the capacity of the ring buffer are unwrapped.
+
+        Args:
+            files (Union[str, List[str]]): file names, glob patterns or directories of CSV files
+            name (str): meter name
+            invert (bool, optional): set "True" if Import an export on this meter are reversed
+            index_capacity (int, optional): index at which the meter log starts over. Defaults
+                to 3 years of entries.
+
+        Raises:
+            FileNotFoundError: if no file matches
+        """
+        super().__init__("EMU Replay", name, invert)
+
+        if isinstance(files, str):
+            files = [files]
+        file_names = []
+        for pattern in files:
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, "*.csv*")
+            file_names += sorted(glob.glob(pattern))
+        if not file_names:
+            raise FileNotFoundError(f"No meter log files found for \"{name}\". ({', '.join(files)})")
+
+        self.log.info(f" Loading {len(file_names)} log files.")
+        data = pd.concat(
+            [
+                pd.read_csv(file_name, delimiter=";", usecols=list(EmuMeter.CSV_COLUMNS), dtype=EmuMeter.CSV_COLUMNS)
+                for file_name in file_names
+            ],
+            ignore_index=True,
+        )
+        times = pd.to_datetime(data["Timestamp"], format=EmuMeter.TIMESTAMP_FORMAT).astype("datetime64[s]").astype("int64").to_numpy()
+
+        # in time order, every drop of the raw index is a start over of the ring buffer
+        order = np.argsort(times, kind="stable")
+        raw_index = data["Index"].to_numpy(dtype=np.int64)[order]
+        index = raw_index + index_capacity * np.concatenate([[0], np.cumsum(np.diff(raw_index) < 0)])
+        index, first = np.unique(index, return_index=True)
+
+        energy_import = data["Active Energy Import L123 T1 [Wh]"].to_numpy(dtype=np.int64)[order][first]
+        energy_export = data["Active Energy Export L123 T1 [Wh]"].to_numpy(dtype=np.int64)[order][first]
+        if self.invert_energy_direction:
+            energy_import, energy_export = energy_export, energy_import
+        self.arrays = {
+            "Index": index,
+            "Timestamp": times[order][first],
+            "Import_Wh": energy_import,
+            "Export_Wh": energy_export,
+        }
+        self.log.debug(f" {len(index)} entries from index {index[0]} to {index[-1]}.")
+
+    @property
+    def current_index(self):
+        """index of the newest entry"""
+        return int(self.arrays["Index"][-1])
+
+    @property
+    def current_time(self):
+        """epoch time of the newest entry"""
+        return int(self.arrays["Timestamp"][-1])
+
+    @property
+    def oldest_index(self):
+        """index of the oldest entry"""
+        return int(self.arrays["Index"][0])
+
+    def calc_index(self, start_epoch_time: int, stop_epoch_time: int):
+        """Indexes of the last entries at or before two times, times before the oldest
+        entry give the oldest index.
+
+        Args:
+            start_epoch_time (int): startTime in epoch
+            stop_epoch_time (int): stopTime in epoch
+
+        Returns:
+            start_index (int): index of last entry before or at startTime
+            stop_index (int): index of last entry before or at stopTime
+        """
+        positions = np.searchsorted(self.arrays["Timestamp"], [start_epoch_time, stop_epoch_time], side="right") - 1
+        start, stop = np.maximum(positions, 0)
+        return int(self.arrays["Index"][start]), int(self.arrays["Index"][stop])
+
+    def read_index_range(self, start_index: int, stop_index: int):
+        """Entries of an index range, see Meter.read_index_range. Indexes missing in the
+        files are left out.
+
+        Args:
+            start_index (int): first index
+            stop_index (int): last index, included
+
+        Returns:
+            Dict[str, np.ndarray]: views of the loaded arrays
+        """
+        if self.cancel_event.is_set():
+            raise InterruptedError("Meter read has been canceled.")
+        low, high = np.searchsorted(self.arrays["Index"], [start_index, stop_index + 1])
+        return {column: values[low:high] for column, values in self.arrays.items()}
@@ -0,0 +1,142 @@
+import contextlib
+import json
+import threading
+import time
+
+
+class Metrics:
+    PREFIX = "openzev"
+
+    def __init__(self):
+        """Thread safe registry of counters and timers. Every value is kept per name
+        and set of labels, e.g. the fetch time per meter host. The registry can be
+        exported as JSON or in the Prometheus text format. Values add up over the
+        life of the registry, call reset to start over.
+        """
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict):
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """add to a counter
+
+        Args:
+            name (str): name of the counter like "http_response_bytes"
+            value (float, optional): value to add. Defaults to 1.
+            **labels: labels of the counter like meter="ewMeter"
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """record a duration of a timer
+
+        Args:
+            name (str): name of the timer like "stage_seconds"
+            seconds (float): measured duration
+            **labels: labels of the timer like stage="calculate"
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = {"count": 1, "sum": seconds, "min": seconds, "max": seconds}
+            else:
+                timer["count"] += 1
+                timer["sum"] += seconds
+                timer["min"] = min(timer["min"], seconds)
+                timer["max"] = max(timer["max"], seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        """measure the duration of a with block, also if it raises"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - begin, **labels)
+
+    def reset(self):
+        """remove all values"""
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+    def to_dict(self):
+        """All values as plain dict
+
+        Returns:
+            dict: "counters" and "timers", each a list of entries with name, labels and values
+        """
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            timers = [
+                {"name": name, "labels": dict(labels), **timer}
+                for (name, labels), timer in sorted(self._timers.items())
+            ]
+        return {"counters": counters, "timers": timers}
+
+    def to_json(self, file_name: str):
+        """write all values as JSON"""
+        with open(file_name, "w") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    def to_prometheus(self):
+        """All values in the Prometheus text format. Counters get the suffix "_total",
+        timers are written as summary with count and sum plus a "_max" gauge.
+
+        Returns:
+            str: exposition text
+        """
+        def labelValue(value: str):
+            # escaped as the text format requires, e.g. for a meter name with a quote
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        def labelText(labels: dict):
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{key}="{labelValue(value)}"' for key, value in labels.items()) + "}"
+
+        report = self.to_dict()
+        lines = []
+        names = []
+        for entry in report["counters"]:
+            name = f"{self.PREFIX}_{entry['name']}_total"
+            if name not in names:
+                names.append(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{labelText(entry['labels'])} {entry['value']}")
+        for kind in ["summary", "max"]:
+            for entry in report["timers"]:
+                name = f"{self.PREFIX}_{entry['name']}"
+                labels = labelText(entry["labels"])
+                if kind == "summary":
+                    if name not in names:
+                        names.append(name)
+                        lines.append(f"# TYPE {name} summary")
+                    lines.append(f"{name}_count{labels} {entry['count']}")
+                    lines.append(f"{name}_sum{labels} {entry['sum']}")
+                else:
+                    if f"{name}_max" not in names:
+                        names.append(f"{name}_max")
+                        lines.append(f"# TYPE {name}_max gauge")
+                    lines.append(f"{name}_max{labels} {entry['max']}")
+
+        return "\n".join(lines) + "\n"
+
+    def to_prometheus_file(self, file_name: str):
+        """write all values in the Prometheus text format, e.g. for the textfile collector"""
+        with open(file_name, "w") as file:
+            file.write(self.to_prometheus())
+
+
+# registry shared by the whole pipeline, cumulative over all runs of the process
+metrics = Metrics()
@@ -1,119 +1,161 @@
 import pandas as pd
-import threading
+import numpy as np
 import logging
 import json
 import datetime
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
 from libs.Meter.EmuMeterClass import EmuMeter
 from libs.Meter.meterClass import Meter
-
-def readOutMeterThread(
+from libs.Meter.replayMeterClass import ReplayMeter
+from libs.Cache.meterCacheClass import MeterCache
+from libs.Acquisition.acquisitionClass import AcquisitionEngine, MeterReadError
+from libs.Acquisition.alignment import align_meters
+from libs.Billing.billingEngine import calculate_billing, billing_columns
+from libs.Billing.compact import compact_energy, compact_wh, is_compact
+from libs.Billing.rollupClass import RollupIndex
+from libs.Billing.summaryClass import BillingSummary
+from libs.Billing.incrementalClass import IncrementalBilling
+from libs.Billing.tariffClass import Tariff
+from libs.Billing.localTime import DEFAULT_TIMEZONE, epoch_time
+from libs.Metrics.metricsClass import metrics
+
+log = logging.getLogger("Main")
+
+def readOutMeter(
     meter: Meter,
     start_epoch_time: int, 
     stop_epoch_time: int, 
-    results: dict,
+    cache_dir: str = "cache",
+    offline: bool = False,
     ):
     """
     Reads meter data for a given meter within a specified time range, using cache if available.
 
-    Attempts to load meter data from a local cache file. If the cache is missing or invalid,
-    downloads the data from the meter device, saves it to cache, and updates the results dictionary.
+    The meter cache keeps track of the index intervals it already holds. Only entries
+    missing in the cache are downloaded from the meter device and added to the cache.
+    Meters with local data, like a ReplayMeter, are read directly.
 
     Args:
         meter (Meter): Meter object to read data from.
         start_epoch_time (int): Start time in epoch seconds.
         stop_epoch_time (int): Stop time in epoch seconds.
-        results (dict): Dictionary to store the resulting DataFrame, keyed by meter name.
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+        offline (bool, optional): Only read the cache, never download from the meter.
+            Defaults to False.
 
     Returns:
-        None. The results dictionary is updated in place with the meter data as a pandas DataFrame.
+        pd.DataFrame: The meter data.
     """
-    try:
-        # try to read from cache
-        data = pd.read_pickle(f"cache/{meter.name}_{start_epoch_time}_{stop_epoch_time}.secret")
-        meter.log.info(" Data read from cache.")
-    except OSError:
-        # download from meter and save to cache
-        data = meter.read(start_epoch_time, stop_epoch_time)
-        data.to_pickle(f"cache/{meter.name}_{start_epoch_time}_{stop_epoch_time}.secret")
-        meter.log.info(" Data cached.")
+    if meter.local:
+        return meter.read(start_epoch_time, stop_epoch_time)
+    return MeterCache(meter, cache_dir).read(start_epoch_time, stop_epoch_time, offline)
 
-    results[meter.name] = data
-
-def getEnergyData(
+def getMeterReadings(
     start_epoch_time: int,
     stop_epoch_time: int,
     meter_list: List[Meter],
+    meter_timeout: float = None,
+    cache_dir: str = "cache",
+    executor: ThreadPoolExecutor = None,
+    offline: bool = False,
     ):
     """
-    Collects and combines energy data from multiple meters over a specified time range.
+    Reads the cumulative meter readings of multiple meters over a specified time range.
 
-    Spawns threads to read data from each meter (using cache if available), renames columns for 
-    clarity, merges all meter data into a single DataFrame, and calculates the difference between 
-    consecutive readings.
+    Reads all meters concurrently (using cache if available) and aligns all meter data on one
+    shared 15 min time grid. Slots a meter has no entry for are NaN and listed in attrs["gaps"].
 
     Args:
         start_epoch_time (int): Start time in epoch seconds.
         stop_epoch_time (int): Stop time in epoch seconds.
         meters (List[Meter]): List of Meter objects.
+        meter_timeout (float, optional): Timeout per meter in seconds. Defaults to no timeout.
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+        executor (ThreadPoolExecutor, optional): Worker pool for the meter reads, shared with
+            other reads. Defaults to an own pool.
+        offline (bool, optional): Only read the meter caches, never download from the meters,
+            e.g. for a service answering from the data of the collector. Defaults to False.
+
+    Raises:
+        MeterReadError: If at least one meter could not be read.
 
     Returns:
-        pd.DataFrame: Combined DataFrame containing energy data from all meters, with columns 
-        renamed and differences calculated.
+        pd.DataFrame: Combined DataFrame containing the readings of all meters.
     """
     if start_epoch_time >= stop_epoch_time:
         raise ValueError("The start-time has to be earlier than the stop-time.")
     if meter_list.__len__() == 0:
         raise MemoryError("At least one meter has to be given.")
 
-    results = {}
-    threads = []
-
-    # start downloads as threads
-    for meter in meter_list:
-        thread = threading.Thread(
-            target=readOutMeterThread,
-            args=(
-                meter,
-                start_epoch_time, 
-                stop_epoch_time, 
-                results,
-            ),
+    # read all meters concurrently
+    with metrics.timer("stage_seconds", stage="read"):
+        readFunction = lambda meter, start, stop: readOutMeter(meter, start, stop, cache_dir, offline)
+        results = AcquisitionEngine(meter_list, readFunction, timeout=meter_timeout, executor=executor).run(
+            start_epoch_time, stop_epoch_time
         )
-        thread.daemon = True
-        threads.append(thread)
-        thread.start()
-        log.debug(f" Thread to read meter \"{meter.name}\" started.")
 
-    # wait for threads to be done
+    # place all meters on one shared time grid
+    with metrics.timer("stage_seconds", stage="align"):
+        meterData = align_meters({meter.name: results[meter.name] for meter in meter_list}, EmuMeter.LOG_INTERVAL)
+    metrics.increment("stage_rows", len(meterData), stage="align")
+    log.debug(" Data of all meters aligned.")
+
+    return meterData
+
+def getEnergyData(
+    start_epoch_time: int,
+    stop_epoch_time: int,
+    meter_list: List[Meter],
+    meter_timeout: float = None,
+    cache_dir: str = "cache",
+    executor: ThreadPoolExecutor = None,
+    compact: bool = False,
+    offline: bool = False,
+    ):
+    """
+    Collects and combines energy data from multiple meters over a specified time range.
+
+    Reads all meters concurrently (using cache if available), aligns all meter data on one
+    shared 15 min time grid, and calculates the difference between consecutive readings.
+    Slots a meter has no entry for are NaN and listed in attrs["gaps"].
+
+    Args:
+        start_epoch_time (int): Start time in epoch seconds.
+        stop_epoch_time (int): Stop time in epoch seconds.
+        meters (List[Meter]): List of Meter objects.
+        meter_timeout (float, optional): Timeout per meter in seconds. Defaults to no timeout.
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+        executor (ThreadPoolExecutor, optional): Worker pool for the meter reads, shared with
+            other reads. Defaults to an own pool.
+        compact (bool, optional): Return the compact representation, see libs.Billing.compact.
+            Defaults to False.
+        offline (bool, optional): Only read the meter caches, never download from the meters.
+            Defaults to False.
+
+    Raises:
+        MeterReadError: If at least one meter could not be read.
+
+    Returns:
+        pd.DataFrame: Combined DataFrame containing energy data from all meters, with columns 
+        renamed and differences calculated.
+    """
     try:
-        threadsAlive = True
-        while threadsAlive:
-            threadsAlive = False
-            for thread in threads:
-                threadsAlive = threadsAlive or thread.is_alive()
-                thread.join(1)
+        meterData = getMeterReadings(
+            start_epoch_time, stop_epoch_time, meter_list, meter_timeout, cache_dir, executor, offline
+        )
     except KeyboardInterrupt:
         log.warning(" Meter read has been canceled")
         return pd.DataFrame()
 
-    # merge data in to one DataFrame
-    meterData = pd.DataFrame()
-    for meter in meter_list:
-        try:
-            meterData = pd.merge(meterData, 
-                                    results[meter.name], 
-                                    on="Timestamp", 
-                                    how="outer",
-                                    )
-        except KeyError:
-            meterData = results[meter.name]
-        log.debug(f" Data from meter \"{meter.name}\" merged.")
-
     # calculate diff
-    meterData.set_index("Timestamp", inplace=True)
-    meterData = meterData.diff()
-    meterData.reset_index(inplace=True)
+    with metrics.timer("stage_seconds", stage="diff"):
+        meterData.set_index("Timestamp", inplace=True)
+        meterData = meterData.diff()
+        meterData.reset_index(inplace=True)
+
+    if compact:
+        meterData = compact_energy(meterData)
 
     return meterData
 
@@ -144,129 +186,249 @@ def combineMeters(energyDF: pd.DataFrame, importMeter: str, exportMeter: str):
             The input DataFrame with modified meter columns, where the import
             meter contains the net energy values and the export meter is set to zero.
     """
+    return combineMeterPairs(energyDF, [(importMeter, exportMeter)])
 
-    # production < consumtion
-    energyDF.loc[energyDF[f"{exportMeter}_Export_Wh"] < energyDF[f"{importMeter}_Import_Wh"], "temp_Export_Wh"] = 0
-    energyDF.loc[energyDF[f"{exportMeter}_Export_Wh"] < energyDF[f"{importMeter}_Import_Wh"], "temp_Import_Wh"] = energyDF[f"{importMeter}_Import_Wh"] - energyDF[f"{exportMeter}_Export_Wh"]
+@metrics.timer("stage_seconds", stage="combine")
+def combineMeterPairs(energyDF: pd.DataFrame, pairs: List[Tuple[str, str]]):
+    """
+    Combines several pairs of import (consumption) and export (production) meters in one call.
+
+    Works like combineMeters for every (importMeter, exportMeter) pair, in the given order.
+    The net import and export are computed on the column arrays without helper columns
+    and written back once at the end. Equal production and consumption gives zero for both.
+    A compact DataFrame stays compact.
+
+    Args:
+        energyDF (pd.DataFrame):
+            DataFrame containing energy readings for all meters.
+        pairs (List[Tuple[str, str]]):
+            List of (importMeter, exportMeter) names to combine.
+
+    Raises:
+        KeyError: If one of the meter names has no columns in energyDF.
+
+    Returns:
+        pd.DataFrame:
+            The input DataFrame with modified meter columns.
+    """
+    compact = is_compact(energyDF)
+    columns = {}
+    def column(name: str):
+        if name not in columns:
+            columns[name] = energyDF[name].to_numpy(dtype=float)
+        return columns[name]
 
-    # production > consumtion
-    energyDF.loc[energyDF[f"{exportMeter}_Export_Wh"] > energyDF[f"{importMeter}_Import_Wh"], "temp_Export_Wh"] = energyDF[f"{exportMeter}_Export_Wh"] - energyDF[f"{importMeter}_Import_Wh"]
-    energyDF.loc[energyDF[f"{exportMeter}_Export_Wh"] > energyDF[f"{importMeter}_Import_Wh"], "temp_Import_Wh"] = 0
+    for importMeter, exportMeter in pairs:
+        net = column(f"{importMeter}_Import_Wh") - column(f"{exportMeter}_Export_Wh")
+        # NaN stays NaN, np.maximum propagates it
+        columns[f"{importMeter}_Import_Wh"] = np.maximum(net, 0)
+        columns[f"{importMeter}_Export_Wh"] = np.maximum(-net, 0)
 
-    energyDF[f"{importMeter}_Import_Wh"] = energyDF["temp_Import_Wh"]
-    energyDF[f"{importMeter}_Export_Wh"] = energyDF["temp_Export_Wh"]
+        columns[f"{exportMeter}_Import_Wh"] = np.zeros(len(energyDF))
+        columns[f"{exportMeter}_Export_Wh"] = np.zeros(len(energyDF))
 
-    energyDF[f"{exportMeter}_Import_Wh"] = 0
-    energyDF[f"{exportMeter}_Export_Wh"] = 0
+    for name, values in columns.items():
+        energyDF[name] = compact_wh(values) if compact else values
 
     return energyDF
 
-def calculate(energyDF: pd.DataFrame, userMeter_list: List[str]):
+@metrics.timer("stage_seconds", stage="calculate")
+def calculate(energyDF: pd.DataFrame, userMeter_list: List[str], pairwise: bool = False):
     """
     Calculates energy distribution, consumption, and production for each user meter.
 
     This function computes total production and consumption, energy sold and bought via the energy provider (EW),
     internal energy exchanges between users, and meter error. It adds new columns to the DataFrame for
-    each user's bought/sold energy, internal energy transactions, and overall statistics.
+    each user's bought/sold energy, internal energy transactions, and overall statistics. All users are
+    calculated at once on an import/export matrix, see libs.Billing.billingEngine.
+
+    The energy users bought from each other is only summed over the whole period and stored in
+    attrs["transferMatrix_Wh"][seller][buyer]. The per interval
+    "<seller>_2_<buyer>_EnBoughtInt_Wh" columns are only added if pairwise is set.
+
+    For a compact DataFrame (see libs.Billing.compact) the billing is calculated in float64
+    and the new columns are stored as float32.
 
     Args:
         energyDF (pd.DataFrame): DataFrame containing energy readings for all meters.
         userMeter_list (List[str]): List of user Meter names (excluding EW).
+        pairwise (bool, optional): Add the per interval columns of energy bought between users.
 
     Returns:
-        pd.DataFrame: The input DataFrame with additional columns for energy calculations and statistics.
+        pd.DataFrame: A copy of the input DataFrame with additional columns for energy calculations and statistics.
     """
-    # calculation derived from here: 
-    # https://www.bulletin.ch/de/news-detail/gerecht-abrechnen-bei-eigenverbrauch.html
-    
-    # calc total production and consumption
-    energyDF["totalProd_Wh"] = 0  
-    energyDF["totalUse_Wh"] = 0
-    for meter in userMeter_list:
-        energyDF["totalProd_Wh"] += energyDF[f"{meter}_Export_Wh"]
-        energyDF["totalUse_Wh"] += energyDF[f"{meter}_Import_Wh"]
-
-    energyDF["eigenV_Wh"] = energyDF["totalProd_Wh"] - energyDF["ewMeter_Export_Wh"]
-    for meter in userMeter_list:
-        # calc energy sold and bought
-        energyDF[f"{meter}_EnSold_Wh"] = energyDF["ewMeter_Export_Wh"] * (
-            energyDF[f"{meter}_Export_Wh"] / energyDF["totalProd_Wh"])
-        energyDF[f"{meter}_EnBought_Wh"] = energyDF["ewMeter_Import_Wh"] * (
-            energyDF[f"{meter}_Import_Wh"] / energyDF["totalUse_Wh"])
-
-        # calc eigenverbrauch enregy (can be combined with energy sold)
-        energyDF[f"{meter}_EnSoldInt_Wh"] = energyDF["eigenV_Wh"] * (
-            energyDF[f"{meter}_Export_Wh"] / energyDF["totalProd_Wh"])
-
-    # calc eigenverbrauch energy
-    for meter in userMeter_list:
-        energyDF[f"{meter}_EnBoughtInt_Wh"] = (
-            energyDF[f"{meter}_Import_Wh"] - energyDF[f"{meter}_EnBought_Wh"])
-        internalFremdProduktion = 0
-        for meter2 in userMeter_list:
-            if not (meter == meter2):
-                internalFremdProduktion += energyDF[f"{meter2}_EnSoldInt_Wh"]
-        for meter2 in userMeter_list:
-            if not (meter == meter2):
-                energyDF[f"{meter2}_2_{meter}_EnBoughtInt_Wh"] = (
-                    energyDF[f"{meter2}_EnSoldInt_Wh"] * (
-                        energyDF[f"{meter}_EnBoughtInt_Wh"] / internalFremdProduktion))
-
-    # calculate meter error    
-    energyDF["EnergyIn_Wh"] = energyDF["totalProd_Wh"] + energyDF["ewMeter_Import_Wh"]
-    energyDF["EnergyOut_Wh"] = energyDF["totalUse_Wh"] + energyDF["ewMeter_Export_Wh"]
-    energyDF["EnergyError_Wh"] = energyDF["EnergyIn_Wh"] - energyDF["EnergyOut_Wh"]
-    
+    userMeter_list = list(userMeter_list)
+    metrics.increment("stage_rows", len(energyDF), stage="calculate")
+    result = calculate_billing(
+        energyDF[[f"{meter}_Import_Wh" for meter in userMeter_list]].to_numpy(dtype=float),
+        energyDF[[f"{meter}_Export_Wh" for meter in userMeter_list]].to_numpy(dtype=float),
+        energyDF["ewMeter_Import_Wh"].to_numpy(dtype=float),
+        energyDF["ewMeter_Export_Wh"].to_numpy(dtype=float),
+        pairwise=pairwise,
+    )
+    columns = billing_columns(result, userMeter_list)
+
+    # collect all new columns in one block, so the DataFrame is not fragmented
+    block = np.empty((len(columns), len(energyDF)), dtype=np.float32 if is_compact(energyDF) else np.float64)
+    for row, values in enumerate(columns.values()):
+        block[row] = values
+    newDF = pd.DataFrame(block.T, columns=list(columns), index=energyDF.index, copy=False)
+
+    # results of an earlier calculation are replaced, concat drops the attrs (e.g. the time grid)
+    attrs = dict(energyDF.attrs)
+    energyDF = energyDF.drop(columns=[name for name in columns if name in energyDF.columns])
+    energyDF = pd.concat([energyDF, newDF], axis=1)
+    energyDF.attrs = attrs
+    energyDF.attrs["transferMatrix_Wh"] = {
+        seller: {buyer: float(result["EnBoughtIntTotal_Wh"][i, j]) for j, buyer in enumerate(userMeter_list)}
+        for i, seller in enumerate(userMeter_list)
+    }
+
     return energyDF
 
-def displayResults(energyDF, consumerKeys):
-    # print individual user stats
+def calculateChunked(
+    start_epoch_time: int,
+    stop_epoch_time: int,
+    meter_list: List[Meter],
+    userMeter_list: List[str],
+    combine_pairs: List[Tuple[str, str]] = None,
+    chunk: str = "MS",
+    cache_dir: str = "cache",
+    ):
+    """
+    Calculates the billing totals of a long period chunk by chunk with bounded memory.
+
+    The period is split at the chunk boundaries (e.g. at the start of every month). Every chunk is
+    read, combined and calculated on its own and only its totals are kept. The last reading of a
+    chunk is carried over to the next one, so the differences at the boundaries stay correct.
+    Peak memory depends on the chunk size, not on the length of the period.
+
+    Args:
+        start_epoch_time (int): Start time in epoch seconds.
+        stop_epoch_time (int): Stop time in epoch seconds.
+        meter_list (List[Meter]): List of Meter objects, including the EW meter.
+        userMeter_list (List[str]): List of user Meter names (excluding EW).
+        combine_pairs (List[Tuple[str, str]], optional): (importMeter, exportMeter) pairs to combine.
+        chunk (str, optional): pandas frequency of the chunk boundaries in UTC, like the meter
+            timestamps. Defaults to "MS" (month start).
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+
+    Returns:
+        BillingSummary: Totals of the whole period, None if there is no data in the period.
+    """
+    if start_epoch_time >= stop_epoch_time:
+        raise ValueError("The start-time has to be earlier than the stop-time.")
 
+    # boundaries on the naive UTC time of the meter timestamps, back to epoch seconds exactly
+    startTime = pd.Timestamp(start_epoch_time, unit="s")
+    stopTime = pd.Timestamp(stop_epoch_time, unit="s")
+    boundaries = [startTime] + [time for time in pd.date_range(startTime, stopTime, freq=chunk) if startTime < time < stopTime] + [stopTime]
+    epochTimes = [start_epoch_time] + [time.value / 10**9 for time in boundaries[1:-1]] + [stop_epoch_time]
+
+    # only the totals of every chunk are kept, each chunk continues from the last reading
+    billing = IncrementalBilling(userMeter_list, combine_pairs)
+    for chunkStart, chunkStop, startEpoch, stopEpoch in zip(boundaries[:-1], boundaries[1:], epochTimes[:-1], epochTimes[1:]):
+        log.info(f" Calculating chunk {chunkStart} to {chunkStop}.")
+        readings = getMeterReadings(startEpoch, stopEpoch, meter_list, cache_dir=cache_dir)
+        billNewIntervals(billing, readings)
+
+    return billing.summary
+
+def billNewIntervals(billing: IncrementalBilling, readings: pd.DataFrame):
+    """
+    Bills the intervals of the readings after the last reading of a running billing and
+    adds their totals to it. Older readings are skipped, so the cost depends on the
+    new intervals only.
+
+    Args:
+        billing (IncrementalBilling): running totals, updated in place.
+        readings (pd.DataFrame): cumulative meter readings as returned by getMeterReadings.
+
+    Returns:
+        pd.DataFrame: Output of calculate for the new intervals, empty if there are none.
+    """
+    with metrics.timer("stage_seconds", stage="diff"):
+        energyDF = billing.energy(readings)
+    if energyDF.empty:
+        return energyDF
+
+    energyDF = combineMeterPairs(energyDF, billing.combine_pairs)
+    energyDF = calculate(energyDF, billing.users)
+    billing.add(energyDF)
+
+    return energyDF
+
+def updateBilling(
+    billing: IncrementalBilling,
+    start_epoch_time: int,
+    stop_epoch_time: int,
+    meter_list: List[Meter],
+    cache_dir: str = "cache",
+    ):
+    """
+    Continues a running billing up to a stop time. Only the meter readings after the last
+    billed reading are read and billed, e.g. for a daily or live statement of the current
+    billing period.
+
+    Args:
+        billing (IncrementalBilling): running totals, updated in place.
+        start_epoch_time (int): Start time of the billing period in epoch seconds, used if
+            nothing is billed yet.
+        stop_epoch_time (int): Stop time in epoch seconds.
+        meter_list (List[Meter]): List of Meter objects, including the EW meter.
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+
+    Returns:
+        pd.DataFrame: Output of calculate for the new intervals, empty if there are none.
+    """
+    if billing.last_time is not None:
+        start_epoch_time = billing.last_time.timestamp()
+    if start_epoch_time >= stop_epoch_time:
+        return pd.DataFrame()
+
+    readings = getMeterReadings(start_epoch_time, stop_epoch_time, meter_list, cache_dir=cache_dir)
+    return billNewIntervals(billing, readings)
+
+def writeMetrics(file_name: str = "metrics"):
+    """
+    Writes the metrics of all runs of this session as "<file_name>.json" and in the
+    Prometheus text format as "<file_name>.prom". The metrics are cumulative, a report
+    after a second run holds the sums of both runs. Call metrics.reset() to report a
+    single run.
+
+    Args:
+        file_name (str, optional): Path of the reports without extension. Defaults to "metrics".
+    """
+    metrics.to_json(f"{file_name}.json")
+    metrics.to_prometheus_file(f"{file_name}.prom")
+
+def displayCosts(energyDF, consumerKeys, tariff: Tariff):
+    costs = tariff.costs(energyDF, consumerKeys)
+    print(" Kosten:")
+    for user, row in costs.iterrows():
+        print(f"          {user}:")
+        print(f"            EW Bezug: {row['EnBought_CHF']:.2f} CHF")
+        print(f"           ZEV Bezug: {row['EnBoughtInt_CHF']:.2f} CHF")
+        print(f"          EW Verkauf: {row['EnSold_CHF']:.2f} CHF")
+        print(f"          ZEV Einsp.: {row['EnSoldInt_CHF']:.2f} CHF")
+        print(f"               Total: {row['Total_CHF']:.2f} CHF")
+
+def displayMonthlyStatements(rollup: RollupIndex, consumerKeys, firstMonth, lastMonth):
+    # every month is one difference of prefix sums, no data is recalculated
+    months = rollup.monthly(firstMonth, lastMonth)
     for user in consumerKeys:
         print(f" {user}:")
-        data = energyDF[f"{user}_EnBought_Wh"].sum() / 1000
-        if data > 0: 
-            print(f"       EW Bezug: {data:.3f} kWh")
-        data = energyDF[f"{user}_EnSold_Wh"].sum() / 1000
-        if data > 0: 
-            print(f"     EW Verkauf: {data:.3f} kWh")
-        data = energyDF[f"{user}_EnBoughtInt_Wh"].sum() / 1000
-        if data > 0: 
-            print(f"      ZEV Bezug: {data:.3f} kWh")
-        for user2 in consumerKeys:
-            if not (user == user2):
-                data = energyDF[f"{user2}_2_{user}_EnBoughtInt_Wh"].sum() / 1000
-                if data > 0: 
-                    print(f"         - von {user2}: {data:.3f} kWh")
-        data = energyDF[f"{user}_EnSoldInt_Wh"].sum() / 1000
-        if data > 0: 
-            print(f"     ZEV Einsp.: {data:.3f} kWh")
+        print("          Monat   EW Bezug  EW Verkauf   ZEV Bezug ZEV Einsp.")
+        for month, row in months.iterrows():
+            print(
+                f"        {str(month)}"
+                f" {row[f'{user}_EnBought_Wh'] / 1000:10.3f}"
+                f" {row[f'{user}_EnSold_Wh'] / 1000:11.3f}"
+                f" {row[f'{user}_EnBoughtInt_Wh'] / 1000:11.3f}"
+                f" {row[f'{user}_EnSoldInt_Wh'] / 1000:10.3f}"
+            )
         print("")
 
-    # print overall stats
-    print(" Stats:")
-    data = 0
-    for user in consumerKeys:
-        data += energyDF[f"{user}_EnBought_Wh"].sum() / 1000
-    if data > 0: 
-        print(f"       EW Bezug: {data:.3f} kWh")
-    data = 0
-    for user in consumerKeys:
-        data += energyDF[f"{user}_EnSold_Wh"].sum() / 1000
-    if data > 0: 
-        print(f"      EW Einsp.: {data:.3f} kWh")
-    data = energyDF["EnergyError_Wh"].sum() / 1000
-    if data > 0: 
-        print(f"    Meter Error: {data:.3f} kWh")
-    for user in consumerKeys:
-        print(f"          {user}:")
-        data = energyDF[f"{user}_EnBought_Wh"].sum() / 1000 + energyDF[f"{user}_EnBoughtInt_Wh"].sum() / 1000
-        if data > 0: 
-            print(f"               used: {data:.3f} kWh")
-        data = energyDF[f"{user}_EnSold_Wh"].sum() / 1000 + energyDF[f"{user}_EnSoldInt_Wh"].sum() / 1000
-        if data > 0: 
-            print(f"            prodced: {data:.3f} kWh")
-
 def menu(options: dict, question: str):
     print(
         "========================================================================================"
@@ -330,19 +492,57 @@ def meterConfig(confData: dict):
 
     return confData
 
-def readMeters(confData: dict):
+def parseDate(value: str, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Parses a date like "1.1.2025", midnight in the local time of the ZEV. All dates entered
+    in the menu, in batch.py and in collector.py are parsed like this, server.py takes
+    the same local time for ISO dates without a zone.
+
+    Args:
+        value (str): Date in the format "%d.%m.%Y".
+        timezone (str, optional): Local timezone of the ZEV, confData["timezone"]. Defaults to "Europe/Zurich".
+
+    Raises:
+        ValueError: If the value is no valid date.
+
+    Returns:
+        float: Time in epoch seconds.
+    """
+    return epoch_time(datetime.datetime.strptime(value, "%d.%m.%Y"), timezone)
+
+def askPeriod(timezone: str = DEFAULT_TIMEZONE):
     print("Tip: Vom eingegebenen Datum wird immer Mitternacht angenommen. Für 1 Jahr")
     print("     wäre das Start-, und Enddatum also jehweils dasselbe, ausser dem Jahr")
-    startTime = datetime.datetime.strptime(input("Bitte Startdatum der Auslesung im Format \"1.1.1970\" eingeben: "),"%d.%m.%Y")
-    stopTime = datetime.datetime.strptime(input("Bitte Enddatum der Auslesung im Format \"1.1.1971\" eingeben: "),"%d.%m.%Y")
-    
+    startTime = parseDate(input("Bitte Startdatum der Auslesung im Format \"1.1.1970\" eingeben: "), timezone)
+    stopTime = parseDate(input("Bitte Enddatum der Auslesung im Format \"1.1.1971\" eingeben: "), timezone)
+
+    return startTime, stopTime
+
+def buildMeter(address: str, name: str, max_connections: int = EmuMeter.MAX_CONNECTIONS):
+    """
+    Creates the meter of a configured address. An address like "file:logs/flat1/*.csv"
+    replays exported log files, any other address is the host of an EMU Pro II meter.
+
+    Returns:
+        Meter: EmuMeter or ReplayMeter
+    """
+    if address.startswith("file:"):
+        return ReplayMeter(address[len("file:"):], name)
+    return EmuMeter(address, name, max_connections=max_connections)
+
+def buildMeterList(confData: dict, max_connections: int = EmuMeter.MAX_CONNECTIONS):
     meter_list = []
     for meter in confData["meters"].keys():
-        newMeter = EmuMeter(confData["meters"][meter], meter)
+        newMeter = buildMeter(confData["meters"][meter], meter, max_connections)
         meter_list.append(newMeter)
-    meter_list.append(EmuMeter(confData["ewMeter"], "ewMeter"))
-        
-    return getEnergyData(datetime.datetime.timestamp(startTime), datetime.datetime.timestamp(stopTime), meter_list)
+    meter_list.append(buildMeter(confData["ewMeter"], "ewMeter", max_connections))
+
+    return meter_list
+
+def readMeters(confData: dict):
+    startTime, stopTime = askPeriod(confData.get("timezone", DEFAULT_TIMEZONE))
+
+    return getEnergyData(startTime, stopTime, buildMeterList(confData))
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
@@ -353,8 +553,13 @@ if __name__ == "__main__":
         "2" : "Zähler auslesen",
         "3" : "Zähler kombinieren",
         "4" : "Abrechnen",
+        "5" : "Langen Zeitraum abrechnen",
+        "6" : "Monatsauszüge",
+        "7" : "Laufende Periode abrechnen",
         "9" : "beenden",
     }
+    combinePairs = []
+    rollup = None
 
     try:
         with open("src/confData.secret", "r") as file:
@@ -374,17 +579,86 @@ if __name__ == "__main__":
         elif answer == "Zähler konfigurieren":
             confData = meterConfig(confData)
         elif answer == "Zähler auslesen":
-            data = readMeters(confData)
+            try:
+                data = readMeters(confData)
+            except MeterReadError as error:
+                for result in error.failed:
+                    print(f"Zähler \"{result.name}\" konnte nicht ausgelesen werden: {result.error}")
+            writeMetrics()
         elif answer == "Zähler kombinieren":
             meter1 = input("Verbrauchszähler der kombiniert werden soll: ")
             meter2 = input("Produktionszähler der kombiniert werden soll: ")
             try:
                 data = combineMeters(data, meter1, meter2)
+                combinePairs.append((meter1, meter2))
             except KeyError:
                 print(f"Einer der Zählernamen \"{meter1}\" oder \"{meter2}\" ist ungültig.")
         elif answer == "Abrechnen":
             data = calculate(data, confData["meters"].keys())
-            displayResults(data, confData["meters"].keys())
-            data.to_csv("output.csv", index=False, sep=';')
+            summary = BillingSummary.from_frame(data, confData["meters"].keys())
+            print(summary.render_text())
+            tariff = Tariff.from_config(confData["tariff"], confData.get("timezone", DEFAULT_TIMEZONE)) if "tariff" in confData else None
+            if tariff is not None:
+                displayCosts(data, confData["meters"].keys(), tariff)
+            with metrics.timer("stage_seconds", stage="export"):
+                summary.to_csv("summary.csv")
+                data.to_csv("output.csv", index=False, sep=';')
+                if tariff is not None:
+                    tariff.invoice(data, confData["meters"].keys()).to_csv("invoice.csv", sep=';')
+                rollup = RollupIndex(data, timezone=confData.get("timezone", DEFAULT_TIMEZONE))
+                rollup.save("cache/rollup.secret.npz")
+            writeMetrics()
+        elif answer == "Langen Zeitraum abrechnen":
+            # reads the meters month by month, the combinations of this session are applied
+            startTime, stopTime = askPeriod(confData.get("timezone", DEFAULT_TIMEZONE))
+            try:
+                summary = calculateChunked(startTime, stopTime, buildMeterList(confData), confData["meters"].keys(), combinePairs)
+            except MeterReadError as error:
+                for result in error.failed:
+                    print(f"Zähler \"{result.name}\" konnte nicht ausgelesen werden: {result.error}")
+            else:
+                if summary is None:
+                    print("Im gewählten Zeitraum sind keine Daten vorhanden.")
+                else:
+                    print(summary.render_text())
+                    with metrics.timer("stage_seconds", stage="export"):
+                        summary.to_csv("summary.csv")
+            writeMetrics()
+        elif answer == "Laufende Periode abrechnen":
+            # only the intervals since the last statement of the period are read and billed
+            billing = None
+            try:
+                billing = IncrementalBilling.load("cache/billing.secret.json")
+                print(f"Laufende Periode abgerechnet bis {billing.last_time}.")
+                if input("Periode fortsetzen? (j/n): ") != "j":
+                    billing = None
+            except (OSError, ValueError, KeyError):
+                pass
+            startTime = None
+            if billing is None:
+                billing = IncrementalBilling(confData["meters"].keys(), combinePairs)
+                startTime = parseDate(input("Beginn der Periode im Format \"1.1.1970\": "), confData.get("timezone", DEFAULT_TIMEZONE))
+            try:
+                updateBilling(billing, startTime, datetime.datetime.now().timestamp(), buildMeterList(confData))
+            except MeterReadError as error:
+                for result in error.failed:
+                    print(f"Zähler \"{result.name}\" konnte nicht ausgelesen werden: {result.error}")
+            else:
+                if billing.summary is None:
+                    print("Im gewählten Zeitraum sind keine Daten vorhanden.")
+                else:
+                    print(billing.summary.render_text())
+                    billing.save("cache/billing.secret.json")
+            writeMetrics()
+        elif answer == "Monatsauszüge":
+            if rollup is None:
+                try:
+                    rollup = RollupIndex.load("cache/rollup.secret.npz")
+                except OSError:
+                    print("Es gibt noch keine Abrechnung. Bitte zuerst abrechnen.")
+                    continue
+            firstMonth = datetime.datetime.strptime(input("Erster Monat im Format \"1.1970\": "), "%m.%Y")
+            lastMonth = datetime.datetime.strptime(input("Letzter Monat im Format \"12.1970\": "), "%m.%Y")
+            displayMonthlyStatements(rollup, confData["meters"].keys(), firstMonth, lastMonth)
         else:
             print(f"Auswahl \"{answer}\" ist ungültig")
@@ -0,0 +1,308 @@
+import argparse
+import datetime
+import json
+import logging
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+import pandas as pd
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Meter.meterClass import Meter
+from libs.Acquisition.acquisitionClass import MeterReadError
+from libs.Billing.summaryClass import BillingSummary
+from libs.Billing.tariffClass import Tariff
+from libs.Billing.localTime import DEFAULT_TIMEZONE, epoch_time
+from libs.Cache.resultCacheClass import ResultCache
+from libs.Metrics.metricsClass import metrics
+from main import getEnergyData, combineMeterPairs, calculate, buildMeterList
+
+# Read only JSON service for the dashboards of the ZEV users. The answers are calculated
+# from the meter cache filled by collector.py, the meters are never asked. Calculated
+# periods are kept in memory, a repeated query is answered without reading the cache.
+# Optionally the configuration holds the meter pairs to combine, like a batch site, and
+# a "tariff" for the costs. Query dates without a zone are local times of the ZEV, like
+# the dates of main.py and batch.py, the times of the answers are UTC like the meter
+# timestamps.
+#
+#   python src/server.py --config src/confData.secret --port 8080
+#
+#   GET /summary?start=2025-01-01&stop=2025-04-01       totals of all users
+#   GET /users/flat1?start=2025-01-01&stop=2025-04-01   totals of one user
+#   GET /status                                         fill level of the result cache
+#   GET /metrics                                        metrics in the Prometheus text format
+
+log = logging.getLogger("Server")
+
+DEFAULT_LIVE_TTL = 300
+
+
+def configKey(confData: dict):
+    """
+    Key of everything in a configuration the results depend on.
+
+    Returns:
+        str: Canonical JSON of the meters, the combined pairs, the tariff and the timezone.
+    """
+    return json.dumps({key: confData.get(key) for key in ("meters", "ewMeter", "combine", "tariff", "timezone")}, sort_keys=True)
+
+
+def parseTime(value: str, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Parses a query time, either epoch seconds or an ISO time like "2025-01-01". ISO times
+    without a zone are local times of the ZEV, like the dates parsed by main.parseDate.
+
+    Raises:
+        ValueError: If the value is no valid time.
+
+    Returns:
+        float: Time in epoch seconds.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    return epoch_time(datetime.datetime.fromisoformat(value), timezone)
+
+
+def calculatePeriod(
+    confData: dict,
+    start_epoch_time: float,
+    stop_epoch_time: float,
+    cache_dir: str = "cache",
+    meter_list: List[Meter] = None,
+    ):
+    """
+    Calculates the billing of a period from the meter cache only.
+
+    Args:
+        confData (dict): Configuration like confData.secret, optionally with "combine", "tariff" and "timezone".
+        start_epoch_time (float): Start time in epoch seconds.
+        stop_epoch_time (float): Stop time in epoch seconds.
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+        meter_list (List[Meter], optional): Meters of the configuration, built once for all
+            queries. Defaults to building them from confData.
+
+    Raises:
+        MeterReadError: If the cache of a meter could not be read.
+
+    Returns:
+        dict: Period with "dataFrom" and "dataTo", the time range with data, the missing slots
+            of every meter in "gaps", the "summary" (see BillingSummary.to_dict) and the
+            "costs" of every user. Without data, "summary" is None.
+    """
+    users = list(confData["meters"])
+    result = {
+        "start": pd.Timestamp(start_epoch_time, unit="s").isoformat(),
+        "stop": pd.Timestamp(stop_epoch_time, unit="s").isoformat(),
+        "dataFrom": None,
+        "dataTo": None,
+        "gaps": {},
+        "summary": None,
+        "costs": None,
+    }
+    if meter_list is None:
+        meter_list = buildMeterList(confData)
+    energyDF = getEnergyData(start_epoch_time, stop_epoch_time, meter_list, cache_dir=cache_dir, offline=True)
+    if len(energyDF) < 2:
+        return result
+
+    energyDF = combineMeterPairs(energyDF, [tuple(pair) for pair in confData.get("combine", [])])
+    energyDF = calculate(energyDF, users)
+    result["dataFrom"] = energyDF["Timestamp"].iloc[0].isoformat()
+    result["dataTo"] = energyDF["Timestamp"].iloc[-1].isoformat()
+    result["gaps"] = {
+        name: [[first.isoformat(), last.isoformat()] for first, last in runs]
+        for name, runs in energyDF.attrs.get("gaps", {}).items()
+    }
+    result["summary"] = BillingSummary.from_frame(energyDF, users).to_dict()
+    if "tariff" in confData:
+        costs = Tariff.from_config(confData["tariff"], confData.get("timezone", DEFAULT_TIMEZONE)).costs(energyDF, users)
+        result["costs"] = {user: {name: float(value) for name, value in row.items()} for user, row in costs.iterrows()}
+
+    return result
+
+
+def queryPeriod(
+    results: ResultCache,
+    confData: dict,
+    start_epoch_time: float,
+    stop_epoch_time: float,
+    cache_dir: str = "cache",
+    live_ttl: float = DEFAULT_LIVE_TTL,
+    meter_list: List[Meter] = None,
+    ):
+    """
+    Billing of a period, from the result cache if it was calculated before. A period the
+    cache has not all data of yet, e.g. the running month, expires after live_ttl, so new
+    data of the collector shows up. The other arguments are the ones of calculatePeriod.
+
+    Returns:
+        dict: Period as returned by calculatePeriod.
+    """
+    def compute():
+        result = calculatePeriod(confData, start_epoch_time, stop_epoch_time, cache_dir, meter_list)
+        complete = (
+            result["dataTo"] is not None
+            and pd.Timestamp(result["dataTo"]).value / 10**9 + EmuMeter.LOG_INTERVAL > stop_epoch_time
+            and not any(result["gaps"].values())
+        )
+        return result, len(json.dumps(result)), None if complete else live_ttl
+
+    return results.get_or_compute((start_epoch_time, stop_epoch_time, configKey(confData)), compute)
+
+
+def userResult(period: dict, user: str):
+    """
+    Part of a period of one user.
+
+    Returns:
+        dict: Totals of the user, the energy bought from and sold to every other user and the costs.
+    """
+    if period["summary"] is None:
+        totals, boughtFrom, soldTo, costs = None, {}, {}, None
+    else:
+        summary = period["summary"]
+        totals = summary["users"][user]
+        boughtFrom = {seller: bought[user] for seller, bought in summary["transfer_Wh"].items() if seller != user}
+        soldTo = summary["transfer_Wh"][user]
+        costs = None if period["costs"] is None else period["costs"][user]
+
+    return {
+        "user": user,
+        "start": period["start"],
+        "stop": period["stop"],
+        "dataFrom": period["dataFrom"],
+        "dataTo": period["dataTo"],
+        "totals": totals,
+        "boughtFrom_Wh": boughtFrom,
+        "soldTo_Wh": soldTo,
+        "costs": costs,
+    }
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    server_version = "OpenZEV"
+
+    def sendJson(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        parts = [part for part in url.path.split("/") if part]
+        # unknown paths share one label, the metrics stay bounded
+        endpoint = parts[0] if parts and parts[0] in ("summary", "users", "status", "metrics") else "other"
+        with metrics.timer("query_seconds", endpoint=endpoint):
+            metrics.increment("queries", endpoint=endpoint)
+            if parts == ["status"]:
+                self.sendJson(200, {"meters": list(self.server.confData["meters"]), "results": self.server.results.status()})
+                return
+            if parts == ["metrics"]:
+                data = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            if not (parts == ["summary"] or (len(parts) == 2 and parts[0] == "users")):
+                self.sendJson(404, {"error": f"Unknown path \"{url.path}\"."})
+                return
+            if len(parts) == 2 and parts[1] not in self.server.confData["meters"]:
+                self.sendJson(404, {"error": f"Unknown user \"{parts[1]}\"."})
+                return
+
+            try:
+                timezone = self.server.confData.get("timezone", DEFAULT_TIMEZONE)
+                startTime, stopTime = parseTime(query["start"], timezone), parseTime(query["stop"], timezone)
+                if startTime >= stopTime:
+                    raise ValueError("The start-time has to be earlier than the stop-time.")
+            except KeyError:
+                self.sendJson(400, {"error": "The parameters \"start\" and \"stop\" are required."})
+                return
+            except ValueError as error:
+                self.sendJson(400, {"error": str(error)})
+                return
+
+            try:
+                period = queryPeriod(
+                    self.server.results, self.server.confData, startTime, stopTime, self.server.cache_dir,
+                    self.server.live_ttl, self.server.meter_list,
+                )
+            except MeterReadError as error:
+                self.sendJson(503, {"error": {result.name: str(result.error) for result in error.failed}})
+                return
+            except ValueError as error:
+                # e.g. energy before the first price of the tariff
+                self.sendJson(422, {"error": str(error)})
+                return
+
+            self.sendJson(200, period if parts == ["summary"] else userResult(period, parts[1]))
+
+    def log_message(self, format, *args):
+        log.debug(" " + format % args)
+
+
+def buildServer(
+    confData: dict,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    cache_dir: str = "cache",
+    max_bytes: int = ResultCache.DEFAULT_MAX_BYTES,
+    live_ttl: float = DEFAULT_LIVE_TTL,
+    ):
+    """
+    Creates the query service, serve it with serve_forever. The meters are built once,
+    e.g. a replayed meter parses its log files only here.
+
+    Args:
+        confData (dict): Configuration like confData.secret, optionally with "combine", "tariff" and "timezone".
+        host (str, optional): Address to listen on. Defaults to "127.0.0.1", the local host only.
+        port (int, optional): Port to listen on, 0 for any free port. Defaults to 8080.
+        cache_dir (str, optional): Directory of the meter cache. Defaults to "cache".
+        max_bytes (int, optional): Size of the result cache. Defaults to 64 MiB.
+        live_ttl (float, optional): Seconds a result of a period with missing data is kept,
+            like the poll interval of the collector. Defaults to 300.
+
+    Returns:
+        ThreadingHTTPServer: The server.
+    """
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.daemon_threads = True
+    server.confData = confData
+    server.meter_list = buildMeterList(confData)
+    server.cache_dir = cache_dir
+    server.results = ResultCache(max_bytes)
+    server.live_ttl = live_ttl
+
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer billing queries from the local meter cache.")
+    parser.add_argument("--config", default="src/confData.secret", help="meter configuration, like confData.secret")
+    parser.add_argument("--cache", default="cache", help="directory of the meter cache")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parser.add_argument("--max-bytes", type=int, default=ResultCache.DEFAULT_MAX_BYTES, help="size of the result cache in bytes")
+    parser.add_argument("--live-ttl", type=float, default=DEFAULT_LIVE_TTL, help="seconds a result of an incomplete period is kept")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.config, "r") as file:
+        confData = json.load(file)
+    confData.setdefault("combine", [])
+
+    server = buildServer(confData, args.host, args.port, args.cache, args.max_bytes, args.live_ttl)
+    log.info(f" Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info(" Server stopped.")
+    server.server_close()
@@ -1,7 +1,12 @@
 import json
+import threading
 import time
+import pandas as pd
+import pytest
 from libs.Meter.EmuMeterClass import EmuMeter
-from libs.Meter.meterClass import Meter
+from libs.Meter.emuEmulatorClass import EmuEmulator
+
+END_TIME = 1_700_002_800
 
 
 def getHost():
@@ -16,24 +21,28 @@ def getHost():
     return host
 
 
-if not getHost() == "NA":
-    meter = EmuMeter(getHost(), "testMeter", read_block_size=4)
-else:
-    meter = Meter("testMeter", "testMeter")
+@pytest.fixture(scope="module")
+def meter():
+    if not getHost() == "NA":
+        yield EmuMeter(getHost(), "testMeter", read_block_size=4)
+    else:
+        # without a real meter, the tests run against a local emulator
+        with EmuEmulator(entries=2 * 96) as emulator:
+            yield EmuMeter(emulator.host, "testMeter", read_block_size=4)
 
 
-def test_meterConnection():
+def test_meterConnection(meter):
     # test if timestamp of meter is close to system time
     timeToLastRecord = meter.current_time - int(time.time())
     assert timeToLastRecord <= 30 * 60
 
 
-def test_indexSplit():
+def test_indexSplit(meter):
     indexRange = meter.split_index_range(10, 20)
     assert indexRange == [[10, 13], [14, 17], [18, 20]]
 
 
-def test_numberOfReturnedEntries():
+def test_numberOfReturnedEntries(meter):
     # a timeslot of 1h should contain 4 entries
     now = time.time()
     past = now - (60 * 60)
@@ -41,7 +50,7 @@ def test_numberOfReturnedEntries():
     assert nowIndex - pastIndex == 4
 
 
-def test_newestEntry():
+def test_newestEntry(meter):
     # if stoptime is curent time, stopindex should be equal to init index
     # test can fail in edge case where initMeter and setting of now time are
     # executed right at XX:00, XX:15, XX:30 or XX:45
@@ -51,14 +60,14 @@ def test_newestEntry():
     assert nowIndex == meter.current_index
 
 
-def test_readLen():
+def test_readLen(meter):
     stopTime = time.time()
     startTime = stopTime - (4 * 60 * 60)
     data = meter.read(startTime, stopTime)
     assert 17 == data.shape[0]
 
 
-def test_correctTime():
+def test_correctTime(meter):
     stopTime = time.time()
     startTime = stopTime - (4 * 60 * 60)
     data = meter.read(startTime, stopTime)
@@ -72,5 +81,44 @@ def test_correctTime():
     assert startTimeSmaller and stopTimeSmaller and startTimeIn15 and stopTimeIn15
 
 
-def test_hostNaming():
-    assert "testMeter" == meter.name
\ No newline at end of file
+def test_hostNaming(meter):
+    assert "testMeter" == meter.name
+
+def test_readJoinsBlocksInOrder():
+    with EmuEmulator(entries=500, gaps=[(450, 7)], end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "blockMeter", read_block_size=7)
+        startTime = END_TIME - 100 * 15 * 60
+        data = meter.read(startTime, END_TIME)
+
+        # the same rows as the single blocks one after the other, on a continuous index
+        start, stop = meter.calc_index(startTime, END_TIME)
+        blocks = [meter.read_single_block(first, last) for first, last in meter.split_index_range(start, stop)]
+        assert len(blocks) > 10
+        pd.testing.assert_frame_equal(data, pd.concat(blocks, ignore_index=True))
+        assert len(data) == stop - start + 1
+        assert data.index.equals(pd.RangeIndex(len(data)))
+        assert data["Timestamp"].is_monotonic_increasing
+
+
+def test_handshakeIsLazyAndShared():
+    with EmuEmulator(entries=500, end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "lazyMeter")
+        assert emulator.requests == 0
+        assert meter.current_index == 499
+        assert emulator.requests == 1
+        # a second meter of the host reuses the handshake within the TTL
+        assert EmuMeter(emulator.host, "lazyMeter").current_time == meter.current_time
+        assert emulator.requests == 1
+        meter.handshake(max_age=0)
+        assert emulator.requests == 2
+
+
+def test_concurrentHandshakeOncePerHost():
+    with EmuEmulator(entries=500, end_time=END_TIME) as emulator:
+        meters = [EmuMeter(emulator.host, f"meter{number}") for number in range(8)]
+        threads = [threading.Thread(target=meter.handshake) for meter in meters]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert emulator.requests == 1
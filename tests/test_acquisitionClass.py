@@ -0,0 +1,85 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
+import pandas as pd
+import pytest
+from libs.Acquisition.acquisitionClass import AcquisitionEngine, MeterReadError
+from libs.Meter.meterClass import Meter
+
+
+class FakeMeter(Meter):
+    def __init__(self, name: str, behaviour: str, barrier: threading.Barrier = None):
+        super().__init__("Fake", name)
+        self.behaviour = behaviour
+        self.barrier = barrier
+
+    def read(self, start_epoch_time: int, stop_epoch_time: int):
+        if self.barrier is not None:
+            # only passes once all meters are read at the same time
+            self.barrier.wait(timeout=5)
+        if self.behaviour == "fail":
+            raise ConnectionError("meter offline")
+        if self.behaviour == "slow":
+            time.sleep(0.2)
+        if self.behaviour == "hang":
+            # only returns once the engine cancels the read
+            self.cancel_event.wait(5)
+            raise InterruptedError("Meter read has been canceled.")
+        return pd.DataFrame({"Timestamp": [start_epoch_time, stop_epoch_time]})
+
+
+def test_readAll():
+    meters = [FakeMeter(f"meter{i}", "ok") for i in range(20)]
+    results = AcquisitionEngine(meters).run(0, 900)
+    assert sorted(results) == sorted(meter.name for meter in meters)
+    assert results["meter3"].shape == (2, 1)
+
+
+def test_allMetersAtOnce():
+    barrier = threading.Barrier(20)
+    meters = [FakeMeter(f"meter{i}", "ok", barrier) for i in range(20)]
+    assert len(AcquisitionEngine(meters, max_workers=20).run(0, 900)) == 20
+
+
+def test_boundedWorkers():
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    class CountingMeter(FakeMeter):
+        def read(self, start_epoch_time: int, stop_epoch_time: int):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return super().read(start_epoch_time, stop_epoch_time)
+
+    meters = [CountingMeter(f"meter{i}", "ok") for i in range(3 * AcquisitionEngine.DEFAULT_MAX_WORKERS)]
+    assert len(AcquisitionEngine(meters).run(0, 900)) == len(meters)
+    assert peak[0] <= AcquisitionEngine.DEFAULT_MAX_WORKERS
+
+
+def test_structuredErrors():
+    meters = [FakeMeter("good", "ok"), FakeMeter("bad", "fail")]
+    with pytest.raises(MeterReadError) as error:
+        AcquisitionEngine(meters).run(0, 900)
+    assert [result.name for result in error.value.failed] == ["bad"]
+    assert isinstance(error.value.results["bad"].error, ConnectionError)
+    assert error.value.results["good"].ok
+
+
+def test_timeoutCancelsRead():
+    meter = FakeMeter("slow", "hang")
+    with pytest.raises(MeterReadError) as error:
+        AcquisitionEngine([meter], timeout=0.1).run(0, 900)
+    assert isinstance(error.value.results["slow"].error, TimeoutError)
+    assert meter.cancel_event.is_set()
+
+
+def test_timeoutWithoutQueueTime():
+    # six reads of 0.2 s on two shared workers, the last ones wait 0.4 s for a worker
+    meters = [FakeMeter(f"meter{i}", "slow") for i in range(6)]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = AcquisitionEngine(meters, timeout=0.3, executor=executor).run(0, 900)
+    assert len(results) == 6
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from libs.Acquisition.alignment import align_meters, gap_mask
+
+
+def getMeterData(name: str, slots):
+    return pd.DataFrame({
+        "Timestamp": pd.to_datetime([1700000100 + 900 * slot for slot in slots], unit="s"),
+        f"{name}_Import_Wh": [10 * slot for slot in slots],
+        f"{name}_Export_Wh": [slot for slot in slots],
+    })
+
+
+def test_alignOnSharedGrid():
+    data = align_meters({
+        "meter1": getMeterData("meter1", range(0, 10)),
+        "meter2": getMeterData("meter2", [0, 1, 2, 5, 6, 7, 8, 9, 10]),
+    })
+    assert data.columns.tolist() == [
+        "Timestamp", "meter1_Import_Wh", "meter1_Export_Wh", "meter2_Import_Wh", "meter2_Export_Wh",
+    ]
+    assert len(data) == 11
+    assert (data["Timestamp"].diff().dropna() == pd.Timedelta(minutes=15)).all()
+    assert data["meter2_Import_Wh"].iloc[5] == 50
+
+
+def test_gapsAreFlagged():
+    data = align_meters({
+        "meter1": getMeterData("meter1", range(0, 10)),
+        "meter2": getMeterData("meter2", [0, 1, 2, 5, 6, 7, 8, 9]),
+    })
+    assert data.attrs["gaps"]["meter1"] == []
+    assert data.attrs["gaps"]["meter2"] == [(data["Timestamp"].iloc[3], data["Timestamp"].iloc[4])]
+    assert gap_mask(data, "meter2").tolist() == [False] * 3 + [True] * 2 + [False] * 5
+    assert np.isnan(data["meter2_Import_Wh"].iloc[3])
@@ -0,0 +1,63 @@
+import json
+import numpy as np
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Billing.summaryClass import BillingSummary
+from batch import loadSite, runBatch
+from main import getEnergyData, combineMeterPairs, calculate, buildMeterList
+
+END_TIME = 1_700_002_800
+START_TIME = END_TIME - 3 * 86400
+
+
+def startSite(name, meters, seed):
+    emulators = {meter: EmuEmulator(1000, seed=seed + number, end_time=END_TIME, producer=meter == "pv").start()
+                 for number, meter in enumerate(meters + ["ewMeter"])}
+    site = {
+        "name": name,
+        "meters": {meter: emulators[meter].host for meter in meters},
+        "ewMeter": emulators["ewMeter"].host,
+        "combine": [["flat1", "pv"]] if "pv" in meters else [],
+    }
+    return site, emulators
+
+
+def test_runBatch(tmp_path):
+    siteA, emulatorsA = startSite("siteA", ["flat1", "flat2", "pv"], 0)
+    siteB, emulatorsB = startSite("siteB", ["flat1", "flat2"], 10)
+    # an unreachable meter only fails its own site
+    siteC = {"name": "siteC", "meters": {"flat1": "127.0.0.1:1"}, "ewMeter": "127.0.0.1:1", "combine": []}
+    # a malformed configuration as well
+    siteD = {"name": "siteD", "meters": {"flat1": "127.0.0.1:1"}, "combine": []}
+    try:
+        reports = runBatch(
+            [siteA, siteB, siteC, siteD], START_TIME, END_TIME, str(tmp_path / "reports"),
+            workers=2, cache_dir=str(tmp_path / "cache"),
+        )
+
+        # same result as billing the site on its own
+        energyDF = getEnergyData(START_TIME, END_TIME, buildMeterList(siteA), cache_dir=str(tmp_path / "single"))
+        energyDF = calculate(combineMeterPairs(energyDF, [("flat1", "pv")]), list(siteA["meters"]))
+        expected = BillingSummary.from_frame(energyDF, list(siteA["meters"])).to_dict()
+    finally:
+        for emulator in list(emulatorsA.values()) + list(emulatorsB.values()):
+            emulator.stop()
+
+    assert list(reports) == ["siteA", "siteB", "siteC", "siteD"]
+    assert reports["siteA"]["ok"] and reports["siteB"]["ok"]
+    assert not reports["siteC"]["ok"]
+    assert not reports["siteD"]["ok"] and "ewMeter" in reports["siteD"]["error"]
+    for user in siteA["meters"]:
+        for quantity, value in expected["users"][user].items():
+            assert np.isclose(reports["siteA"]["summary"]["users"][user][quantity], value)
+
+    with open(tmp_path / "reports" / "siteB" / "summary.json") as file:
+        assert json.load(file) == reports["siteB"]["summary"]
+    assert (tmp_path / "reports" / "siteA" / "output.csv").exists()
+    assert (tmp_path / "cache" / "siteA" / "ewMeter_store.secret").exists()
+
+
+def test_loadSite(tmp_path):
+    with open(tmp_path / "house.json", "w") as file:
+        json.dump({"meters": {"a": "1.2.3.4"}, "ewMeter": "1.2.3.5"}, file)
+    site = loadSite(str(tmp_path / "house.json"))
+    assert site["name"] == "house" and site["combine"] == []
@@ -0,0 +1,111 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+from libs.Billing.billingEngine import calculate_billing
+from main import calculate
+
+
+def referenceCalculate(energyDF: pd.DataFrame, userMeter_list):
+    # column by column implementation calculate() is checked against
+    energyDF["totalProd_Wh"] = 0
+    energyDF["totalUse_Wh"] = 0
+    for meter in userMeter_list:
+        energyDF["totalProd_Wh"] += energyDF[f"{meter}_Export_Wh"]
+        energyDF["totalUse_Wh"] += energyDF[f"{meter}_Import_Wh"]
+
+    energyDF["eigenV_Wh"] = energyDF["totalProd_Wh"] - energyDF["ewMeter_Export_Wh"]
+    for meter in userMeter_list:
+        energyDF[f"{meter}_EnSold_Wh"] = energyDF["ewMeter_Export_Wh"] * (
+            energyDF[f"{meter}_Export_Wh"] / energyDF["totalProd_Wh"])
+        energyDF[f"{meter}_EnBought_Wh"] = energyDF["ewMeter_Import_Wh"] * (
+            energyDF[f"{meter}_Import_Wh"] / energyDF["totalUse_Wh"])
+        energyDF[f"{meter}_EnSoldInt_Wh"] = energyDF["eigenV_Wh"] * (
+            energyDF[f"{meter}_Export_Wh"] / energyDF["totalProd_Wh"])
+
+    for meter in userMeter_list:
+        energyDF[f"{meter}_EnBoughtInt_Wh"] = (
+            energyDF[f"{meter}_Import_Wh"] - energyDF[f"{meter}_EnBought_Wh"])
+        internalFremdProduktion = 0
+        for meter2 in userMeter_list:
+            if not (meter == meter2):
+                internalFremdProduktion += energyDF[f"{meter2}_EnSoldInt_Wh"]
+        for meter2 in userMeter_list:
+            if not (meter == meter2):
+                energyDF[f"{meter2}_2_{meter}_EnBoughtInt_Wh"] = (
+                    energyDF[f"{meter2}_EnSoldInt_Wh"] * (
+                        energyDF[f"{meter}_EnBoughtInt_Wh"] / internalFremdProduktion))
+
+    energyDF["EnergyIn_Wh"] = energyDF["totalProd_Wh"] + energyDF["ewMeter_Import_Wh"]
+    energyDF["EnergyOut_Wh"] = energyDF["totalUse_Wh"] + energyDF["ewMeter_Export_Wh"]
+    energyDF["EnergyError_Wh"] = energyDF["EnergyIn_Wh"] - energyDF["EnergyOut_Wh"]
+
+    return energyDF
+
+
+def getEnergyDF(users, rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {"Timestamp": pd.date_range("2024-01-01", periods=rows, freq="15min")}
+    for meter in users + ["ewMeter"]:
+        for direction in ["Import", "Export"]:
+            values = rng.integers(0, 400, rows).astype(float)
+            # many intervals without any production or consumption
+            values[rng.random(rows) < 0.3] = 0
+            values[0] = np.nan
+            data[f"{meter}_{direction}_Wh"] = values
+    return pd.DataFrame(data)
+
+
+def test_calculateMatchesReference():
+    users = ["meter1", "meter2", "meter3", "meter4"]
+    energyDF = getEnergyDF(users)
+    expected = referenceCalculate(energyDF.copy(), users)
+    result = calculate(energyDF, users, pairwise=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=True)
+
+
+def test_calculateSingleUser():
+    energyDF = getEnergyDF(["meter1"])
+    expected = referenceCalculate(energyDF.copy(), ["meter1"])
+    result = calculate(energyDF, ["meter1"], pairwise=True)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=True)
+
+
+def test_calculateTwice():
+    users = ["meter1", "meter2"]
+    energyDF = getEnergyDF(users)
+    once = calculate(energyDF, users)
+    twice = calculate(once, users)
+    pd.testing.assert_frame_equal(once, twice)
+
+
+def test_transferMatrixMatchesPairwiseColumns():
+    users = ["meter1", "meter2", "meter3"]
+    energyDF = getEnergyDF(users)
+    # interval without production in the ZEV, but internal consumption
+    energyDF.loc[5, [f"{meter}_Export_Wh" for meter in users]] = 0
+    detailed = calculate(energyDF, users, pairwise=True)
+    aggregated = calculate(energyDF, users)
+    assert "meter1_2_meter2_EnBoughtInt_Wh" not in aggregated.columns
+    for seller in users:
+        for buyer in users:
+            if not (seller == buyer):
+                expected = detailed[f"{seller}_2_{buyer}_EnBoughtInt_Wh"].sum()
+                assert np.isclose(aggregated.attrs["transferMatrix_Wh"][seller][buyer], expected, rtol=1e-12)
+
+
+def test_aggregatedMemoryIsLinearInUsers():
+    intervals, users = 4 * 24 * 30, 30
+    rng = np.random.default_rng(0)
+    user_import = rng.random((intervals, users)) * 400
+    user_export = rng.random((intervals, users)) * 400
+    ew_import = rng.random(intervals) * 400
+    ew_export = rng.random(intervals) * 400
+    tracemalloc.start()
+    try:
+        result = calculate_billing(user_import, user_export, ew_import, ew_export, pairwise=False)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert "EnBoughtIntFrom_Wh" not in result
+    # a single T x N x N array would be 30 times the size of one T x N array
+    assert peak < 16 * user_import.nbytes
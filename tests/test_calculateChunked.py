@@ -0,0 +1,35 @@
+import numpy as np
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Billing.summaryClass import BillingSummary
+from main import getEnergyData, combineMeterPairs, calculate, calculateChunked, buildMeterList
+
+END_TIME = 1_700_002_800
+START_TIME = END_TIME - 5 * 86400 - 3600
+
+
+def test_chunkedSameAsFull(tmp_path):
+    meters = ["flat1", "flat2", "pv"]
+    emulators = [EmuEmulator(1000, seed=number, end_time=END_TIME, producer=meter == "pv").start()
+                 for number, meter in enumerate(meters + ["ewMeter"])]
+    confData = {
+        "meters": {meter: emulator.host for meter, emulator in zip(meters, emulators)},
+        "ewMeter": emulators[-1].host,
+    }
+    try:
+        energyDF = getEnergyData(START_TIME, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path / "full"))
+        energyDF = calculate(combineMeterPairs(energyDF, [("flat1", "pv")]), meters)
+        expected = BillingSummary.from_frame(energyDF, meters)
+
+        # a chunk per day, the period starts and stops within a day
+        summary = calculateChunked(
+            START_TIME, END_TIME, buildMeterList(confData), meters, [("flat1", "pv")], chunk="D",
+            cache_dir=str(tmp_path / "chunked"),
+        )
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+
+    assert np.allclose(summary.user_totals.to_numpy(), expected.user_totals.to_numpy())
+    assert np.allclose(summary.transfer.to_numpy(), expected.transfer.to_numpy())
+    assert np.isclose(summary.energy_error, expected.energy_error)
+    assert (tmp_path / "chunked" / "ewMeter_store.secret").exists()
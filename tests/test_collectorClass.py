@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from libs.Acquisition.collectorClass import MeterCollector
+from libs.Cache.meterCacheClass import MeterCache
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Meter.replayMeterClass import ReplayMeter
+
+END_TIME = 1_700_002_800
+INTERVAL = 15 * 60
+
+
+def test_tailNewEntries(tmp_path):
+    with EmuEmulator(entries=1000, end_time=END_TIME) as emulator, ThreadPoolExecutor(2) as executor:
+        meter = EmuMeter(emulator.host, "tailMeter", read_block_size=300)
+        collector = MeterCollector([meter], str(tmp_path), poll_interval=60, since_epoch_time=END_TIME - 500 * INTERVAL)
+
+        assert collector.poll_due(executor, now=0) == ["tailMeter"]
+        assert collector.caches["tailMeter"].intervals == [[499, 999]]
+        # not due yet
+        assert collector.poll_due(executor, now=30) == []
+
+        # the meter logs 3 new entries, only they are downloaded
+        emulator.entries += 3
+        requests = emulator.requests
+        assert collector.poll_due(executor, now=60) == ["tailMeter"]
+        assert collector.caches["tailMeter"].intervals == [[499, 1002]]
+        assert emulator.requests - requests == 2
+        assert collector.status()["tailMeter"] == {"last_index": 1002, "failures": 0, "error": None}
+
+        # the collected data is read without the meter
+        cache = MeterCache(EmuMeter("127.0.0.1:1", "tailMeter"), str(tmp_path))
+        assert len(cache.read(END_TIME - 400 * INTERVAL, END_TIME)) == 401
+
+
+def test_backoffOfflineMeter(tmp_path):
+    with EmuEmulator(entries=100, end_time=END_TIME) as emulator, ThreadPoolExecutor(2) as executor:
+        online = EmuMeter(emulator.host, "onlineMeter")
+        offline = EmuMeter("127.0.0.1:1", "offlineMeter")
+        collector = MeterCollector([online, offline], str(tmp_path), poll_interval=60, max_backoff=200)
+
+        assert sorted(collector.poll_due(executor, now=0)) == ["offlineMeter", "onlineMeter"]
+        assert collector.status()["offlineMeter"]["failures"] == 1
+        assert collector.states["offlineMeter"].next_poll == 60
+        collector.poll_due(executor, now=60)
+        assert collector.states["offlineMeter"].next_poll == 60 + 120
+        collector.poll_due(executor, now=180)
+        assert collector.states["offlineMeter"].next_poll == 180 + 200
+        assert collector.states["onlineMeter"].failures == 0
+        assert collector.caches["onlineMeter"].intervals == [[99, 99]]
+
+
+def test_rejectLocalMeter(tmp_path):
+    with EmuEmulator(entries=100, end_time=END_TIME) as emulator:
+        (tmp_path / "log.csv").write_bytes(emulator.csv(np.arange(100)))
+    with pytest.raises(ValueError):
+        MeterCollector([ReplayMeter(str(tmp_path / "log.csv"), "replayed")], str(tmp_path / "cache"))
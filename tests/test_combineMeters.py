@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from main import combineMeters, combineMeterPairs
+
+
+def getEnergyDF():
+    return pd.DataFrame({
+        "home_Import_Wh": [np.nan, 100.0, 50.0, 80.0, 10.0],
+        "home_Export_Wh": [np.nan, 5.0, 5.0, 5.0, 5.0],
+        "pv_Import_Wh": [np.nan, 1.0, 1.0, 1.0, 1.0],
+        "pv_Export_Wh": [np.nan, 30.0, 50.0, 100.0, 0.0],
+        "flat_Import_Wh": [np.nan, 20.0, 20.0, 20.0, 20.0],
+        "flat_Export_Wh": [np.nan, 0.0, 0.0, 0.0, 0.0],
+        "pv2_Import_Wh": [np.nan, 0.0, 0.0, 0.0, 0.0],
+        "pv2_Export_Wh": [np.nan, 10.0, 30.0, 0.0, 20.0],
+    })
+
+
+def test_combineMeters():
+    energyDF = combineMeters(getEnergyDF(), "home", "pv")
+    np.testing.assert_array_equal(energyDF["home_Import_Wh"], [np.nan, 70.0, 0.0, 0.0, 10.0])
+    np.testing.assert_array_equal(energyDF["home_Export_Wh"], [np.nan, 0.0, 0.0, 20.0, 0.0])
+    assert (energyDF["pv_Import_Wh"] == 0).all() and (energyDF["pv_Export_Wh"] == 0).all()
+    assert not [column for column in energyDF.columns if column.startswith("temp_")]
+
+
+def test_combineMeterPairs():
+    energyDF = combineMeterPairs(getEnergyDF(), [("home", "pv"), ("flat", "pv2")])
+    expected = combineMeters(combineMeters(getEnergyDF(), "home", "pv"), "flat", "pv2")
+    pd.testing.assert_frame_equal(energyDF, expected)
+    np.testing.assert_array_equal(energyDF["flat_Export_Wh"], [np.nan, 0.0, 10.0, 0.0, 0.0])
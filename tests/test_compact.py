@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Billing.compact import FLOAT32_ERROR, compact_energy, compact_wh, expand_energy, is_compact, timestamps
+from libs.Billing.rollupClass import RollupIndex
+from libs.Billing.summaryClass import BillingSummary
+from main import getEnergyData, combineMeterPairs, calculate, buildMeterList
+
+END_TIME = 1_700_002_800
+START_TIME = END_TIME - 7 * 86400
+
+
+def energyFrame(rows=10_000, meters=("flat1", "flat2", "ewMeter")):
+    rng = np.random.default_rng(1)
+    energyDF = pd.DataFrame({"Timestamp": pd.date_range("2024-01-01", periods=rows, freq="15min")})
+    for meter in meters:
+        for direction in ["Import", "Export"]:
+            values = rng.integers(0, 400, rows).astype(float)
+            values[rng.integers(0, rows, 20)] = np.nan
+            energyDF[f"{meter}_{direction}_Wh"] = values
+    return energyDF
+
+
+def test_compactWh():
+    assert compact_wh(np.array([0.0, 255.0])).dtype == "UInt8"
+    assert compact_wh(np.array([0.0, 256.0, np.nan])).dtype == "UInt16"
+    assert compact_wh(np.array([-1.0, 40_000.0])).dtype == "Int32"
+    assert compact_wh(np.array([np.nan])).dtype == "UInt8"
+
+
+def test_compactEnergy():
+    energyDF = energyFrame()
+    compactDF = compact_energy(energyDF)
+    assert is_compact(compactDF) and "Timestamp" not in compactDF.columns
+    assert compactDF["flat1_Import_Wh"].dtype == "UInt16"
+    assert energyDF.memory_usage(deep=True).sum() > 2.5 * compactDF.memory_usage(deep=True).sum()
+
+    # the meter deltas and the timestamps are exact
+    expanded = expand_energy(compactDF)
+    pd.testing.assert_frame_equal(expanded, energyDF, check_freq=False)
+    assert (timestamps(compactDF) == energyDF["Timestamp"]).all()
+
+
+def test_irregularGrid():
+    energyDF = energyFrame(10).drop(index=3).reset_index(drop=True)
+    with pytest.raises(ValueError):
+        compact_energy(energyDF)
+
+
+def test_billingWithinErrorBound(tmp_path):
+    meters = ["flat1", "flat2", "pv"]
+    emulators = [EmuEmulator(1000, seed=number, end_time=END_TIME, producer=meter == "pv", gaps=[(400, 3)]).start()
+                 for number, meter in enumerate(meters + ["ewMeter"])]
+    confData = {
+        "meters": {meter: emulator.host for meter, emulator in zip(meters, emulators)},
+        "ewMeter": emulators[-1].host,
+    }
+    try:
+        energyDF = getEnergyData(START_TIME, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path))
+        compactDF = getEnergyData(START_TIME, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path), compact=True)
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+
+    energyDF = calculate(combineMeterPairs(energyDF, [("flat1", "pv")]), meters)
+    compactDF = calculate(combineMeterPairs(compactDF, [("flat1", "pv")]), meters)
+    assert is_compact(compactDF)
+    assert compactDF["flat1_Import_Wh"].dtype.name.startswith("UInt")
+    assert compactDF["flat1_EnBought_Wh"].dtype == np.float32
+    assert compactDF["flat1_EnBought_Wh"].isna().sum() == energyDF["flat1_EnBought_Wh"].isna().sum() > 0
+
+    # every value and every total stays within the documented bound
+    for column in energyDF.columns.drop("Timestamp"):
+        exact = energyDF[column].to_numpy(dtype=float)
+        approx = compactDF[column].to_numpy(dtype=float)
+        assert np.allclose(approx, exact, rtol=FLOAT32_ERROR, atol=0, equal_nan=True)
+
+    exact = BillingSummary.from_frame(energyDF, meters)
+    approx = BillingSummary.from_frame(compactDF, meters)
+    for quantity in BillingSummary.QUANTITIES:
+        bound = FLOAT32_ERROR * np.nansum(np.abs(energyDF[[f"{user}_{quantity}" for user in meters]]), axis=0)
+        assert (np.abs(approx.user_totals[quantity] - exact.user_totals[quantity]).to_numpy() <= bound).all()
+    # the transfer between users is summed in float64 from the exact deltas
+    pd.testing.assert_frame_equal(approx.transfer, exact.transfer)
+
+    rollup = RollupIndex(compactDF)
+    assert (rollup.timestamps == energyDF["Timestamp"]).all()
+    assert np.allclose(rollup.total(START_TIME * 10**9, END_TIME * 10**9)["flat2_EnBought_Wh"], exact.user_totals.loc["flat2", "EnBought_Wh"])
@@ -0,0 +1,47 @@
+import io
+import urllib.error
+import urllib.request
+import numpy as np
+import pandas as pd
+import pytest
+from libs.Meter.emuEmulatorClass import EmuEmulator
+
+
+def readCsv(emulator, path):
+    with urllib.request.urlopen(f"http://{emulator.host}{path}") as response:
+        return pd.read_csv(io.BytesIO(response.read()), delimiter=";")
+
+
+def test_lastEntry():
+    with EmuEmulator(entries=500, end_time=1_700_000_100) as emulator:
+        data = readCsv(emulator, "/data/?last=1")
+    assert list(data["Index"]) == [499]
+    assert pd.Timestamp(data["Timestamp"][0]).timestamp() == 1_700_000_100
+    assert len(data.columns) == len(EmuEmulator.CSV_HEADER)
+
+
+def test_blockSizeLimit():
+    with EmuEmulator(entries=10000) as emulator:
+        data = readCsv(emulator, "/data/?from=100&to=9000")
+    assert data["Index"].iloc[0] == 100 and len(data) == EmuEmulator.MAX_READBLOCK_SIZE + 1
+
+
+def test_countersIncrease():
+    emulator = EmuEmulator(entries=5000, seed=3, producer=True)
+    energy_import, energy_export = emulator.counters(np.arange(5000))
+    assert (np.diff(energy_import) >= 0).all() and (np.diff(energy_export) >= 0).all()
+    assert energy_export[-1] - energy_export[0] > energy_import[-1] - energy_import[0]
+
+
+def test_gaps():
+    emulator = EmuEmulator(entries=100, gaps=[(40, 4), (70, 1)], end_time=1_700_000_100)
+    steps = np.diff(emulator.timestamps(np.arange(100))) // EmuEmulator.LOG_INTERVAL
+    assert steps[39] == 5 and steps[69] == 2
+    assert (np.delete(steps, [39, 69]) == 1).all()
+    assert emulator.timestamps([99])[0] == 1_700_000_100
+
+
+def test_unknownPath():
+    with EmuEmulator(entries=10) as emulator:
+        with pytest.raises(urllib.error.HTTPError):
+            readCsv(emulator, "/status/")
@@ -0,0 +1,22 @@
+from libs.Meter.httpPoolClass import HttpPool
+from libs.Meter.emuEmulatorClass import EmuEmulator
+
+END_TIME = 1_700_002_800
+
+
+def test_poolPerConnectionLimit():
+    pool = HttpPool.for_host("192.0.2.1", 2)
+    assert HttpPool.for_host("192.0.2.1", 2) is pool
+    # a lower limit of a later meter is not ignored
+    single = HttpPool.for_host("192.0.2.1", 1)
+    assert single is not pool and single.max_connections == 1
+
+
+def test_closeAll():
+    with EmuEmulator(entries=100, end_time=END_TIME) as emulator:
+        pool = HttpPool.for_host(emulator.host, 1)
+        pool.get("/data/?last=1")
+        assert len(pool._idle) == 1
+        HttpPool.close_all()
+        assert len(pool._idle) == 0
+        assert HttpPool.for_host(emulator.host, 1) is not pool
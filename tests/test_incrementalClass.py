@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Billing.incrementalClass import IncrementalBilling
+from libs.Billing.summaryClass import BillingSummary
+from main import getEnergyData, combineMeterPairs, calculate, buildMeterList, updateBilling, billNewIntervals
+
+END_TIME = 1_700_002_800
+INTERVAL = 15 * 60
+START_TIME = END_TIME - 7 * 86400
+
+
+def assertSummaryClose(summary: BillingSummary, expected: BillingSummary):
+    assert np.allclose(summary.user_totals.to_numpy(), expected.user_totals.to_numpy())
+    assert np.allclose(summary.transfer.to_numpy(), expected.transfer.to_numpy())
+    assert np.isclose(summary.energy_error, expected.energy_error)
+
+
+def test_incrementalSameAsFull(tmp_path):
+    meters = ["flat1", "flat2", "pv"]
+    emulators = [EmuEmulator(1000, seed=number, end_time=END_TIME, producer=meter == "pv", gaps=[(600, 2)]).start()
+                 for number, meter in enumerate(meters + ["ewMeter"])]
+    confData = {
+        "meters": {meter: emulator.host for meter, emulator in zip(meters, emulators)},
+        "ewMeter": emulators[-1].host,
+    }
+    try:
+        energyDF = getEnergyData(START_TIME, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path))
+        energyDF = calculate(combineMeterPairs(energyDF, [("flat1", "pv")]), meters)
+        expected = BillingSummary.from_frame(energyDF, meters)
+
+        # the period is billed day by day, the last day in two steps
+        billing = IncrementalBilling(meters, [("flat1", "pv")])
+        for stop in list(range(START_TIME + 86400, END_TIME, 86400)) + [END_TIME - 5 * INTERVAL, END_TIME]:
+            newDF = updateBilling(billing, START_TIME, stop, buildMeterList(confData), cache_dir=str(tmp_path))
+        # only the new intervals are billed
+        assert len(newDF) == 5
+        assert len(updateBilling(billing, START_TIME, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path))) == 0
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+
+    assertSummaryClose(billing.summary, expected)
+
+    # the running totals continue in a later session
+    billing.save(str(tmp_path / "billing.json"))
+    loaded = IncrementalBilling.load(str(tmp_path / "billing.json"))
+    assert loaded.last_time == billing.last_time and loaded.combine_pairs == [("flat1", "pv")]
+    assertSummaryClose(loaded.summary, expected)
+    assert loaded.last_reading.columns.tolist() == billing.last_reading.columns.tolist()
+    assert np.allclose(loaded.last_reading.iloc[0, 1:].to_numpy(dtype=float), billing.last_reading.iloc[0, 1:].to_numpy(dtype=float))
+
+
+def test_incompleteReadingBilledLater():
+    rows = 12
+    rng = np.random.default_rng(0)
+    readings = pd.DataFrame({"Timestamp": pd.date_range("2024-01-01", periods=rows, freq="15min")})
+    for meter in ["flat1", "flat2", "ewMeter"]:
+        for direction in ["Import", "Export"]:
+            readings[f"{meter}_{direction}_Wh"] = np.cumsum(rng.integers(0, 400, rows)).astype(float)
+    expected = BillingSummary.from_frame(calculate(readings.set_index("Timestamp").diff().reset_index(), ["flat1", "flat2"]), ["flat1", "flat2"])
+
+    # the newest reading of flat2 is not there yet at the first update
+    billing = IncrementalBilling(["flat1", "flat2"])
+    partial = readings.iloc[:8].copy()
+    partial.loc[7, "flat2_Import_Wh"] = np.nan
+    assert len(billNewIntervals(billing, partial)) == 7
+    assert billing.last_time == readings["Timestamp"][6]
+    assert len(billNewIntervals(billing, readings)) == 5
+
+    assertSummaryClose(billing.summary, expected)
@@ -0,0 +1,135 @@
+import numpy as np
+from libs.Meter.indexMapClass import IndexMap
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Cache.meterCacheClass import MeterCache
+
+END_TIME = 1_700_002_800
+INTERVAL = 15 * 60
+
+
+def getProbe(emulator: EmuEmulator, calls: list):
+    # reads straight from the emulator, without HTTP
+    def probe(index):
+        calls.append(index)
+        sequence = emulator.entries_in(index, index + 1)
+        return sequence, emulator.timestamps(sequence)
+    return probe
+
+
+def locate(emulator, indexMap, epoch_time, calls, oldest_index=0):
+    newest = (emulator.entries - 1, int(emulator.timestamps([emulator.entries - 1])[0]))
+    return indexMap.locate(epoch_time, getProbe(emulator, calls), newest, oldest_index)
+
+
+def expectedIndex(emulator, epoch_time):
+    # last entry at or before the time, by brute force
+    times = emulator.timestamps(np.arange(emulator.entries))
+    return int(np.searchsorted(times, epoch_time, side="right")) - 1
+
+
+def test_regularCadenceNeedsOneProbe():
+    emulator = EmuEmulator(entries=1000, end_time=END_TIME)
+    indexMap = IndexMap(INTERVAL)
+    calls = []
+    assert locate(emulator, indexMap, END_TIME - 10 * INTERVAL, calls) == 989
+    assert len(calls) == 1
+    # the probed entries are learned, a time next to them needs no probe
+    assert locate(emulator, indexMap, END_TIME - 10 * INTERVAL + 60, calls) == 989
+    assert len(calls) == 1
+
+
+def test_missedSlots():
+    emulator = EmuEmulator(entries=3000, gaps=[(500, 7), (2000, 30), (2001, 2)], end_time=END_TIME)
+    indexMap = IndexMap(INTERVAL)
+    calls = []
+    for offset in [0, 1, 33, 450, 999, 1500, 2000, 2500, 2990]:
+        epoch_time = int(emulator.timestamps([offset])[0]) + 100
+        assert locate(emulator, indexMap, epoch_time, calls) == expectedIndex(emulator, epoch_time)
+    # in a missed slot, the entry before it is found
+    epoch_time = int(emulator.timestamps([2000])[0]) - 5 * INTERVAL
+    assert locate(emulator, indexMap, epoch_time, calls) == 1999
+    assert len(calls) < 60
+
+
+def test_learnedAnchorsAvoidProbes():
+    emulator = EmuEmulator(entries=2000, gaps=[(1200, 3)], end_time=END_TIME)
+    indexMap = IndexMap(INTERVAL)
+    indexes = np.arange(1000, 1500)
+    indexMap.learn(indexes, emulator.timestamps(indexes))
+    calls = []
+    epoch_time = int(emulator.timestamps([1300])[0])
+    assert locate(emulator, indexMap, epoch_time, calls) == 1300
+    assert calls == []
+
+
+def test_beforeOldestEntry():
+    emulator = EmuEmulator(entries=500, end_time=END_TIME)
+    indexMap = IndexMap(INTERVAL)
+    calls = []
+    assert locate(emulator, indexMap, END_TIME - 1000 * INTERVAL, calls, oldest_index=-1000) == 0
+
+
+def test_clockSetBack():
+    # the clock of the meter was set back by an hour after entry 50
+    indexes = np.arange(100)
+    times = END_TIME + indexes * INTERVAL
+    times[50:] -= 4 * INTERVAL
+    indexMap = IndexMap(INTERVAL)
+    indexMap.learn(indexes, times)
+    assert (np.diff(indexMap._anchors[1]) >= 0).all()
+    assert indexMap.anchor_before(END_TIME + 48 * INTERVAL + 60) == (48, END_TIME + 48 * INTERVAL)
+    assert indexMap.anchor_before(END_TIME + 76 * INTERVAL) == (80, END_TIME + 76 * INTERVAL)
+
+    def probe(index):
+        return indexes[index:index + 2], times[index:index + 2]
+
+    newest = (99, int(times[-1]))
+    # entries 50 to 53 have the times of 46 to 49 again, the other times are unique
+    for index in [10, 45, 54, 80, 98]:
+        assert IndexMap(INTERVAL).locate(int(times[index]) + 60, probe, newest, 0) == index
+        assert indexMap.locate(int(times[index]) + 60, probe, newest, 0) == index
+
+
+def test_meterReadAcrossIndexOverflow(tmp_path):
+    # 2500 entries in a ring buffer of 1000, the index started over twice
+    with EmuEmulator(entries=2500, index_capacity=1000, end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "ringMeter", read_block_size=300, index_capacity=1000)
+        assert meter.current_raw_index == 499 and meter.current_index == 499
+
+        start, stop = meter.calc_index(END_TIME - 800 * INTERVAL, END_TIME)
+        assert (start, stop) == (-301, 499)
+        data = meter.read(END_TIME - 800 * INTERVAL, END_TIME)
+        assert len(data) == 801
+        assert (np.diff(data["Timestamp"].astype("datetime64[s]").astype("int64")) == INTERVAL).all()
+        assert (np.diff(data["ringMeter_Import_Wh"]) >= 0).all()
+
+        # older than the ring buffer, the oldest entry is the start
+        start, _ = meter.calc_index(END_TIME - 2000 * INTERVAL, END_TIME)
+        assert start == -500
+
+        # the cached entries keep their unwrapped indexes
+        cache = MeterCache(meter, str(tmp_path))
+        cached = cache.read(END_TIME - 800 * INTERVAL, END_TIME)
+        assert cache.intervals == [[-301, 499]]
+        assert (cached["ringMeter_Import_Wh"].to_numpy() == data["ringMeter_Import_Wh"].to_numpy()).all()
+
+
+def test_unwrapWithCachedEntries(tmp_path):
+    # the meter index starts over between two sessions, the cache continues the
+    # indexes of the first session
+    with EmuEmulator(entries=2400, index_capacity=1000, end_time=END_TIME - 700 * INTERVAL) as emulator:
+        meter = EmuMeter(emulator.host, "unwrapMeter", read_block_size=300, index_capacity=1000)
+        MeterCache(meter, str(tmp_path)).read(END_TIME - 1300 * INTERVAL, END_TIME - 700 * INTERVAL)
+        assert meter.current_index == 399
+
+    with EmuEmulator(entries=3100, index_capacity=1000, end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "unwrapMeter", read_block_size=300, index_capacity=1000)
+        assert meter.current_raw_index == 99
+        cache = MeterCache(meter, str(tmp_path))
+        assert meter.current_index == 1099
+        data = cache.read(END_TIME - 1300 * INTERVAL, END_TIME)
+        assert len(data) == 1301
+        assert cache.intervals == [[-201, 1099]]
+        assert (np.diff(data["Timestamp"].astype("datetime64[s]").astype("int64")) == INTERVAL).all()
+        assert (np.diff(data["unwrapMeter_Import_Wh"]) >= 0).all()
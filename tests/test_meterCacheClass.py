@@ -0,0 +1,74 @@
+import http.client
+import pytest
+from libs.Cache.meterCacheClass import MeterCache
+from libs.Meter.meterClass import Meter
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Meter.emuEmulatorClass import EmuEmulator
+
+END_TIME = 1_700_002_800
+INTERVAL = 15 * 60
+
+
+def getCache(tmp_path):
+    return MeterCache(Meter("testMeter", "testMeter"), str(tmp_path))
+
+
+def test_missingRangesEmptyCache(tmp_path):
+    cache = getCache(tmp_path)
+    assert cache.missing_ranges(10, 20) == [[10, 20]]
+
+
+def test_missingRanges(tmp_path):
+    cache = getCache(tmp_path)
+    cache.store.intervals = [[0, 9], [15, 19], [30, 40]]
+    assert cache.missing_ranges(5, 35) == [[10, 14], [20, 29]]
+    assert cache.missing_ranges(15, 19) == []
+    assert cache.missing_ranges(35, 50) == [[41, 50]]
+
+
+def test_cachedRunWithoutRequests(tmp_path):
+    with EmuEmulator(entries=500, end_time=END_TIME) as emulator:
+        MeterCache(EmuMeter(emulator.host, "offlineMeter", read_block_size=100), str(tmp_path)).read(
+            END_TIME - 400 * INTERVAL, END_TIME
+        )
+        host = emulator.host
+
+    # the meter is gone, the cached range is still served
+    cache = MeterCache(EmuMeter(host, "offlineMeter", read_block_size=100), str(tmp_path))
+    assert cache.cached_index(END_TIME - 300 * INTERVAL + 60, END_TIME - 10 * INTERVAL) == (199, 489)
+    data = cache.read(END_TIME - 300 * INTERVAL + 60, END_TIME - 10 * INTERVAL)
+    assert len(data) == 291
+    # the newest cached entry may not be the newest entry of the meter
+    assert cache.cached_index(END_TIME - 300 * INTERVAL, END_TIME) is None
+    # offline the cached part of a range is served without asking the meter
+    assert len(cache.read(END_TIME - 300 * INTERVAL, END_TIME + 10 * INTERVAL, offline=True)) == 301
+    assert cache.read(END_TIME - 480 * INTERVAL, END_TIME - 450 * INTERVAL, offline=True).empty
+
+
+def test_retryBrokenBlocks(tmp_path):
+    with EmuEmulator(entries=1000, end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "retryMeter", read_block_size=100, retry_delay=0.01)
+        emulator.failures = {100: 2, 500: 1}
+        data = MeterCache(meter, str(tmp_path)).read(END_TIME - 999 * INTERVAL, END_TIME)
+        assert len(data) == 1000
+        assert emulator.failures == {100: 0, 500: 0}
+
+
+def test_resumeAfterFailedBlock(tmp_path):
+    with EmuEmulator(entries=1000, end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "resumeMeter", read_block_size=100, max_connections=1, block_retries=0)
+        cache = MeterCache(meter, str(tmp_path))
+        emulator.failures = {300: 1}
+        with pytest.raises(http.client.IncompleteRead):
+            cache.fetch(0, 999)
+        # the blocks before the broken one are kept
+        assert cache.intervals[0] == [0, 299]
+
+        # a new session only downloads the missing blocks
+        cache = MeterCache(EmuMeter(emulator.host, "resumeMeter", read_block_size=100), str(tmp_path))
+        missing = cache.missing_ranges(0, 999)
+        requests = emulator.requests
+        cache.fetch(0, 999)
+        assert emulator.requests - requests == sum(len(cache.meter.split_index_range(*gap)) for gap in missing)
+        assert cache.intervals == [[0, 999]]
+        assert len(cache.read(END_TIME - 999 * INTERVAL, END_TIME)) == 1000
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from libs.Cache.meterStoreClass import MeterStore
+
+
+def getBlock(start_index: int, stop_index: int):
+    index = range(start_index, stop_index + 1)
+    return pd.DataFrame(
+        {
+            "Timestamp": pd.to_datetime([1700000000 + 900 * i for i in index], unit="s"),
+            "testMeter_Import_Wh": [10 * i for i in index],
+            "testMeter_Export_Wh": [i for i in index],
+        },
+        index=pd.Index(index, name="Index"),
+    )
+
+
+def test_mergeIntervals():
+    merged = MeterStore.merge_intervals([[20, 30], [0, 9], [10, 12], [25, 40]])
+    assert merged == [[0, 12], [20, 40]]
+
+
+def test_appendAndReadRange(tmp_path):
+    store = MeterStore("testMeter", str(tmp_path))
+    store.append(getBlock(0, 9))
+    store.append(getBlock(20, 29))
+    data = store.read_range(5, 24)
+    assert list(data.index) == list(range(5, 10)) + list(range(20, 25))
+    assert (data["testMeter_Import_Wh"] == data.index * 10).all()
+
+
+def test_outOfOrderAppend(tmp_path):
+    store = MeterStore("testMeter", str(tmp_path))
+    store.append(getBlock(20, 29))
+    store.append(getBlock(0, 19))
+    store.append(getBlock(15, 24))
+    assert len(store) == 30
+    assert store.read_range(0, 29).equals(getBlock(0, 29))
+    # the files on disk stay sorted by index
+    assert (np.fromfile(tmp_path / "testMeter_store.secret" / "Index.i8", dtype="<i8") == np.arange(30)).all()
+
+
+def test_unsortedStore(tmp_path):
+    store = MeterStore("testMeter", str(tmp_path))
+    store.append(getBlock(0, 9))
+    indexFile = tmp_path / "testMeter_store.secret" / "Index.i8"
+    np.arange(9, -1, -1, dtype="<i8").tofile(indexFile)
+    with pytest.raises(ValueError):
+        len(MeterStore("testMeter", str(tmp_path)))
+    # reading does not touch the files
+    assert (np.fromfile(indexFile, dtype="<i8") == np.arange(9, -1, -1)).all()
+
+
+def test_emptyFrame(tmp_path):
+    store = MeterStore("testMeter", str(tmp_path))
+    assert store.empty_frame().equals(store.read_range(0, 10))
+    store.append(getBlock(0, 9))
+    assert store.empty_frame().columns.equals(store.read_range(0, 9).columns)
+
+
+def test_persistence(tmp_path):
+    store = MeterStore("testMeter", str(tmp_path))
+    store.append(getBlock(0, 9))
+    store.add_interval(0, 9)
+    store = MeterStore("testMeter", str(tmp_path))
+    assert store.intervals == [[0, 9]]
+    assert store.read_range(0, 9).equals(getBlock(0, 9))
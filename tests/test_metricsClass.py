@@ -0,0 +1,88 @@
+import json
+import time
+import pytest
+from libs.Metrics.metricsClass import Metrics, metrics
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Cache.meterCacheClass import MeterCache
+
+
+def test_countersAndTimers():
+    registry = Metrics()
+    registry.increment("cache_hits", meter="a")
+    registry.increment("cache_hits", 2, meter="a")
+    registry.increment("cache_hits", meter="b")
+    registry.observe("stage_seconds", 0.5, stage="align")
+    registry.observe("stage_seconds", 1.5, stage="align")
+    with pytest.raises(KeyError):
+        with registry.timer("stage_seconds", stage="calculate"):
+            raise KeyError()
+
+    report = registry.to_dict()
+    assert report["counters"] == [
+        {"name": "cache_hits", "labels": {"meter": "a"}, "value": 3},
+        {"name": "cache_hits", "labels": {"meter": "b"}, "value": 1},
+    ]
+    align = report["timers"][0]
+    assert align["labels"] == {"stage": "align"}
+    assert (align["count"], align["sum"], align["min"], align["max"]) == (2, 2.0, 0.5, 1.5)
+    assert report["timers"][1]["count"] == 1
+
+
+def test_timerDecorator():
+    registry = Metrics()
+
+    @registry.timer("stage_seconds", stage="sleep")
+    def sleep():
+        time.sleep(0.01)
+
+    sleep()
+    sleep()
+    timer = registry.to_dict()["timers"][0]
+    assert timer["count"] == 2 and timer["min"] >= 0.01
+
+
+def test_prometheus():
+    registry = Metrics()
+    registry.increment("http_response_bytes", 100, host="127.0.0.1:80")
+    registry.observe("stage_seconds", 0.25, stage="diff")
+    lines = registry.to_prometheus().splitlines()
+    assert "# TYPE openzev_http_response_bytes_total counter" in lines
+    assert 'openzev_http_response_bytes_total{host="127.0.0.1:80"} 100' in lines
+    assert "# TYPE openzev_stage_seconds summary" in lines
+    assert 'openzev_stage_seconds_count{stage="diff"} 1' in lines
+    assert 'openzev_stage_seconds_sum{stage="diff"} 0.25' in lines
+    assert 'openzev_stage_seconds_max{stage="diff"} 0.25' in lines
+
+
+def test_prometheusEscapesLabels():
+    registry = Metrics()
+    registry.increment("meter_rows", 1, meter='flat "A"\\1\nB')
+    assert 'openzev_meter_rows_total{meter="flat \\"A\\"\\\\1\\nB"} 1' in registry.to_prometheus().splitlines()
+
+
+def test_json(tmp_path):
+    registry = Metrics()
+    registry.increment("meter_rows", 96, meter="a")
+    registry.to_json(tmp_path / "metrics.json")
+    with open(tmp_path / "metrics.json") as file:
+        assert json.load(file) == registry.to_dict()
+
+
+def test_cacheInstrumentation(tmp_path):
+    metrics.reset()
+    with EmuEmulator(entries=500) as emulator:
+        host = emulator.host
+        meter = EmuMeter(host, "metricsMeter", read_block_size=100)
+        cache = MeterCache(meter, tmp_path)
+        now = time.time()
+        cache.read(now - 86400, now)
+        cache.read(now - 86400, now)
+
+    counters = {(entry["name"], tuple(entry["labels"].items())): entry["value"] for entry in metrics.to_dict()["counters"]}
+    assert counters[("cache_misses", (("meter", "metricsMeter"),))] == 1
+    assert counters[("cache_hits", (("meter", "metricsMeter"),))] == 1
+    # newest entry, one probe of two entries to locate the start and the day itself
+    assert counters[("meter_rows", (("meter", "metricsMeter"),))] == 1 + 2 + 97
+    assert counters[("index_probes", (("meter", "metricsMeter"),))] == 1
+    assert counters[("http_response_bytes", (("host", host),))] > 0
@@ -0,0 +1,82 @@
+import gzip
+import numpy as np
+import pandas as pd
+import pytest
+from libs.Cache.meterCacheClass import MeterCache
+from libs.Meter.EmuMeterClass import EmuMeter
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Meter.replayMeterClass import ReplayMeter
+from main import getEnergyData, buildMeterList
+
+END_TIME = 1_700_002_800
+INTERVAL = 15 * 60
+
+
+def exportLog(emulator, directory, name, parts):
+    # overlapping exports of the meter log, like several downloads of "/data/"
+    directory.mkdir(exist_ok=True)
+    for number, (first, last) in enumerate(parts):
+        body = emulator.csv(np.arange(first, last + 1))
+        if number % 2:
+            with gzip.open(directory / f"{name}_{number}.csv.gz", "wb") as file:
+                file.write(body)
+        else:
+            (directory / f"{name}_{number}.csv").write_bytes(body)
+    return str(directory)
+
+
+def test_replaySameAsMeter(tmp_path):
+    with EmuEmulator(entries=2000, gaps=[(700, 4)], end_time=END_TIME) as emulator:
+        meter = EmuMeter(emulator.host, "flat1", read_block_size=300)
+        expected = meter.read(END_TIME - 1500 * INTERVAL + 60, END_TIME - 100 * INTERVAL)
+        directory = exportLog(emulator, tmp_path / "flat1", "flat1", [(0, 900), (800, 1999)])
+
+    replay = ReplayMeter(directory, "flat1")
+    assert (replay.oldest_index, replay.current_index) == (0, 1999)
+    assert replay.max_block_size is None and replay.local
+    data = replay.read(END_TIME - 1500 * INTERVAL + 60, END_TIME - 100 * INTERVAL)
+    pd.testing.assert_frame_equal(data, expected)
+
+    # the bulk read returns the arrays of an index range
+    arrays = replay.read_index_range(10, 19)
+    assert list(arrays["Index"]) == list(range(10, 20))
+    assert (np.diff(arrays["Timestamp"]) == INTERVAL).all()
+
+    # the cache works with any meter of the bulk read contract
+    cached = MeterCache(replay, str(tmp_path / "cache")).read(END_TIME - 1500 * INTERVAL + 60, END_TIME - 100 * INTERVAL)
+    pd.testing.assert_frame_equal(cached, expected)
+
+
+def test_replayRingBuffer(tmp_path):
+    with EmuEmulator(entries=2500, index_capacity=1000, end_time=END_TIME) as emulator:
+        # raw indexes 500..999 and 0..499 of the last pass through the ring
+        directory = exportLog(emulator, tmp_path / "ring", "ring", [(1500, 1999), (2000, 2499)])
+    replay = ReplayMeter(directory, "ring", index_capacity=1000)
+    assert replay.current_index - replay.oldest_index == 999
+    data = replay.read(END_TIME - 999 * INTERVAL, END_TIME)
+    assert len(data) == 1000
+    assert (np.diff(data["ring_Import_Wh"]) >= 0).all()
+
+
+def test_billingFromFiles(tmp_path):
+    emulators = {meter: EmuEmulator(1000, seed=number, end_time=END_TIME).start() for number, meter in enumerate(["flat1", "ewMeter"])}
+    try:
+        confData = {"meters": {"flat1": emulators["flat1"].host}, "ewMeter": emulators["ewMeter"].host}
+        expected = getEnergyData(END_TIME - 500 * INTERVAL, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path / "cache"))
+        replayConf = {
+            "meters": {"flat1": "file:" + exportLog(emulators["flat1"], tmp_path / "flat1", "flat1", [(0, 999)])},
+            "ewMeter": "file:" + exportLog(emulators["ewMeter"], tmp_path / "ew", "ew", [(0, 999)]),
+        }
+    finally:
+        for emulator in emulators.values():
+            emulator.stop()
+
+    # no network and no cache
+    energyDF = getEnergyData(END_TIME - 500 * INTERVAL, END_TIME, buildMeterList(replayConf), cache_dir=str(tmp_path / "unused"))
+    pd.testing.assert_frame_equal(energyDF, expected)
+    assert not (tmp_path / "unused").exists()
+
+
+def test_noFiles(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ReplayMeter(str(tmp_path / "missing*.csv"), "missing")
@@ -0,0 +1,51 @@
+import threading
+import time
+from libs.Cache.resultCacheClass import ResultCache
+
+
+def test_evictsLeastRecentlyUsed():
+    cache = ResultCache(max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.get("a") == 1
+    # "b" is the least recently used entry
+    cache.put("c", 3, 40)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.status() == {"entries": 2, "bytes": 80, "max_bytes": 100}
+
+    # a value larger than the cache is not stored and evicts nothing
+    cache.put("d", 4, 101)
+    assert cache.get("d") is None and len(cache) == 2
+
+    # replacing an entry updates its size
+    cache.put("a", 5, 10)
+    assert cache.nbytes == 50 and cache.get("a") == 5
+
+
+def test_ttl():
+    cache = ResultCache()
+    cache.put("live", 1, 10, ttl=0.05)
+    cache.put("done", 2, 10)
+    assert cache.get("live") == 1
+    time.sleep(0.1)
+    assert cache.get("live") is None and cache.get("done") == 2
+    assert cache.nbytes == 10
+
+
+def test_computedOnce():
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "result", 10, None
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("key", compute)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert cache.get_or_compute("key", compute) == "result" and len(calls) == 1
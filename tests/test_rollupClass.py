@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from libs.Billing.rollupClass import RollupIndex
+
+
+def getEnergyDF(rows=4 * 24 * 80, seed=0):
+    rng = np.random.default_rng(seed)
+    energyDF = pd.DataFrame({
+        "Timestamp": pd.date_range("2024-01-20", periods=rows, freq="15min"),
+        "meter1_EnBought_Wh": rng.random(rows) * 100,
+        "meter1_EnSold_Wh": rng.random(rows) * 100,
+    })
+    energyDF.loc[0, "meter1_EnBought_Wh"] = np.nan
+    return energyDF
+
+
+def referenceTotal(energyDF, start, stop):
+    rows = (energyDF["Timestamp"] > pd.Timestamp(start)) & (energyDF["Timestamp"] <= pd.Timestamp(stop))
+    return energyDF[rows].drop(columns="Timestamp").sum()
+
+
+def test_total():
+    energyDF = getEnergyDF()
+    rollup = RollupIndex(energyDF)
+    assert rollup.regular
+    for start, stop in [
+        ("2024-01-01", "2024-12-31"),
+        ("2024-02-01", "2024-03-01"),
+        ("2024-02-03 10:07", "2024-02-17 23:45"),
+        ("2024-03-01", "2024-03-01"),
+    ]:
+        np.testing.assert_allclose(rollup.total(start, stop), referenceTotal(energyDF, start, stop), rtol=1e-9)
+
+
+def test_monthly():
+    energyDF = getEnergyDF()
+    monthly = RollupIndex(energyDF).monthly("2024-02", "2024-03")
+    assert [str(month) for month in monthly.index] == ["2024-02", "2024-03"]
+    # local midnight is 23:00 UTC in winter
+    np.testing.assert_allclose(monthly.loc[pd.Period("2024-02", "M")], referenceTotal(energyDF, "2024-01-31 23:00", "2024-02-29 23:00"), rtol=1e-9)
+
+
+def test_summerTime():
+    energyDF = getEnergyDF()
+    energyDF["meter1_EnSold_Wh"] = 1.0
+    rollup = RollupIndex(energyDF)
+    # summer time from 2024-03-31 02:00, the day has 23 hours and ends at 22:00 UTC
+    daily = rollup.daily()
+    assert daily.loc[pd.Timestamp("2024-03-30").date(), "meter1_EnSold_Wh"] == 96
+    assert daily.loc[pd.Timestamp("2024-03-31").date(), "meter1_EnSold_Wh"] == 92
+    monthly = rollup.monthly("2024-03", "2024-03")
+    np.testing.assert_allclose(monthly.iloc[0], referenceTotal(energyDF, "2024-02-29 23:00", "2024-03-31 22:00"), rtol=1e-9)
+    assert monthly.iloc[0]["meter1_EnSold_Wh"] == 31 * 96 - 4
+
+
+def test_saveAndLoad(tmp_path):
+    energyDF = getEnergyDF()
+    RollupIndex(energyDF).save(tmp_path / "rollup.npz")
+    rollup = RollupIndex.load(tmp_path / "rollup.npz")
+    np.testing.assert_allclose(rollup.total("2024-02-01", "2024-03-01"), referenceTotal(energyDF, "2024-02-01", "2024-03-01"), rtol=1e-9)
+    # the last hours are on the next local day
+    assert rollup.timezone == "Europe/Zurich" and len(rollup.daily()) == 81
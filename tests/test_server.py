@@ -0,0 +1,97 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+from libs.Meter.emuEmulatorClass import EmuEmulator
+from libs.Billing.summaryClass import BillingSummary
+from libs.Metrics.metricsClass import metrics
+import server as serverModule
+from main import getEnergyData, combineMeterPairs, calculate, buildMeterList, parseDate
+from server import buildServer, parseTime
+
+END_TIME = 1_700_002_800
+INTERVAL = 15 * 60
+START_TIME = END_TIME - 3 * 86400
+
+
+def getJson(server, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}{path}") as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def test_queriesFromCache(tmp_path, monkeypatch):
+    meters = ["flat1", "flat2", "pv"]
+    emulators = [EmuEmulator(1000, seed=number, end_time=END_TIME, producer=meter == "pv").start()
+                 for number, meter in enumerate(meters + ["ewMeter"])]
+    confData = {
+        "meters": {meter: emulator.host for meter, emulator in zip(meters, emulators)},
+        "ewMeter": emulators[-1].host,
+        "combine": [["flat1", "pv"]],
+        "tariff": {"prices": [{"from": "2023-01-01", "EnBought": 0.3, "EnSold": 0.1, "EnBoughtInt": 0.2, "EnSoldInt": 0.2}]},
+    }
+    try:
+        # e.g. filled by the collector
+        energyDF = getEnergyData(START_TIME, END_TIME, buildMeterList(confData), cache_dir=str(tmp_path))
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+    expected = BillingSummary.from_frame(calculate(combineMeterPairs(energyDF, [("flat1", "pv")]), meters), meters)
+
+    # the meters are offline, every answer comes from the cache
+    builds = []
+    monkeypatch.setattr(serverModule, "buildMeterList", lambda confData: builds.append(1) or buildMeterList(confData))
+    server = buildServer(confData, port=0, cache_dir=str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        metrics.reset()
+        status, period = getJson(server, f"/summary?start={START_TIME}&stop={END_TIME}")
+        assert status == 200
+        for user in meters:
+            for quantity, value in expected.to_dict()["users"][user].items():
+                assert np.isclose(period["summary"]["users"][user][quantity], value)
+        assert period["costs"]["flat2"]["EnBought_CHF"] > 0
+
+        status, user = getJson(server, f"/users/flat2?start={START_TIME}&stop={END_TIME}")
+        assert status == 200 and user["totals"] == period["summary"]["users"]["flat2"]
+        assert user["boughtFrom_Wh"]["flat1"] == period["summary"]["transfer_Wh"]["flat1"]["flat2"]
+        counters = {entry["name"]: entry["value"] for entry in metrics.to_dict()["counters"]}
+        assert counters["result_cache_misses"] == 1 and counters["result_cache_hits"] == 1
+
+        # the cache holds part of a later period, it is answered with the data there is
+        status, period = getJson(server, f"/summary?start={END_TIME - 86400}&stop={END_TIME + 86400}")
+        assert status == 200 and period["dataTo"] is not None
+        status, period = getJson(server, f"/summary?start={START_TIME - 86400}&stop={START_TIME - 3600}")
+        assert status == 200 and period["summary"] is None
+        assert getJson(server, "/status")[1]["results"]["entries"] == 3
+        # the meters are built once, not per query
+        assert len(builds) == 1
+        # only the period reaching past the cached data expires
+        expiries = [entry[2] for entry in server.results._entries.values()]
+        assert expiries[0] is None and expiries[1] is not None
+
+        assert getJson(server, f"/users/nobody?start={START_TIME}&stop={END_TIME}")[0] == 404
+        assert getJson(server, f"/summary?start={END_TIME}&stop={START_TIME}")[0] == 400
+        assert getJson(server, "/summary")[0] == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parseTime():
+    # times without a zone are local, an hour after UTC in winter
+    assert parseTime("2023-11-14T23:13:20") == 1_700_000_000
+    assert parseTime("2023-11-14T22:13:20+00:00") == 1_700_000_000
+    assert parseTime("2023-11-14T22:13:20", "UTC") == 1_700_000_000
+    assert parseTime("1700000000") == 1_700_000_000
+
+
+def test_sameDatesAsBatch():
+    # the dates of the menu, batch.py and collector.py are local midnights like the queries
+    assert parseDate("1.1.2025") == parseTime("2025-01-01") == 1_735_686_000
+    assert parseDate("1.7.2025") == parseTime("2025-07-01") == 1_751_320_800
+    assert parseDate("1.1.2025", "UTC") == parseTime("2025-01-01", "UTC") == 1_735_689_600
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from main import calculate
+from libs.Billing.summaryClass import BillingSummary
+from test_billingEngine import getEnergyDF
+
+
+def referenceText(energyDF: pd.DataFrame, consumerKeys):
+    # column by column report the summary is checked against
+    lines = []
+    for user in consumerKeys:
+        lines.append(f" {user}:")
+        data = energyDF[f"{user}_EnBought_Wh"].sum() / 1000
+        if data > 0:
+            lines.append(f"       EW Bezug: {data:.3f} kWh")
+        data = energyDF[f"{user}_EnSold_Wh"].sum() / 1000
+        if data > 0:
+            lines.append(f"     EW Verkauf: {data:.3f} kWh")
+        data = energyDF[f"{user}_EnBoughtInt_Wh"].sum() / 1000
+        if data > 0:
+            lines.append(f"      ZEV Bezug: {data:.3f} kWh")
+        for user2 in consumerKeys:
+            if not (user == user2):
+                data = energyDF[f"{user2}_2_{user}_EnBoughtInt_Wh"].sum() / 1000
+                if data > 0:
+                    lines.append(f"         - von {user2}: {data:.3f} kWh")
+        data = energyDF[f"{user}_EnSoldInt_Wh"].sum() / 1000
+        if data > 0:
+            lines.append(f"     ZEV Einsp.: {data:.3f} kWh")
+        lines.append("")
+
+    lines.append(" Stats:")
+    data = 0
+    for user in consumerKeys:
+        data += energyDF[f"{user}_EnBought_Wh"].sum() / 1000
+    if data > 0:
+        lines.append(f"       EW Bezug: {data:.3f} kWh")
+    data = 0
+    for user in consumerKeys:
+        data += energyDF[f"{user}_EnSold_Wh"].sum() / 1000
+    if data > 0:
+        lines.append(f"      EW Einsp.: {data:.3f} kWh")
+    data = energyDF["EnergyError_Wh"].sum() / 1000
+    if data > 0:
+        lines.append(f"    Meter Error: {data:.3f} kWh")
+    for user in consumerKeys:
+        lines.append(f"          {user}:")
+        data = energyDF[f"{user}_EnBought_Wh"].sum() / 1000 + energyDF[f"{user}_EnBoughtInt_Wh"].sum() / 1000
+        if data > 0:
+            lines.append(f"               used: {data:.3f} kWh")
+        data = energyDF[f"{user}_EnSold_Wh"].sum() / 1000 + energyDF[f"{user}_EnSoldInt_Wh"].sum() / 1000
+        if data > 0:
+            lines.append(f"            prodced: {data:.3f} kWh")
+    return "\n".join(lines)
+
+
+def test_renderTextMatchesReference():
+    users = ["meter1", "meter2", "meter3"]
+    energyDF = calculate(getEnergyDF(users), users, pairwise=True)
+    summary = BillingSummary.from_frame(energyDF, users)
+    assert summary.render_text() == referenceText(energyDF, users)
+
+
+def test_transferMatrixMatchesPairwiseColumns():
+    users = ["meter1", "meter2", "meter3"]
+    pairwise = BillingSummary.from_frame(calculate(getEnergyDF(users), users, pairwise=True), users)
+    aggregate = BillingSummary.from_frame(calculate(getEnergyDF(users), users), users)
+    np.testing.assert_allclose(aggregate.transfer.to_numpy(), pairwise.transfer.to_numpy(), rtol=1e-12)
+    pd.testing.assert_frame_equal(aggregate.user_totals, pairwise.user_totals)
+
+
+def test_addSummaries():
+    users = ["meter1", "meter2"]
+    energyDF = calculate(getEnergyDF(users, rows=400), users)
+    whole = BillingSummary.from_frame(energyDF, users)
+    first = BillingSummary.from_frame(calculate(energyDF.iloc[:150].copy(), users), users)
+    second = BillingSummary.from_frame(calculate(energyDF.iloc[150:].copy(), users), users)
+    total = first + second
+    np.testing.assert_allclose(total.user_totals.to_numpy(), whole.user_totals.to_numpy(), rtol=1e-12)
+    np.testing.assert_allclose(total.transfer.to_numpy(), whole.transfer.to_numpy(), rtol=1e-12)
+    assert np.isclose(total.energy_error, whole.energy_error)
+
+
+def test_toDictAndCsv(tmp_path):
+    users = ["meter1", "meter2"]
+    summary = BillingSummary.from_frame(calculate(getEnergyDF(users), users), users)
+    result = summary.to_dict()
+    assert result["ewImport_Wh"] == summary.user_totals["EnBought_Wh"].sum()
+    assert result["transfer_Wh"]["meter1"]["meter2"] == summary.transfer.loc["meter1", "meter2"]
+    assert "meter1" not in result["transfer_Wh"]["meter1"]
+
+    summary.to_csv(tmp_path / "summary.csv")
+    table = pd.read_csv(tmp_path / "summary.csv", sep=";", index_col="User")
+    assert list(table.index) == users
+    assert np.isclose(table.loc["meter2", "EnBoughtIntFrom_meter1_Wh"], summary.transfer.loc["meter1", "meter2"])
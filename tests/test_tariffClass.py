@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from libs.Billing.compact import compact_energy
+from libs.Billing.tariffClass import Tariff
+
+USERS = ["flat1", "flat2"]
+QUANTITIES = ["EnBought_Wh", "EnSold_Wh", "EnBoughtInt_Wh", "EnSoldInt_Wh"]
+CONFIG = {
+    "windows": [
+        {"slot": "HT", "days": [0, 1, 2, 3, 4], "start": "07:00", "stop": "20:00"},
+        {"slot": "HT", "days": [5], "start": "07:00", "stop": "13:00"},
+    ],
+    "prices": [
+        {"from": "2024-01-01", "EnBought": {"HT": 0.30, "NT": 0.20}, "EnSold": 0.10, "EnBoughtInt": 0.25, "EnSoldInt": 0.25},
+        {"from": "2024-01-10", "EnBought": {"HT": 0.35, "NT": 0.22}, "EnSold": 0.08, "EnBoughtInt": {"HT": 0.28, "NT": 0.18}, "EnSoldInt": 0.20},
+    ],
+    "holidays": ["2024-01-15"],
+}
+
+
+def billedFrame(days=20):
+    rng = np.random.default_rng(3)
+    rows = days * 96
+    energyDF = pd.DataFrame({"Timestamp": pd.date_range("2024-01-01 00:15", periods=rows, freq="15min")})
+    for user in USERS:
+        for quantity in QUANTITIES:
+            energyDF[f"{user}_{quantity}"] = rng.integers(0, 500, rows).astype(float)
+    energyDF.loc[5, "flat1_EnBought_Wh"] = np.nan
+    return energyDF
+
+
+def referencePrice(start: pd.Timestamp, quantity: str):
+    # price of a local interval start, row by row
+    period = [period for period in CONFIG["prices"] if pd.Timestamp(period["from"]) <= start][-1]
+    weekday = 6 if start.strftime("%Y-%m-%d") in CONFIG["holidays"] else start.weekday()
+    minutes = start.hour * 60 + start.minute
+    slot = "NT"
+    for window in CONFIG["windows"]:
+        first = int(window["start"][:2]) * 60 + int(window["start"][3:])
+        last = int(window["stop"][:2]) * 60 + int(window["stop"][3:])
+        if weekday in window["days"] and first <= minutes < last:
+            slot = window["slot"]
+    price = period.get(quantity.removesuffix("_Wh"), 0.0)
+    return (price[slot] if isinstance(price, dict) else price) / 1000
+
+
+def test_costsSameAsRowByRow():
+    energyDF = billedFrame()
+    tariff = Tariff.from_config(CONFIG)
+    costs = tariff.costs(energyDF, USERS)
+
+    starts = (energyDF["Timestamp"] - pd.Timedelta(minutes=15)).dt.tz_localize("UTC").dt.tz_convert("Europe/Zurich").dt.tz_localize(None)
+    for user in USERS:
+        for quantity in QUANTITIES:
+            prices = np.array([referencePrice(start, quantity) for start in starts])
+            expected = np.nansum(energyDF[f"{user}_{quantity}"].to_numpy() * prices)
+            assert np.isclose(costs.loc[user, quantity.replace("_Wh", "_CHF")], expected)
+    row = costs.loc["flat2"]
+    assert np.isclose(row["Total_CHF"], row["EnBought_CHF"] + row["EnBoughtInt_CHF"] - row["EnSold_CHF"] - row["EnSoldInt_CHF"])
+
+
+def test_slots():
+    tariff = Tariff.from_config(CONFIG)
+    slots = {slot: number for number, slot in enumerate(tariff.slots)}
+    # UTC, an hour before the local time in winter
+    times = pd.DatetimeIndex([
+        "2024-01-08 06:15",  # monday 07:00-07:15
+        "2024-01-08 06:00",  # monday 06:45-07:00
+        "2024-01-13 12:00",  # saturday 12:45-13:00
+        "2024-01-14 11:00",  # sunday
+        "2024-01-15 11:00",  # holiday monday
+        "2024-01-09 23:15",  # second price period
+    ])
+    keys = tariff.slot_index(times)
+    assert list(keys) == [slots["HT"], slots["NT"], 2 + slots["HT"], 2 + slots["NT"], 2 + slots["NT"], 2 + slots["NT"]]
+
+
+def test_shortInterval():
+    tariff = Tariff.from_config(dict(CONFIG, interval=5 * 60))
+    slots = {slot: number for number, slot in enumerate(tariff.slots)}
+    assert tariff.slot_table.shape == (7, 288)
+    times = pd.DatetimeIndex(["2024-01-08 06:05", "2024-01-08 06:00", "2024-01-08 22:55"])
+    assert list(tariff.slot_index(times)) == [slots["HT"], slots["NT"], slots["NT"]]
+    with pytest.raises(ValueError):
+        Tariff(CONFIG["windows"], CONFIG["prices"], interval=7 * 60)
+
+
+def test_invoice():
+    energyDF = billedFrame()
+    tariff = Tariff.from_config(CONFIG)
+    invoice = tariff.invoice(energyDF, USERS)
+    assert invoice.index.names == ["User", "From", "Slot"] and len(invoice) == 2 * 2 * 2
+    # every interval is in one row of the invoice
+    assert np.isclose(invoice.loc["flat2", "EnSold_Wh"].sum(), energyDF["flat2_EnSold_Wh"].sum())
+    assert np.isclose(invoice["EnBought_CHF"].sum(), tariff.costs(energyDF, USERS)["EnBought_CHF"].sum())
+
+    # compact frames give the same amounts
+    compactCosts = tariff.costs(compact_energy(energyDF), USERS)
+    assert np.allclose(compactCosts.to_numpy(), tariff.costs(energyDF, USERS).to_numpy(), rtol=1e-6)
+
+
+def test_beforeFirstPrice():
+    energyDF = billedFrame(2)
+    tariff = Tariff(CONFIG["windows"], [dict(CONFIG["prices"][0], **{"from": "2024-01-01 12:00"})])
+    with pytest.raises(ValueError):
+        tariff.costs(energyDF, USERS)
+    # the empty first interval of a frame starting with the price is fine, 12:00 local is 11:00 UTC
+    energyDF = energyDF[energyDF["Timestamp"] >= "2024-01-01 11:00"].reset_index(drop=True)
+    energyDF.loc[0, energyDF.columns[1:]] = np.nan
+    assert tariff.costs(energyDF, USERS).notna().all().all()
+
+
+def test_summerTime():
+    prices = [dict(CONFIG["prices"][0], **{"from": "2024-01-01"}), dict(CONFIG["prices"][1], **{"from": "2024-04-01"})]
+    tariff = Tariff(CONFIG["windows"], prices, holidays=["2024-04-01"])
+    utc = Tariff(CONFIG["windows"], prices, holidays=["2024-04-01"], timezone="UTC")
+    slots = {slot: number for number, slot in enumerate(tariff.slots)}
+    # summer time from sunday 2024-03-31 02:00, UTC is two hours before the local time
+    times = pd.DatetimeIndex([
+        "2024-03-29 06:15",  # friday 07:00-07:15 in winter time
+        "2024-04-02 05:15",  # tuesday 07:00-07:15
+        "2024-04-02 05:00",  # tuesday 06:45-07:00
+        "2024-04-02 18:00",  # tuesday 19:45-20:00
+        "2024-04-02 18:15",  # tuesday 20:00-20:15
+        "2024-03-31 22:00",  # sunday 23:45-00:00
+        "2024-03-31 22:15",  # holiday monday, second price period
+    ])
+    assert list(tariff.slot_index(times)) == [
+        slots["HT"], 2 + slots["HT"], 2 + slots["NT"], 2 + slots["HT"], 2 + slots["NT"], slots["NT"], 2 + slots["NT"]
+    ]
+    # on UTC the windows are two hours off
+    assert list(utc.slot_index(times[1:3])) == [2 + slots["NT"], 2 + slots["NT"]]